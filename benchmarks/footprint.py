@@ -0,0 +1,85 @@
+"""Idle footprint of the headless daemon versus the desktop GUI.
+
+    python -m benchmarks.footprint --idle 30
+
+Starts each front-end in its own process watching an empty temporary folder, waits for it to
+settle, then samples resident memory and CPU time over the idle window (Linux /proc only). The GUI
+is skipped when customtkinter or a display is unavailable.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+
+from src.lazy import installed
+from benchmarks.run import current_commit, save
+
+def proc_usage(pid: int):
+    """(RSS in MB, CPU seconds) of a running process, from /proc."""
+    with open(f"/proc/{pid}/status", "r") as f:
+        rss_kb = next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+    with open(f"/proc/{pid}/stat", "r") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    ticks = os.sysconf("SC_CLK_TCK")
+    return rss_kb / 1024, (int(fields[11]) + int(fields[12])) / ticks  # utime + stime
+
+def measure(cmd, cwd, settle: float, idle: float):
+    env = dict(os.environ, LITELLM_LOCAL_MODEL_COST_MAP="True")
+    process = subprocess.Popen(cmd, cwd=cwd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        time.sleep(settle)
+        if process.poll() is not None:
+            return None
+        rss_start, cpu_start = proc_usage(process.pid)
+        time.sleep(idle)
+        rss_end, cpu_end = proc_usage(process.pid)
+        return {"rss_mb": max(rss_start, rss_end), "idle_cpu_percent": 100 * (cpu_end - cpu_start) / idle,
+                "startup_cpu_seconds": cpu_start}
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Idle RSS and CPU of the headless daemon and the GUI.")
+    parser.add_argument("--settle", type=float, default=3.0, help="seconds to wait after launch before sampling")
+    parser.add_argument("--idle", type=float, default=10.0, help="seconds to sample while idle")
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args(argv)
+    if not os.path.isdir("/proc/self"):
+        print("The footprint benchmark reads /proc and only runs on Linux.")
+        return None
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="sortai-footprint-") as workdir:
+        source, target = os.path.join(workdir, "source"), os.path.join(workdir, "target")
+        os.makedirs(source)
+        config_file = os.path.join(workdir, "config.json")
+        with open(config_file, "w") as f:
+            json.dump({"source_folders": [source], "target_folder": target, "inplace_organization": False}, f)
+        results["headless"] = measure([sys.executable, os.path.join(ROOT, "headless.py"), "--config", config_file],
+                                      workdir, args.settle, args.idle)
+        if installed("customtkinter") and os.environ.get("DISPLAY"):
+            results["gui"] = measure([sys.executable, os.path.join(ROOT, "main.py")], ROOT, args.settle, args.idle)
+
+    record = {"scenario": "footprint", "commit": current_commit(), "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+              "params": {"settle": args.settle, "idle": args.idle}, "results": results}
+    for name, r in results.items():
+        print(f"[{name} @ {record['commit']}] " + ("failed to start" if r is None else
+              f"RSS {r['rss_mb']:.1f} MB | idle CPU {r['idle_cpu_percent']:.2f}% | startup CPU {r['startup_cpu_seconds']:.2f}s"))
+    if "gui" not in results:
+        print("  gui: skipped (needs customtkinter and a display)")
+    if not args.no_save:
+        print(f"  saved {save(record)}")
+    return record
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+import os
+import re
+import json
+import time
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# litellm's route for self-hosted OpenAI-compatible servers; not a vendor model, so FileSorter sends it to local_base_url
+MOCK_MODEL = "hosted_vllm/mock-model"
+
+# Extension -> (folder, subfolder) answers; anything else lands in Other/Misc like a confused model would
+ANSWERS = {
+    ".jpg": ("Images", "Photos"), ".png": ("Images", "Screenshots"), ".gif": ("Images", "Animations"),
+    ".pdf": ("Documents", "PDF"), ".docx": ("Documents", "Word"), ".xlsx": ("Documents", "Spreadsheets"),
+    ".csv": ("Data", "CSV"), ".json": ("Data", "JSON"), ".txt": ("Documents", "Text"),
+    ".mp3": ("Music", "Tracks"), ".flac": ("Music", "Lossless"), ".mp4": ("Videos", "Clips"), ".mkv": ("Videos", "Movies"),
+    ".zip": ("Archives", "Zip"), ".7z": ("Archives", "7z"), ".tar.gz": ("Archives", "Tarballs"),
+    ".exe": ("Installers", "Windows"), ".msi": ("Installers", "Windows"), ".dmg": ("Installers", "Mac"),
+    ".py": ("Code", "Python"), ".js": ("Code", "JavaScript"), ".ipynb": ("Code", "Notebooks"),
+    ".epub": ("Books", "Ebooks"), ".pptx": ("Work", "Slides"),
+}
+
+def answer_for(filename: str):
+    lower = filename.lower()
+    for ext, answer in ANSWERS.items():
+        if lower.endswith(ext):
+            return {"folder": answer[0], "subfolder": answer[1]}
+    return {"folder": "Other", "subfolder": "Misc"}
+
+def filenames_in(prompt: str):
+    """Pulls the filenames out of FileSorter's single-file or batch prompt."""
+    batch = re.search(r"Files: (\[.*\])", prompt)
+    if batch:
+        return json.loads(batch.group(1)), True
+    single = re.search(r"Categorize the file '(.*)' into", prompt)
+    return ([single.group(1)] if single else []), False
+
+class MockLLMServer:
+    """OpenAI-compatible /v1/chat/completions endpoint with injected latency and errors.
+
+    Latency per request is lognormal around `latency` seconds (`jitter` is the sigma); `error_rate` of
+    the requests fail with `error_status` (429 carries a Retry-After of `retry_after` seconds).
+    """
+
+    def __init__(self, latency: float = 0.2, jitter: float = 0.5, error_rate: float = 0.0, error_status: int = 429,
+                 retry_after: float = 1.0, port: int = 0, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.port = port
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+        self.files = 0
+        self._lock = threading.Lock()
+        self.server = None
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://localhost:{self.port}/v1"  # "localhost" is what routes local models to local_base_url
+
+    def _plan(self):
+        with self._lock:
+            self.requests += 1
+            delay = self.latency * self.rng.lognormvariate(0, self.jitter) if self.latency else 0
+            failed = self.rng.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        return delay, failed
+
+    def handle(self, handler):
+        length = int(handler.headers.get("Content-Length", 0))
+        body = json.loads(handler.rfile.read(length) or b"{}")
+        prompt = "".join(m.get("content", "") for m in body.get("messages", []) if isinstance(m.get("content"), str))
+        delay, failed = self._plan()
+        time.sleep(delay)
+        if failed:
+            payload = json.dumps({"error": {"message": "injected failure", "type": "mock_error"}}).encode()
+            handler.send_response(self.error_status)
+            if self.error_status == 429:
+                handler.send_header("Retry-After", str(self.retry_after))
+        else:
+            names, batched = filenames_in(prompt)
+            with self._lock:
+                self.files += len(names)
+            content = {n: answer_for(n) for n in names} if batched else answer_for(names[0] if names else "")
+            payload = json.dumps({
+                "id": f"mock-{self.requests}", "object": "chat.completion", "created": int(time.time()),
+                "model": body.get("model", "mock"),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": json.dumps(content)}}],
+                "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": 20 * len(names),
+                          "total_tokens": len(prompt) // 4 + 20 * len(names)},
+            }).encode()
+            handler.send_response(200)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(payload)))
+        handler.end_headers()
+        handler.wfile.write(payload)
+
+    def start(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                mock.handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", self.port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True, name="mock-llm")
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def stats(self):
+        with self._lock:
+            return {"requests": self.requests, "errors": self.errors, "files": self.files}
+
+if __name__ == "__main__":
+    server = MockLLMServer(latency=float(os.environ.get("MOCK_LATENCY", 0.2)), port=int(os.environ.get("MOCK_PORT", 8089))).start()
+    print(f"Mock LLM listening on {server.url}")
+    threading.Event().wait()
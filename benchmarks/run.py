@@ -0,0 +1,242 @@
+"""End-to-end throughput benchmarks against a local mock LLM.
+
+    python -m benchmarks.run scan --files 2000 --latency 0.3
+    python -m benchmarks.run watch --files 500 --rate 200 --error-rate 0.05
+    python -m benchmarks.run watch --files 2000 --roots 8 --shards 4
+    python -m benchmarks.run all --compare
+
+Each run reports files/s, p50/p99 end-to-end latency, peak RSS and the per-stage averages from
+src.metrics, and is saved to benchmarks/results/ under the current commit for later comparison.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import subprocess
+import contextlib
+
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")  # no network fetch at import
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+
+from benchmarks.mock_llm import MockLLMServer, MOCK_MODEL
+from benchmarks.treegen import generate_tree, synthetic_name, write_file, file_size
+from src.sorter import FileSorter
+from src.ratelimit import provider_of
+from src.watcher import FolderWatcher
+from src.shards import ShardedWatcher
+from src.scanner import ManualScanner
+from src.metrics import stage_averages
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+SCENARIOS = ("scan", "watch")
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=ROOT).stdout.strip() or "unknown"
+    except OSError:
+        return "unknown"
+
+def bench_config(args, mock):
+    """config.json equivalent of the benchmark settings (shard processes build their sorters from it)."""
+    return {"api_key": "bench", "local_base_url": mock.url, "model_name": MOCK_MODEL,
+            "batch_size": args.batch_size, "max_in_flight": args.max_in_flight, "max_retries": args.max_retries,
+            "rate_limits": {provider_of(MOCK_MODEL): {"rpm": args.rpm, "concurrency": args.concurrency}},
+            "watcher_workers": args.workers, "coalesce_window": args.coalesce, "snapshot_file": ""}
+
+def make_sorter(args, workdir, mock):
+    return FileSorter.from_config(bench_config(args, mock), classifier_file=None,
+                                  cache_file=os.path.join(workdir, "cache.db") if args.cache else None,
+                                  history_file=os.path.join(workdir, "history.db"))
+
+def track_moves(sorter):
+    """Returns {original_path: perf_counter() when its move was recorded}, filled by a history subscriber."""
+    done = {}
+    sorter.history.subscribe(lambda event, entry: done.setdefault(entry["original_path"], time.perf_counter())
+                             if event == "added" else None)
+    return done
+
+def run_scan(args, workdir, mock):
+    source, target = os.path.join(workdir, "source"), os.path.join(workdir, "target")
+    paths = generate_tree(source, args.files, seed=args.seed, subdirs=args.subdirs, max_size=args.max_size)
+    sorter = make_sorter(args, workdir, mock)
+    done = track_moves(sorter)
+    scanner = ManualScanner.for_sources([source], target, False, recursive=args.subdirs > 0, chunk_size=args.chunk_size)
+    scanner.checkpoint_file = None
+    started = time.perf_counter()
+    for _, files in scanner.chunks():
+        sorter.organize_many(files, target, wait=not args.no_wait)
+    elapsed = time.perf_counter() - started
+    latencies = [done[p] - started for p in paths if p in done]
+    return sorter, len(paths), elapsed, latencies
+
+def run_watch(args, workdir, mock):
+    sources = [os.path.join(workdir, f"source{i}") for i in range(max(1, args.roots))]
+    target = os.path.join(workdir, "target")
+    for source in sources:
+        os.makedirs(source)
+    sorter = make_sorter(args, workdir, mock)
+    done = track_moves(sorter)
+    if args.shards > 1:
+        watcher = ShardedWatcher(sources, target, sorter, bench_config(args, mock), processes=args.shards,
+                                 stdout=None if args.verbose else os.devnull)
+        watcher.start()
+        time.sleep(args.shard_startup)  # spawned shards import and schedule their observers
+    else:
+        watcher = FolderWatcher(sources, target, sorter, workers=args.workers, coalesce_window=args.coalesce)
+        watcher.start()
+    rng = random.Random(args.seed)
+    created = {}
+    started = time.perf_counter()
+    try:
+        for n in range(args.files):
+            path = os.path.join(sources[n % len(sources)], f"{n}_{synthetic_name(rng, n)}")
+            write_file(path, file_size(rng, args.max_size))
+            created[os.path.abspath(path)] = time.perf_counter()
+            if args.rate:
+                time.sleep(1 / args.rate)
+        deadline = time.perf_counter() + args.timeout
+        while len(done) < len(created) and time.perf_counter() < deadline:
+            time.sleep(0.05)
+    finally:
+        watcher.stop(drain=False)
+    elapsed = (max(done.values()) if done else time.perf_counter()) - started
+    latencies = [done[p] - t for p, t in created.items() if p in done]
+    return sorter, len(created), elapsed, latencies
+
+def run_scenario(args):
+    mock = MockLLMServer(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                         error_status=args.error_status, seed=args.seed).start()
+    try:
+        with tempfile.TemporaryDirectory(prefix="sortai-bench-") as workdir:
+            runner = run_scan if args.scenario == "scan" else run_watch
+            # The pipeline prints a line per file; keep it out of the timings unless asked for
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(sys.stdout if args.verbose else devnull):
+                sorter, total, elapsed, latencies = runner(args, workdir, mock)
+            rate = sorter.rate_stats()
+            sorter.history.close()
+    finally:
+        mock.stop()
+    return {
+        "files": total,
+        "moved": len(latencies),
+        "seconds": elapsed,
+        "files_per_second": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_latency": percentile(latencies, 0.5),
+        "p99_latency": percentile(latencies, 0.99),
+        "peak_rss_mb": peak_rss_mb(),
+        "llm": mock.stats(),
+        "throttled": rate.get("throttled", 0),
+        "retries": rate.get("retries", 0),
+        "stages": stage_averages(),
+    }
+
+def params_of(args):
+    skip = {"scenario", "compare", "no_save", "verbose"}
+    return {k: v for k, v in vars(args).items() if k not in skip}
+
+def save(record):
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    name = f"{record['scenario']}-{record['commit']}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    path = os.path.join(RESULTS_DIR, name)
+    with open(path, 'w') as f:
+        json.dump(record, f, indent=4)
+    return path
+
+def previous(record):
+    """The newest saved result of the same scenario and parameters from another commit."""
+    best = None
+    if not os.path.isdir(RESULTS_DIR):
+        return None
+    for name in sorted(os.listdir(RESULTS_DIR)):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(RESULTS_DIR, name), 'r') as f:
+                other = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if other.get("scenario") == record["scenario"] and other.get("params") == record["params"] \
+                and other.get("commit") != record["commit"]:
+            best = other
+    return best
+
+def report(record, baseline=None):
+    r = record["results"]
+    fmt = lambda v, unit="": "n/a" if v is None else f"{v:.3f}{unit}"
+    print(f"[{record['scenario']} @ {record['commit']}] {r['moved']}/{r['files']} files in {r['seconds']:.2f}s "
+          f"-> {r['files_per_second']:.1f} files/s | p50 {fmt(r['p50_latency'], 's')} p99 {fmt(r['p99_latency'], 's')} | "
+          f"peak RSS {fmt(r['peak_rss_mb'], ' MB')} | LLM requests {r['llm']['requests']} ({r['llm']['errors']} failed)")
+    if r["stages"]:
+        print("  avg stage seconds: " + ", ".join(f"{k} {v:.3f}" for k, v in r["stages"].items()))
+    if baseline:
+        b = baseline["results"]
+        for key in ("files_per_second", "p50_latency", "p99_latency", "peak_rss_mb"):
+            if r.get(key) is not None and b.get(key):
+                print(f"  {key}: {b[key]:.3f} -> {r[key]:.3f} ({(r[key] - b[key]) / b[key]:+.1%} vs {baseline['commit']})")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SortAI end-to-end benchmarks against a mock OpenAI-compatible server.")
+    parser.add_argument("scenario", choices=SCENARIOS + ("all",))
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--subdirs", type=int, default=0, help="scan: spread files over N subfolders (recursive scan)")
+    parser.add_argument("--max-size", type=int, default=256 * 1024)
+    parser.add_argument("--latency", type=float, default=0.2, help="mock LLM median latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.5, help="lognormal sigma of the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=429)
+    parser.add_argument("--batch-size", type=int, default=25)
+    parser.add_argument("--max-in-flight", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=8, help="limiter ceiling for the mock provider")
+    parser.add_argument("--rpm", type=float, default=0)
+    parser.add_argument("--max-retries", type=int, default=4)
+    parser.add_argument("--cache", action="store_true", help="enable the category cache")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--no-wait", action="store_true", help="scan: skip the per-file stability wait")
+    parser.add_argument("--workers", type=int, default=2, help="watch: watcher worker threads")
+    parser.add_argument("--coalesce", type=float, default=1.0, help="watch: event coalescing window (s)")
+    parser.add_argument("--rate", type=float, default=0, help="watch: files created per second (0 = as fast as possible)")
+    parser.add_argument("--roots", type=int, default=1, help="watch: number of watched source folders")
+    parser.add_argument("--shards", type=int, default=0, help="watch: spread the roots over N worker processes")
+    parser.add_argument("--shard-startup", type=float, default=2.0, help="watch: seconds to let shard processes start")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--compare", action="store_true", help="print deltas against the last run from another commit")
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument("--verbose", action="store_true", help="show the pipeline's per-file output")
+    args = parser.parse_args(argv)
+
+    if args.scenario == "all":
+        # One process per scenario so peak RSS is not inherited from the previous run
+        argv = list(sys.argv[1:] if argv is None else argv)
+        for scenario in SCENARIOS:
+            subprocess.run([sys.executable, "-m", "benchmarks.run", scenario] + [a for a in argv if a != "all"], cwd=ROOT)
+        return
+
+    record = {"scenario": args.scenario, "commit": current_commit(), "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+              "params": params_of(args), "results": run_scenario(args)}
+    report(record, previous(record) if args.compare else None)
+    if not args.no_save:
+        print(f"  saved {save(record)}")
+    return record
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Startup and import-time benchmark.
+
+    python -m benchmarks.startup --repeat 7
+    python -m benchmarks.startup --compare --max-regression 0.25
+
+Every sample runs in a fresh interpreter so nothing is already in sys.modules. Reports the median time
+to import src.sorter (and src.gui when its UI toolkit is installed), to construct a FileSorter, and to
+answer the first categorization against the mock LLM, plus which heavy optional modules were loaded
+before that first categorization. Results are saved next to the throughput benchmarks.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+
+from benchmarks.mock_llm import MockLLMServer
+from benchmarks.run import current_commit, save, previous
+
+# Modules that must not be paid for at startup; each should load only when its feature is first used
+HEAVY_MODULES = ("litellm", "numpy", "pystray", "PIL", "plyer", "customtkinter", "flet")
+TIMINGS = ("import_sorter", "construct", "first_categorization", "import_gui")
+
+PROBE = r"""
+import os, sys, json, time, tempfile
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+sys.path.insert(0, ROOT)
+result = {}
+started = time.perf_counter()
+from src.sorter import FileSorter
+result["import_sorter"] = time.perf_counter() - started
+with tempfile.TemporaryDirectory(prefix="sortai-startup-") as workdir:
+    started = time.perf_counter()
+    sorter = FileSorter(api_key="bench", local_base_url=MOCK_URL, model_name="hosted_vllm/mock-model", cache_file=None,
+                        classifier_file=os.path.join(workdir, "classifier.npz"), history_file=os.path.join(workdir, "history.db"))
+    result["construct"] = time.perf_counter() - started
+    result["loaded_at_startup"] = [m for m in HEAVY_MODULES if m in sys.modules]
+    if MOCK_URL:
+        started = time.perf_counter()
+        sys.stdout, real_stdout = open(os.devnull, "w"), sys.stdout
+        try:
+            sorter.categorize_file("invoice_2024_001.pdf")
+        finally:
+            sys.stdout = real_stdout
+        result["first_categorization"] = time.perf_counter() - started
+    sorter.history.close()
+if GUI:
+    started = time.perf_counter()
+    try:
+        import src.gui
+        result["import_gui"] = time.perf_counter() - started
+    except ImportError:
+        pass
+print(json.dumps(result))
+"""
+
+def probe(mock_url: str, gui: bool) -> dict:
+    code = (f"ROOT = {ROOT!r}\nMOCK_URL = {mock_url!r}\nGUI = {gui!r}\nHEAVY_MODULES = {HEAVY_MODULES!r}\n" + PROBE)
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=ROOT, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+def run_startup(args) -> dict:
+    mock = MockLLMServer(latency=0, jitter=0).start() if not args.no_llm else None
+    try:
+        samples = [probe(mock.url if mock else "", not args.no_gui) for _ in range(args.repeat)]
+    finally:
+        if mock:
+            mock.stop()
+    results = {}
+    for key in TIMINGS:
+        values = [s[key] for s in samples if key in s]
+        results[key] = statistics.median(values) if values else None
+    results["loaded_at_startup"] = sorted({m for s in samples for m in s["loaded_at_startup"]})
+    return results
+
+def report(record, baseline=None):
+    r = record["results"]
+    fmt = lambda v: "n/a" if v is None else f"{v * 1000:.0f} ms"
+    print(f"[startup @ {record['commit']}] import src.sorter {fmt(r['import_sorter'])} | FileSorter() {fmt(r['construct'])} | "
+          f"first categorization {fmt(r['first_categorization'])} | import src.gui {fmt(r['import_gui'])}")
+    print(f"  heavy modules loaded at startup: {', '.join(r['loaded_at_startup']) or 'none'}")
+    regressions = []
+    if baseline:
+        b = baseline["results"]
+        for key in TIMINGS:
+            if r.get(key) is not None and b.get(key):
+                change = (r[key] - b[key]) / b[key]
+                print(f"  {key}: {fmt(b[key])} -> {fmt(r[key])} ({change:+.1%} vs {baseline['commit']})")
+                if key != "first_categorization":
+                    regressions.append((key, change))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SortAI startup and import-time benchmark.")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per measurement (the median is reported)")
+    parser.add_argument("--no-llm", action="store_true", help="skip the first-categorization measurement")
+    parser.add_argument("--no-gui", action="store_true", help="skip importing src.gui")
+    parser.add_argument("--compare", action="store_true", help="print deltas against the last run from another commit")
+    parser.add_argument("--max-regression", type=float, default=None,
+                        help="exit non-zero if a startup timing grew by more than this fraction (with --compare) "
+                             "or a heavy module was imported at startup")
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args(argv)
+
+    record = {"scenario": "startup", "commit": current_commit(), "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+              "params": {"repeat": args.repeat, "no_llm": args.no_llm, "no_gui": args.no_gui},
+              "results": run_startup(args)}
+    regressions = report(record, previous(record) if args.compare else None)
+    if not args.no_save:
+        print(f"  saved {save(record)}")
+    if args.max_regression is not None:
+        failed = [(k, c) for k, c in regressions if c > args.max_regression]
+        for key, change in failed:
+            print(f"  REGRESSION: {key} {change:+.1%} exceeds {args.max_regression:.0%}")
+        if record["results"]["loaded_at_startup"]:
+            print(f"  REGRESSION: imported at startup: {', '.join(record['results']['loaded_at_startup'])}")
+        if failed or record["results"]["loaded_at_startup"]:
+            sys.exit(1)
+    return record
+
+if __name__ == "__main__":
+    main()
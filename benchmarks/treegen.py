@@ -0,0 +1,48 @@
+import os
+import random
+from typing import List
+
+# (weight, template) pairs loosely modelled on a real Downloads folder: lots of photos, screenshots and
+# PDFs, a long tail of installers, archives and code. {n} is a counter, {d} a date, {v} a version.
+TEMPLATES = [
+    (18, "IMG_{n:04d}.jpg"), (10, "Screenshot {d} at 10.{m:02d}.{s:02d}.png"), (9, "invoice_{y}_{n:03d}.pdf"),
+    (6, "Report Q{q} {y} final ({n}).docx"), (5, "bank_statement_{d}.pdf"), (5, "data_export_{n:05d}.csv"),
+    (4, "setup-{v}.exe"), (4, "Track {n:02d} - Artist.mp3"), (4, "VID_{d}_{n:04d}.mp4"), (3, "backup_{d}.zip"),
+    (3, "notes {n}.txt"), (3, "Presentation {n}.pptx"), (2, "model_v{v}.ipynb"), (2, "script_{n}.py"),
+    (2, "budget {y}.xlsx"), (2, "book_{n}.epub"), (2, "release-{v}.tar.gz"), (2, "installer_{v}.msi"),
+    (1, "untitled ({n}).gif"), (1, "config_{n}.json"), (1, "archive_{n}.7z"), (1, "movie.{y}.1080p.mkv"),
+    (1, "random_blob_{n}"), (1, "app-{v}.dmg"), (1, "album {n}.flac"),
+]
+
+def synthetic_name(rng: random.Random, n: int) -> str:
+    template = rng.choices([t for _, t in TEMPLATES], weights=[w for w, _ in TEMPLATES])[0]
+    year = rng.randint(2018, 2025)
+    return template.format(
+        n=n, y=year, q=rng.randint(1, 4), m=rng.randint(0, 59), s=rng.randint(0, 59),
+        d=f"{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        v=f"{rng.randint(0, 5)}.{rng.randint(0, 20)}.{rng.randint(0, 9)}",
+    )
+
+def file_size(rng: random.Random, max_size: int) -> int:
+    """Mostly small files with a heavy tail, capped at max_size."""
+    return max(1, min(max_size, int(rng.paretovariate(1.2) * 2048)))
+
+def generate_tree(root: str, count: int, seed: int = 0, subdirs: int = 0, max_size: int = 256 * 1024) -> List[str]:
+    """Writes `count` files with realistic names under root (spread over `subdirs` folders). Returns their paths."""
+    rng = random.Random(seed)
+    folders = [root] + [os.path.join(root, f"folder_{i}") for i in range(subdirs)]
+    for folder in folders:
+        os.makedirs(folder, exist_ok=True)
+    paths = []
+    for n in range(count):
+        path = os.path.join(rng.choice(folders), synthetic_name(rng, n))
+        if os.path.exists(path):
+            base, ext = os.path.splitext(path)
+            path = f"{base}_{n}{ext}"
+        write_file(path, file_size(rng, max_size))
+        paths.append(path)
+    return paths
+
+def write_file(path: str, size: int):
+    with open(path, "wb") as f:
+        f.write(os.urandom(size))
@@ -0,0 +1,33 @@
+import os
+import sys
+import json
+import argparse
+from src.config import ConfigManager
+from src.daemon import SortAIDaemon, COMMANDS, default_control_address, send_command
+
+def main():
+    parser = argparse.ArgumentParser(description="SortAI headless daemon: watch and sort from config.json without a UI.")
+    parser.add_argument("command", nargs="?", default="run", choices=("run",) + COMMANDS,
+                        help="run the daemon (default) or send a command to a running one")
+    parser.add_argument("--config", default="config.json", help="config file (default: config.json next to SortAI)")
+    parser.add_argument("--control", help="control socket path or host:port (default: control_address from config)")
+    parser.add_argument("--data-dir", help="where history, cache and classifier files live (default: the config's folder)")
+    args = parser.parse_args()
+
+    config = ConfigManager(args.config)
+    address = args.control or config.get("control_address") or default_control_address(config.config_file)
+
+    if args.command != "run":
+        try:
+            reply = send_command(address, args.command)
+        except OSError as e:
+            print(f"SortAI daemon not reachable on {address}: {e}")
+            sys.exit(1)
+        print(json.dumps(reply, indent=4))
+        sys.exit(0 if reply.get("ok") else 1)
+
+    os.chdir(args.data_dir or os.path.dirname(config.config_file))
+    SortAIDaemon(config, address).run()
+
+if __name__ == "__main__":
+    main()
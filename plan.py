@@ -0,0 +1,70 @@
+import argparse
+import json
+from src.config import ConfigManager
+from src.sorter import FileSorter
+from src.history import HistoryStore
+from src.planner import MovePlan, build_plan, execute_plan
+
+def main():
+    parser = argparse.ArgumentParser(description="SortAI dry-run planner: preview a reorganization, then apply it in bulk.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    make = commands.add_parser("make", help="Compute a move plan without touching any file")
+    make.add_argument("sources", nargs="*", help="Folders to organize (default: source_folders from config.json)")
+    make.add_argument("--target", help="Organized root (default: target_folder from config.json)")
+    make.add_argument("--inplace", action="store_true", default=None, help="Organize inside each source folder")
+    make.add_argument("--recursive", action="store_true", help="Include subfolders")
+    make.add_argument("--exclude", action="append", default=None, help="Glob to skip (repeatable)")
+    make.add_argument("-o", "--output", default="plan.json")
+
+    run = commands.add_parser("run", help="Execute (or resume) a saved plan")
+    run.add_argument("plan")
+    run.add_argument("--workers", type=int, default=8)
+
+    show = commands.add_parser("show", help="Summarize a saved plan")
+    show.add_argument("plan")
+
+    undo = commands.add_parser("undo", help="Revert every move made by a plan run")
+    undo.add_argument("plan")
+    undo.add_argument("--workers", type=int, default=8)
+
+    args = parser.parse_args()
+    config = ConfigManager()
+
+    if args.command == "make":
+        sorter = FileSorter.from_config(config.config)
+        sources = args.sources or config.get("source_folders")
+        inplace = config.get("inplace_organization") if args.inplace is None else args.inplace
+        target = args.target or config.get("target_folder")
+        if not sources or not (inplace or target):
+            parser.error("need source folders and either --target or --inplace")
+        exclude = args.exclude if args.exclude is not None else config.get("scan_exclude")
+        plan = build_plan(sorter, sources, target, inplace, args.recursive, exclude)
+        plan.save(args.output)
+        print(f"Planned {len(plan.moves)} moves -> {args.output}")
+    elif args.command == "run":
+        sorter = FileSorter.from_config(config.config)
+        plan = MovePlan.load(args.plan)
+        # Record the session before the first move, so even a run that dies halfway can be undone
+        plan.session = plan.session or HistoryStore.new_session("plan")
+        plan.save(args.plan)
+        summary = execute_plan(sorter, plan, workers=args.workers, on_progress=plan.autosave(args.plan))
+        plan.save(args.plan)  # statuses make the plan resumable
+        print(json.dumps(summary, indent=4))
+    elif args.command == "undo":
+        sorter = FileSorter.from_config(config.config)
+        plan = MovePlan.load(args.plan)
+        if not plan.session:
+            parser.error("this plan has not been run")
+        undone = sorter.undo_session(plan.session, workers=args.workers)
+        restored = {e["original_path"] for e in undone}
+        for move in plan.moves:
+            if move.get("status") == "done" and move["source"] in restored:
+                move["status"] = "undone"
+        plan.save(args.plan)
+        print(f"Restored {len(undone)} files")
+    else:
+        print(json.dumps(MovePlan.load(args.plan).summary(), indent=4))
+
+if __name__ == "__main__":
+    main()
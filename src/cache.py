@@ -0,0 +1,126 @@
+import re
+import time
+import json
+import sqlite3
+import hashlib
+import threading
+from typing import Optional, Dict, List
+from src.metrics import CACHE_LOOKUPS
+
+class CategoryCache:
+    """On-disk (SQLite) cache of filename -> category decisions with LRU/TTL eviction."""
+
+    def __init__(self, db_file: str = "category_cache.db", max_entries: int = 10000, ttl_days: float = 30):
+        self.db_file = db_file
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl_days * 86400
+        self.namespace = ""
+        self.hits = 0
+        self.misses = 0
+        self.provider_calls = 0
+        self.provider_seconds = 0.0
+        self._puts = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        # Opened lazily so a sorter that never reaches the provider never touches the disk
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_file, check_same_thread=False, timeout=30)
+            # WAL and a busy timeout let shard processes share the cache file without "database is locked"
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS categories (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    folder TEXT NOT NULL,
+                    subfolder TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )""")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_categories_last_used ON categories (last_used)")
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def normalize(filename: str) -> str:
+        """Lower-cases the name and collapses digit runs, so invoice_2023.pdf and invoice_2024.pdf share a key."""
+        return re.sub(r"\d+", "#", filename.strip().lower())
+
+    def set_namespace(self, model_name: str, categories: List[str]):
+        raw = json.dumps([model_name, sorted(categories or [])])
+        self.namespace = hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+    def get(self, filename: str) -> Optional[Dict]:
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT folder, subfolder, created FROM categories WHERE namespace = ? AND key = ?",
+                (self.namespace, self.normalize(filename))
+            ).fetchone()
+            if row is None or now - row[2] > self.ttl:
+                self.misses += 1
+                CACHE_LOOKUPS.inc(result="miss")
+                return None
+            conn.execute(
+                "UPDATE categories SET last_used = ? WHERE namespace = ? AND key = ?",
+                (now, self.namespace, self.normalize(filename))
+            )
+            conn.commit()
+            self.hits += 1
+            CACHE_LOOKUPS.inc(result="hit")
+            return {"folder": row[0], "subfolder": row[1]}
+
+    def put(self, filename: str, category: Dict):
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO categories VALUES (?, ?, ?, ?, ?, ?)",
+                (self.namespace, self.normalize(filename), category["folder"], category["subfolder"], now, now)
+            )
+            self._puts += 1
+            # Amortize eviction instead of counting rows on every insert
+            if self._puts % 100 == 0:
+                self._evict(conn, now)
+            conn.commit()
+
+    def _evict(self, conn, now: float):
+        conn.execute("DELETE FROM categories WHERE created < ?", (now - self.ttl,))
+        count = conn.execute("SELECT COUNT(*) FROM categories").fetchone()[0]
+        if count > self.max_entries:
+            conn.execute(
+                "DELETE FROM categories WHERE rowid IN (SELECT rowid FROM categories ORDER BY last_used LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+    def invalidate(self):
+        """Drops every entry that does not belong to the current model/category namespace."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM categories WHERE namespace != ?", (self.namespace,))
+            conn.commit()
+
+    def record_provider_call(self, seconds: float, files: int = 1):
+        self.provider_calls += files
+        self.provider_seconds += seconds
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        avg_latency = self.provider_seconds / self.provider_calls if self.provider_calls else 0.0
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "avg_provider_latency": avg_latency,
+            "saved_seconds": self.hits * avg_latency,
+            "saved_calls": self.hits
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
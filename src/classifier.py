@@ -0,0 +1,190 @@
+import os
+import re
+import zlib
+import threading
+from typing import Optional, Dict, List, Tuple
+
+from src.lazy import LazyModule, installed
+
+# Optional: without NumPy every file simply goes to the AI. Imported on first use, not at startup.
+np = LazyModule("numpy") if installed("numpy") else None
+
+MODEL_VERSION = 2  # bumped when the training data changes meaning; older model files are retrained from history
+# Moves whose category the AI chose (live or from its cache) or a person corrected. The classifier's own answers,
+# rule matches and the Other/Misc fallback would only teach it to repeat itself.
+LEARN_FROM = ("llm", "cache", "user")
+FALLBACK = "Other/Misc"
+
+DIGITS = re.compile(r"\d+")
+SPLIT = re.compile(r"[^a-z0-9#]+")
+
+class FilenameClassifier:
+    """Multinomial naive Bayes over hashed filename tokens and character 3-grams, trained from move history.
+
+    Answers locally only when its posterior for the best folder/subfolder clears `threshold`;
+    everything else is left to the AI. Only moves in LEARN_FROM are examples; undoing one of them
+    feeds it back as a negative example.
+    """
+
+    def __init__(self, model_file: str = "classifier.npz", n_features: int = 2 ** 16, threshold: float = 0.9,
+                 min_examples: int = 50, alpha: float = 0.1):
+        self.available = np is not None
+        self.model_file = model_file
+        self.n_features = n_features
+        self.threshold = threshold
+        self.min_examples = min_examples
+        self.alpha = alpha
+        self.labels: List[str] = []
+        self.label_index: Dict[str, int] = {}
+        self.feature_counts = None  # allocated with the first class, so NumPy loads on first use
+        self.class_counts = None
+        self.feature_totals = None
+        self.last_id = 0
+        self.trained = False
+        self.answered = 0
+        self.deferred = 0
+        self._dirty = 0
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def features(filename: str) -> List[str]:
+        name = DIGITS.sub("#", filename.lower())
+        base, ext = os.path.splitext(name)
+        padded = f"^{base}$"
+        return ([f"ext:{ext}"] + [f"tok:{t}" for t in SPLIT.split(base) if t]
+                + [f"ng:{padded[i:i + 3]}" for i in range(len(padded) - 2)])
+
+    def _vectorize(self, filename: str):
+        hashed = [zlib.crc32(f.encode("utf-8")) % self.n_features for f in self.features(filename)]
+        return np.unique(np.array(hashed, dtype=np.int64), return_counts=True)
+
+    def _class_row(self, label: str) -> int:
+        if label not in self.label_index:
+            if self.feature_counts is None:
+                self.feature_counts = np.zeros((0, self.n_features), dtype=np.float32)
+                self.class_counts = np.zeros(0)
+                self.feature_totals = np.zeros(0)
+            self.label_index[label] = len(self.labels)
+            self.labels.append(label)
+            self.feature_counts = np.vstack([self.feature_counts, np.zeros((1, self.n_features), dtype=np.float32)])
+            self.class_counts = np.append(self.class_counts, 0.0)
+            self.feature_totals = np.append(self.feature_totals, 0.0)
+        return self.label_index[label]
+
+    def learn(self, filename: str, label: str, weight: float = 1.0):
+        """Adds (weight > 0) or removes (weight < 0) one filename -> label example."""
+        if not self.available:
+            return
+        idx, counts = self._vectorize(filename)
+        with self._lock:
+            if weight < 0 and label not in self.label_index:
+                return
+            row = self._class_row(label)
+            old = self.feature_counts[row, idx]
+            new = np.maximum(old + weight * counts, 0)
+            self.feature_counts[row, idx] = new
+            self.feature_totals[row] += float((new - old).sum())
+            self.class_counts[row] = max(self.class_counts[row] + weight, 0.0)
+            self._dirty += 1
+
+    def predict(self, filename: str) -> Tuple[Optional[str], float]:
+        if not self.available:
+            return None, 0.0
+        idx, counts = self._vectorize(filename)
+        with self._lock:
+            if not self.labels or self.class_counts.sum() < self.min_examples:
+                return None, 0.0
+            totals = self.feature_totals
+            log_prior = np.log(self.class_counts + 1) - np.log(self.class_counts.sum() + len(self.labels))
+            log_likelihood = (np.log(self.feature_counts[:, idx] + self.alpha)
+                              - np.log(totals + self.alpha * self.n_features)[:, None]) @ counts
+        scores = log_prior + log_likelihood
+        probs = np.exp(scores - scores.max())
+        probs /= probs.sum()
+        best = int(np.argmax(probs))
+        return self.labels[best], float(probs[best])
+
+    def classify(self, filename: str) -> Optional[Dict]:
+        """Returns a category when confident enough, otherwise None (the caller asks the AI)."""
+        label, confidence = self.predict(filename)
+        if label is None or confidence < self.threshold:
+            self.deferred += 1
+            return None
+        self.answered += 1
+        folder, _, subfolder = label.partition("/")
+        return {"folder": folder, "subfolder": subfolder or "Misc"}
+
+    @staticmethod
+    def trainable(entry: Dict) -> bool:
+        return entry.get("source") in LEARN_FROM and entry.get("category") != FALLBACK
+
+    def train_from_history(self, history):
+        """Replays journal entries newer than the last one seen; cheap to call repeatedly."""
+        if not self.available:
+            return
+        with self._lock:
+            if not self.trained:
+                self.load()
+            while True:
+                entries = history.entries_after(self.last_id, 1000)
+                if not entries:
+                    break
+                for entry in entries:
+                    if self.trainable(entry):
+                        self.learn(entry["filename"], entry["category"])
+                self.last_id = entries[-1]["id"]
+            self.trained = True
+            if self._dirty:
+                self.save()
+
+    def observe(self, event: str, entry: Dict):
+        """History subscriber: live moves are positive examples, undos are negative ones."""
+        with self._lock:
+            if not self.trained:
+                return  # train_from_history() will replay this entry
+            if event == "added":
+                if self.trainable(entry):
+                    self.learn(entry["filename"], entry["category"])
+                self.last_id = max(self.last_id, entry["id"])
+            elif event == "undone" and entry["id"] <= self.last_id and self.trainable(entry):
+                self.learn(entry["filename"], entry["category"], weight=-1.0)
+            if self._dirty >= 500:
+                self.save()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            examples = float(self.class_counts.sum()) if self.class_counts is not None else 0.0
+        return {"available": self.available, "examples": int(examples), "classes": len(self.labels),
+                "answered": self.answered, "deferred": self.deferred}
+
+    def save(self):
+        if not self.available or not self.model_file or self.feature_counts is None:
+            return
+        tmp = self.model_file + ".tmp"
+        try:
+            with self._lock, open(tmp, "wb") as f:
+                np.savez(f, labels=np.array(self.labels, dtype=str), feature_counts=self.feature_counts,
+                         class_counts=self.class_counts, last_id=np.array([self.last_id]), version=np.array([MODEL_VERSION]))
+                self._dirty = 0
+            os.replace(tmp, self.model_file)
+        except Exception as e:
+            print(f"Error saving classifier: {e}")
+
+    def load(self):
+        if not self.available or not self.model_file or not os.path.exists(self.model_file):
+            return
+        try:
+            with np.load(self.model_file) as data:
+                if data["feature_counts"].shape[1] != self.n_features:
+                    return  # feature space changed; retrain from history
+                if "version" not in data.files or int(data["version"][0]) != MODEL_VERSION:
+                    return  # trained on unfiltered history; retrain
+                with self._lock:
+                    self.labels = [str(label) for label in data["labels"]]
+                    self.label_index = {label: i for i, label in enumerate(self.labels)}
+                    self.feature_counts = data["feature_counts"].astype(np.float32)
+                    self.class_counts = data["class_counts"].astype(np.float64)
+                    self.feature_totals = self.feature_counts.sum(axis=1, dtype=np.float64)
+                    self.last_id = int(data["last_id"][0])
+        except Exception as e:
+            print(f"Error loading classifier: {e}")
@@ -1,7 +1,10 @@
 import json
 import os
 import sys
-from typing import Dict, Any
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Set
 
 CONFIG_FILE = "config.json"
 
@@ -17,9 +20,33 @@ DEFAULT_CONFIG: Dict[str, Any] = {
     "target_folder": "",
     "categories": ["School", "Dev Tools", "Books", "Media", "Installers", "Work"],
     "auto_categories": True,
+    "rules": [],  # e.g. {"extensions": [".exe"], "globs": ["setup*"], "folder": "Installers", "subfolder": "Windows"}
     "auto_start": False,
     "theme": "Dark",
-    "inplace_organization": True
+    "inplace_organization": True,
+    "batch_size": 25,
+    "scan_recursive": False,  # ignored for in-place organization, which sorts into subfolders of the source
+    "scan_exclude": [".git", "node_modules", "__pycache__"],  # also skipped by the watcher
+    "snapshot_file": "folder_snapshot.db",  # what each watched folder held at exit, to catch up on start; "" disables
+    "snapshot_interval": 60,  # seconds between snapshot saves while watching, so a crash or reboot loses little
+    "watch_recursive": False,  # watch subfolders too; our own output folders are never re-sorted
+    "scan_chunk_size": 500,
+    "max_in_flight": 4,
+    "rate_limits": {},  # per provider, e.g. {"gemini": {"rpm": 15, "tpm": 1000000, "concurrency": 4}}
+    "max_retries": 4,  # retries of 429/5xx responses, with jittered exponential backoff
+    "route_models": [],  # extra models (e.g. "gpt-4o-mini") to route to when faster or when model_name is failing
+    "hedge_requests": False,  # race a second model when a request outlives its p95 latency
+    "metrics_port": 0,  # serve /metrics and /metrics.json on 127.0.0.1:<port>; 0 disables
+    "control_address": "",  # headless daemon control socket path or host:port; "" = sortai.sock next to config.json
+    "watcher_workers": 2,
+    "shard_processes": 0,  # headless daemon: split source_folders over this many worker processes (0/1 = one process)
+    "copies_per_device": 2,  # parallel cross-filesystem copies per destination disk
+    "coalesce_window": 1.0,
+    "stability_max_interval": 30.0,
+    "cache_max_entries": 10000,
+    "cache_ttl_days": 30,
+    "classifier_threshold": 0.9,
+    "classifier_min_examples": 50
 }
 
 class ConfigManager:
@@ -37,6 +64,9 @@ class ConfigManager:
         
         self.config_file = os.path.join(base_dir, config_file)
         self.config = self.load_config()
+        self._lock = threading.RLock()
+        self._depth = 0  # open transaction() blocks; set() only writes once the outermost one closes
+        self._dirty = False
 
     def load_config(self) -> Dict[str, Any]:
         if not os.path.exists(self.config_file):
@@ -49,16 +79,60 @@ class ConfigManager:
             return DEFAULT_CONFIG.copy()
 
     def save_config(self, config: Dict[str, Any]) -> None:
+        """Writes config to a temp file and renames it over config.json, so a crash never leaves it half written."""
         self.config = config
+        directory = os.path.dirname(self.config_file) or "."
         try:
-            with open(self.config_file, 'w') as f:
-                json.dump(config, f, indent=4)
-        except IOError as e:
+            fd, temp = tempfile.mkstemp(prefix=".config-", suffix=".tmp", dir=directory)
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(config, f, indent=4)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp, self.config_file)
+            except BaseException:
+                os.unlink(temp)
+                raise
+        except (IOError, OSError) as e:
             print(f"Error saving config: {e}")
 
     def get(self, key: str) -> Any:
         return self.config.get(key, DEFAULT_CONFIG.get(key))
 
     def set(self, key: str, value: Any) -> None:
-        self.config[key] = value
-        self.save_config(self.config)
+        self.update({key: value})
+
+    def update(self, values: Dict[str, Any]) -> Set[str]:
+        """Applies several settings with a single write. Returns the keys whose value actually changed."""
+        with self._lock:
+            changed = {key for key, value in values.items() if key not in self.config or self.config[key] != value}
+            self.config.update(values)
+            if changed:
+                self._dirty = True
+            if self._depth == 0 and self._dirty:
+                self._dirty = False
+                self.save_config(self.config)
+            return changed
+
+    @contextmanager
+    def transaction(self):
+        """Groups set()/update() calls into one write when the block exits; an exception restores the old values.
+
+        The dict is changed in place, so callers holding a reference to `config` see the new values.
+        """
+        with self._lock:
+            backup = json.loads(json.dumps(self.config))
+            self._depth += 1
+            try:
+                yield self.config
+            except BaseException:
+                self.config.clear()
+                self.config.update(backup)
+                if self._depth == 1:
+                    self._dirty = False
+                raise
+            finally:
+                self._depth -= 1
+            if self._depth == 0 and self._dirty:
+                self._dirty = False
+                self.save_config(self.config)
@@ -0,0 +1,317 @@
+import os
+import re
+import sys
+import json
+import time
+import signal
+import socket
+import threading
+import socketserver
+from typing import Dict, Optional
+from src.config import ConfigManager
+from src.sorter import FileSorter
+from src.watcher import FolderWatcher
+from src.shards import ShardedWatcher
+from src.scanner import ManualScanner
+from src.history import HistoryStore
+from src.metrics import MetricsServer
+
+COMMANDS = ("status", "pause", "resume", "scan", "reload", "stop")
+TCP_ADDRESS = re.compile(r"^([\w.\-]+):(\d+)$")
+# Watcher settings fixed when a FolderWatcher is built; changing one of these on reload means a new watcher
+WATCHER_REBUILD_KEYS = ("watcher_workers", "coalesce_window", "stability_max_interval", "snapshot_file", "snapshot_interval",
+                        "shard_processes")
+
+def default_control_address(config_file: str) -> str:
+    """A Unix socket next to config.json, or a localhost port where Unix sockets are unavailable."""
+    if hasattr(socket, "AF_UNIX"):
+        return os.path.join(os.path.dirname(os.path.abspath(config_file)), "sortai.sock")
+    return "127.0.0.1:47613"
+
+def _tcp(address: str):
+    match = TCP_ADDRESS.match(address)
+    return (match.group(1), int(match.group(2))) if match else None
+
+def send_command(address: str, command: str, timeout: float = 10.0) -> Dict:
+    """Sends one control command to a running daemon and returns its JSON reply."""
+    tcp = _tcp(address)
+    sock = socket.socket(socket.AF_INET if tcp else socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(tcp or address)
+        sock.sendall((command + "\n").encode("utf-8"))
+        with sock.makefile("rb") as reply:
+            return json.loads(reply.readline() or b"{}")
+    finally:
+        sock.close()
+
+class _ControlHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline(4096).decode("utf-8", "replace").strip()
+        try:
+            reply = self.server.owner.command(line)
+        except Exception as e:
+            reply = {"ok": False, "error": str(e)}
+        self.wfile.write((json.dumps(reply, default=str) + "\n").encode("utf-8"))
+
+class ControlServer:
+    """Line-oriented JSON control endpoint: one command per connection, one JSON reply."""
+
+    def __init__(self, address: str, owner):
+        self.address = address
+        self.owner = owner
+        self.server = None
+        self.thread = None
+
+    def start(self):
+        tcp = _tcp(self.address)
+        if tcp:
+            socketserver.ThreadingTCPServer.allow_reuse_address = True
+            self.server = socketserver.ThreadingTCPServer(tcp, _ControlHandler)
+        else:
+            self._remove_stale_socket()
+            self.server = socketserver.ThreadingUnixStreamServer(self.address, _ControlHandler)
+            os.chmod(self.address, 0o600)  # only the owning user may pause or scan
+        self.server.daemon_threads = True
+        self.server.owner = self.owner
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True, name="SortAI-control")
+        self.thread.start()
+        print(f"Control socket on {self.address}")
+
+    def _remove_stale_socket(self):
+        if not os.path.exists(self.address):
+            return
+        try:
+            send_command(self.address, "status", timeout=1)
+        except OSError:
+            os.remove(self.address)  # left behind by a daemon that did not shut down cleanly
+            return
+        raise RuntimeError(f"Another SortAI daemon is already listening on {self.address}")
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+            if not _tcp(self.address) and os.path.exists(self.address):
+                os.remove(self.address)
+
+def _process_usage() -> Dict:
+    """Resident memory and CPU seconds of this process, where the platform exposes them."""
+    usage = {"cpu_seconds": round(time.process_time(), 3), "rss_mb": None}
+    try:
+        with open("/proc/self/statm", "r") as f:
+            usage["rss_mb"] = round(int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+    except (OSError, ValueError, AttributeError):
+        pass
+    return usage
+
+class SortAIDaemon:
+    """Runs the watcher and sorter from config.json with no UI toolkit.
+
+    SIGTERM/SIGINT drain the queue and exit, SIGHUP reloads config.json, and the control socket
+    accepts status, pause, resume, scan, reload and stop.
+    """
+
+    def __init__(self, config_manager: ConfigManager, control_address: Optional[str] = None,
+                 sorter: Optional[FileSorter] = None):
+        self.config_manager = config_manager
+        self.config = config_manager.config
+        self.sorter = sorter or FileSorter.from_config(self.config)
+        self.control_address = control_address or self.config.get("control_address") \
+            or default_control_address(config_manager.config_file)
+        self.control = None
+        self.watcher = None
+        self.metrics_server = None
+        self.paused = False
+        self.scan_thread = None
+        self.scan_session = None
+        self.scan_files = 0
+        self.started_at = time.time()
+        self._lock = threading.RLock()  # serializes watcher changes between signals and control commands
+        self._wake = threading.Event()
+        self._stop_requested = False
+        self._reload_requested = False
+        self._cancel_scan = False
+
+    def start_watcher(self):
+        with self._lock:
+            if self.watcher:
+                self.watcher.stop()
+                self.watcher = None
+            sources = self.config.get("source_folders", [])
+            if not sources:
+                print("No source_folders configured; waiting for a reload.")
+                return
+            processes = self.config.get("shard_processes", 0)
+            if processes > 1 and len(sources) > 1:
+                self.watcher = ShardedWatcher(sources, self.config.get("target_folder"), self.sorter, self.config, processes,
+                                              inplace=self.config.get("inplace_organization", True))
+                self.watcher.start()
+                return
+            self.watcher = FolderWatcher.from_config(self.config, self.sorter)
+            self.watcher.start()
+
+    def stop_watcher(self, drain: bool = True):
+        with self._lock:
+            if self.watcher:
+                self.watcher.stop(drain=drain)
+                self.watcher = None
+
+    def pause(self) -> Dict:
+        """Stops watching (queued files are finished first); a scan after resume picks up what was missed."""
+        with self._lock:
+            self.paused = True
+            self.stop_watcher(drain=True)
+        return {"ok": True, "paused": True}
+
+    def resume(self) -> Dict:
+        with self._lock:
+            if self.paused:
+                self.paused = False
+                self.start_watcher()
+        return {"ok": True, "paused": False}
+
+    def reload(self) -> Dict:
+        """Re-reads config.json and applies it to the sorter and watcher.
+
+        Sorter settings are swapped live. A running FolderWatcher only (un)schedules the folders that
+        changed, keeping queued files; it is rebuilt when a WATCHER_REBUILD_KEYS setting changed or
+        when sharding is involved.
+        """
+        with self._lock:
+            previous = self.config
+            self.config = self.config_manager.config = self.config_manager.load_config()
+            self.sorter.apply_config(self.config)
+            if not self.paused:
+                sources = self.config.get("source_folders", [])
+                sharded = self.config.get("shard_processes", 0) > 1 and len(sources) > 1
+                if isinstance(self.watcher, FolderWatcher) and sources and not sharded and \
+                        all(previous.get(key) == self.config.get(key) for key in WATCHER_REBUILD_KEYS):
+                    self.watcher.update_folders(sources, self.config.get("target_folder"),
+                                                self.config.get("inplace_organization", True),
+                                                recursive=self.config.get("watch_recursive", False),
+                                                exclude=self.config.get("scan_exclude", []))
+                else:
+                    self.start_watcher()
+        print("Configuration reloaded.")
+        return {"ok": True, "reloaded": True}
+
+    def scan(self) -> Dict:
+        """Starts a manual scan of every source folder in the background (one at a time)."""
+        with self._lock:
+            if self.scan_thread and self.scan_thread.is_alive():
+                return {"ok": False, "error": "a scan is already running", "session": self.scan_session}
+            sources = self.config.get("source_folders", [])
+            inplace = self.config.get("inplace_organization", True)
+            target = self.config.get("target_folder")
+            if not sources or not (inplace or target):
+                return {"ok": False, "error": "need source_folders and a target_folder or in-place organization"}
+            self.scan_session = HistoryStore.new_session("scan")
+            self.scan_files = 0
+            self._cancel_scan = False
+            self.scan_thread = threading.Thread(target=self._run_scan, args=(sources, target, inplace, self.scan_session),
+                                                daemon=True, name="SortAI-scan")
+            self.scan_thread.start()
+        return {"ok": True, "session": self.scan_session}
+
+    def _run_scan(self, sources, target, inplace, session):
+        scanner = ManualScanner.for_sources(sources, target, inplace,
+                                            recursive=self.config.get("scan_recursive", False),
+                                            exclude=self.config.get("scan_exclude", []),
+                                            chunk_size=self.config.get("scan_chunk_size", 500))
+        try:
+            for source, files in scanner.chunks():
+                self.sorter.organize_many(files, source if inplace else target, session=session)
+                self.scan_files = scanner.files_seen
+                if self._cancel_scan:
+                    scanner.save_checkpoint()
+                    print(f"Scan {session} interrupted; its checkpoint resumes it next time.")
+                    return
+            print(f"Scan {session} finished: {scanner.files_seen} files.")
+        except Exception as e:
+            print(f"Scan error: {e}")
+
+    def status(self) -> Dict:
+        scanning = bool(self.scan_thread and self.scan_thread.is_alive())
+        return {
+            "ok": True,
+            "pid": os.getpid(),
+            "uptime": round(time.time() - self.started_at, 1),
+            "paused": self.paused,
+            "watching": self.watcher.source_folders if self.watcher else [],
+            "watcher": self.watcher.stats() if self.watcher else None,
+            "scan": {"running": scanning, "session": self.scan_session, "files": self.scan_files},
+            "moves": self.sorter.move_stats(),
+            "cache": self.sorter.cache_stats(),
+            "rate": self.sorter.rate_stats(),
+            "process": _process_usage(),
+        }
+
+    def command(self, line: str) -> Dict:
+        name = line.split()[0].lower() if line.split() else ""
+        if name == "status":
+            return self.status()
+        if name == "pause":
+            return self.pause()
+        if name == "resume":
+            return self.resume()
+        if name == "scan":
+            return self.scan()
+        if name == "reload":
+            return self.reload()
+        if name == "stop":
+            self.request_stop()
+            return {"ok": True, "stopping": True}
+        return {"ok": False, "error": f"unknown command {name!r}; expected one of {', '.join(COMMANDS)}"}
+
+    def request_stop(self, *_):
+        self._stop_requested = True
+        self._wake.set()
+
+    def request_reload(self, *_):
+        self._reload_requested = True
+        self._wake.set()
+
+    def _install_signals(self):
+        signal.signal(signal.SIGTERM, self.request_stop)
+        signal.signal(signal.SIGINT, self.request_stop)
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, self.request_reload)
+
+    def run(self, install_signals: bool = True):
+        """Blocks until stopped. Signal handlers only set flags; the work happens on this thread."""
+        if install_signals:
+            self._install_signals()
+        self.control = ControlServer(self.control_address, self)
+        self.control.start()
+        self.metrics_server = MetricsServer.from_config(self.config)
+        self.start_watcher()
+        # No sorter.warm_up() here: an idle server should not hold the provider SDK in memory before the first file
+        print(f"SortAI daemon running (pid {os.getpid()}).")
+        try:
+            while not self._stop_requested:
+                self._wake.wait()  # no polling: idle means no wakeups at all
+                self._wake.clear()
+                if self._reload_requested and not self._stop_requested:
+                    self._reload_requested = False
+                    self.reload()
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        """Drains the watcher queue, lets a running scan finish its chunk, then closes everything."""
+        print("Shutting down: draining queued files...")
+        if self.control:
+            self.control.stop()
+            self.control = None
+        self._cancel_scan = True
+        self.stop_watcher(drain=True)
+        if self.scan_thread:
+            self.scan_thread.join()
+        if self.metrics_server:
+            self.metrics_server.stop()
+        if self.sorter.classifier:
+            self.sorter.classifier.save()
+        self.sorter.history.close()
+        sys.stdout.flush()
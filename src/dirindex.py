@@ -0,0 +1,118 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+from src.metrics import COLLISIONS
+
+class DirectoryIndex:
+    """In-memory view of destination directories used for mkdir caching and collision suffixes.
+
+    Each directory is listed once with os.scandir the first time we move into it and is then
+    kept in sync with our own moves, so picking `name_N` is a set lookup rather than a stat
+    per candidate. The least recently used directories are dropped beyond `max_dirs`.
+    Names are compared case-folded where the filesystem ignores case (Windows, macOS), so
+    `Report.pdf` and `report.PDF` count as the same file there.
+    """
+
+    def __init__(self, max_dirs: int = 2048, case_insensitive: bool = None):
+        self.max_dirs = max_dirs
+        if case_insensitive is None:
+            case_insensitive = os.name == "nt" or sys.platform == "darwin"
+        self.case_insensitive = case_insensitive
+        self.dirs = OrderedDict()  # {directory: (names, next_suffix)}
+        self.scans = 0
+        self._lock = threading.Lock()
+
+    def _key(self, name: str) -> str:
+        return name.casefold() if self.case_insensitive else name
+
+    def _state(self, directory: str):
+        state = self.dirs.get(directory)
+        if state is None:
+            names = set()
+            try:
+                with os.scandir(directory) as entries:
+                    names = {self._key(entry.name) for entry in entries}
+            except FileNotFoundError:
+                pass
+            self.scans += 1
+            state = (names, {})
+            self.dirs[directory] = state
+            if len(self.dirs) > self.max_dirs:
+                self.dirs.popitem(last=False)
+        else:
+            self.dirs.move_to_end(directory)
+        return state
+
+    def ensure_dir(self, directory: str):
+        """os.makedirs, but only the first time we see a directory."""
+        with self._lock:
+            if directory in self.dirs:
+                self.dirs.move_to_end(directory)
+                return
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            self._state(directory)
+
+    def allocate(self, directory: str, filename: str) -> str:
+        """Reserves and returns a free path for filename in directory, adding _1, _2, ... on collisions."""
+        with self._lock:
+            names, next_suffix = self._state(directory)
+            candidate = filename
+            if self._key(candidate) in names:
+                COLLISIONS.inc()
+                base, ext = os.path.splitext(filename)
+                # Resume from the last suffix handed out for this name instead of probing from _1
+                counter = next_suffix.get(self._key(filename), 1)
+                candidate = f"{base}_{counter}{ext}"
+                while self._key(candidate) in names:
+                    counter += 1
+                    candidate = f"{base}_{counter}{ext}"
+                next_suffix[self._key(filename)] = counter + 1
+            names.add(self._key(candidate))
+            return os.path.join(directory, candidate)
+
+    def probe(self, directory: str, filename: str) -> str:
+        """Like allocate, but checks each candidate with os.path.exists.
+
+        Used after a move collided anyway, when the listing is known to be out of date.
+        """
+        with self._lock:
+            names, _ = self._state(directory)
+            base, ext = os.path.splitext(filename)
+            candidate, counter = filename, 0
+            while self._key(candidate) in names or os.path.exists(os.path.join(directory, candidate)):
+                names.add(self._key(candidate))
+                counter += 1
+                candidate = f"{base}_{counter}{ext}"
+            names.add(self._key(candidate))
+            return os.path.join(directory, candidate)
+
+    def claim(self, path: str) -> bool:
+        """Reserves an exact path if it is free. Returns False if the name is taken."""
+        directory, name = os.path.split(path)
+        with self._lock:
+            names, _ = self._state(directory)
+            if self._key(name) in names:
+                return False
+            names.add(self._key(name))
+            return True
+
+    def add(self, path: str):
+        """Records a file that appeared in an indexed directory (e.g. restored by undo)."""
+        directory, name = os.path.split(path)
+        with self._lock:
+            if directory in self.dirs:
+                self.dirs[directory][0].add(self._key(name))
+
+    def release(self, path: str):
+        """Forgets a name: the reserved move failed or the file was moved away."""
+        directory, name = os.path.split(path)
+        with self._lock:
+            if directory in self.dirs:
+                self.dirs[directory][0].discard(self._key(name))
+
+    def forget(self, directory: str):
+        """Drops a directory whose on-disk state no longer matches (someone else changed it)."""
+        with self._lock:
+            self.dirs.pop(directory, None)
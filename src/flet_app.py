@@ -1,12 +1,13 @@
 import flet as ft
-import os
-import json
 import threading
 import time
 import asyncio
 from src.config import ConfigManager
 from src.sorter import FileSorter
 from src.watcher import FolderWatcher
+from src.scanner import ManualScanner
+from src.history import HistoryStore
+from src.metrics import MetricsServer
 
 # --- DESIGN TOKENS ---
 ACCENT_BLUE = "#1978E5"
@@ -16,18 +17,17 @@ BORDER_RADIUS = 32
 TEXT_PRIMARY = "#1A1C1E"
 TEXT_SECONDARY = "#6C727A"
 
+HISTORY_PAGE = 100    # entries fetched per "Load Older" click
+HISTORY_WINDOW = 500  # live inserts beyond this drop the oldest rendered tile
+
 class SortAIFletApp:
     def __init__(self):
         self.config_manager = ConfigManager()
         self.config = self.config_manager.config
-        self.sorter = FileSorter(
-            api_key=self.config.get("api_key", ""),
-            model_name=self.config.get("model_name", "gemini/gemini-2.0-flash"),
-            categories=self.config.get("categories", []),
-            auto_categories=self.config.get("auto_categories", True)
-        )
+        self.sorter = FileSorter.from_config(self.config)
         self.watcher = None
         self.page = None
+        self.metrics_server = MetricsServer.from_config(self.config)
 
     async def breathe_animation(self):
         while True:
@@ -155,7 +155,9 @@ class SortAIFletApp:
 
         asyncio.create_task(self.breathe_animation())
         self.refresh_history()
+        self.sorter.history.subscribe(self.on_history_event)
         if self.config.get("source_folders"): self.start_watcher_logic()
+        self.sorter.warm_up()  # the page is up; load the AI SDK in the background
 
     def nav_to(self, idx):
         # UI Refresh for Sidebar
@@ -172,7 +174,11 @@ class SortAIFletApp:
             content=ft.Column([
                 ft.Text("History", size=32, weight="bold", color=TEXT_PRIMARY),
                 ft.Container(self.history_list, expand=True, bgcolor=CARD_WHITE, border_radius=BORDER_RADIUS, shadow=ft.BoxShadow(blur_radius=10, color=ft.Colors.with_opacity(0.05, "black"))),
-                ft.ElevatedButton("Undo Last Action", icon=ft.Icons.UNDO, bgcolor=ACCENT_BLUE, color="white", on_click=self.undo_last, style=ft.ButtonStyle(shape=ft.RoundedRectangleBorder(radius=12)))
+                ft.Row([
+                    ft.ElevatedButton("Undo Last Action", icon=ft.Icons.UNDO, bgcolor=ACCENT_BLUE, color="white", on_click=self.undo_last, style=ft.ButtonStyle(shape=ft.RoundedRectangleBorder(radius=12))),
+                    ft.OutlinedButton("Undo Last Scan", icon=ft.Icons.RESTORE, on_click=self.undo_last_scan, style=ft.ButtonStyle(shape=ft.RoundedRectangleBorder(radius=12))),
+                    ft.TextButton("Load Older", icon=ft.Icons.HISTORY, on_click=self.load_older_history)
+                ], spacing=10)
             ], spacing=20),
             padding=40, expand=True
         )
@@ -193,24 +199,37 @@ class SortAIFletApp:
             padding=40, expand=True
         )
 
+    def history_tile(self, entry):
+        return ft.Container(
+            content=ft.ListTile(
+                leading=ft.Icon(ft.Icons.FILE_COPY_ROUNDED, color=ACCENT_BLUE),
+                title=ft.Text(entry['filename'], size=14, weight="bold", color=TEXT_PRIMARY),
+                subtitle=ft.Text(f"Organized into {entry['category']}", size=12, color=TEXT_SECONDARY),
+            ),
+            bgcolor=CARD_WHITE, border_radius=16, border=ft.border.all(1, "#F0F2F5"),
+            data=entry['id']
+        )
+
     def refresh_history(self):
         self.history_list.controls.clear()
-        if os.path.exists("history.json"):
-            try:
-                with open("history.json", "r") as f:
-                    history = json.load(f)
-                    for entry in history:
-                        self.history_list.controls.append(
-                            ft.Container(
-                                content=ft.ListTile(
-                                    leading=ft.Icon(ft.Icons.FILE_COPY_ROUNDED, color=ACCENT_BLUE),
-                                    title=ft.Text(entry['filename'], size=14, weight="bold", color=TEXT_PRIMARY),
-                                    subtitle=ft.Text(f"Organized into {entry['category']}", size=12, color=TEXT_SECONDARY),
-                                ),
-                                bgcolor=CARD_WHITE, border_radius=16, border=ft.border.all(1, "#F0F2F5")
-                            )
-                        )
-            except: pass
+        self.load_older_history()
+
+    def load_older_history(self, e=None):
+        controls = self.history_list.controls
+        try:
+            before = controls[-1].data if controls else None
+            controls.extend(self.history_tile(entry) for entry in self.sorter.history.page(limit=HISTORY_PAGE, before_id=before))
+        except: pass
+        if self.page: self.page.update()
+
+    def on_history_event(self, event, entry):
+        controls = self.history_list.controls
+        if event == "added":
+            controls.insert(0, self.history_tile(entry))
+            if len(controls) > HISTORY_WINDOW:
+                controls.pop()
+        elif event == "undone":
+            self.history_list.controls = [c for c in controls if c.data != entry['id']]
         if self.page: self.page.update()
 
     def start_manual_scan(self, e):
@@ -222,13 +241,15 @@ class SortAIFletApp:
             if not sources: return
             self.status_text.value = "Scanning..."
             self.page.update()
-            for s in sources:
-                if os.path.exists(s):
-                    files = [f for f in os.listdir(s) if os.path.isfile(os.path.join(s, f))]
-                    for f in files:
-                        self.sorter.organize_file(os.path.join(s, f), s if inplace else target)
-                        self.refresh_history()
-            self.status_text.value = "Scan Complete"
+            scanner = ManualScanner.for_sources(sources, target, inplace,
+                                                recursive=self.config.get("scan_recursive", False),
+                                                exclude=self.config.get("scan_exclude", []),
+                                                chunk_size=self.config.get("scan_chunk_size", 500))
+            session = HistoryStore.new_session("scan")
+            for s, files in scanner.chunks():
+                self.sorter.organize_many(files, s if inplace else target, session=session)
+            stats = self.sorter.cache_stats()
+            self.status_text.value = f"Scan Complete ({stats.get('hits', 0)} cache hits)"
             self.page.update()
             time.sleep(2)
             self.status_text.value = "System Active"
@@ -242,38 +263,44 @@ class SortAIFletApp:
         target = self.target_field.value.strip()
         inplace = self.inplace_chk.value
         
-        self.config_manager.set("api_key", api_key)
-        self.config_manager.set("source_folders", sources)
-        self.config_manager.set("target_folder", target)
-        self.config_manager.set("inplace_organization", inplace)
+        self.config_manager.update({"api_key": api_key, "source_folders": sources, "target_folder": target,
+                                    "inplace_organization": inplace})
         
-        self.sorter.api_key = api_key
+        self.sorter.apply_config(self.config)
         self.start_watcher_logic()
         self.page.snack_bar = ft.SnackBar(ft.Text("Preferences Saved Successfully"))
         self.page.snack_bar.open = True
         self.page.update()
 
     def undo_last(self, e):
-        if os.path.exists("history.json"):
-            with open("history.json", 'r') as f:
-                history = json.load(f)
-            if history:
-                if self.sorter.undo_move(history[0]):
-                    history.pop(0)
-                    with open("history.json", 'w') as f:
-                        json.dump(history, f, indent=4)
-                    self.refresh_history()
-                    self.page.snack_bar = ft.SnackBar(ft.Text("Action Undone"))
-                    self.page.snack_bar.open = True
-                    self.page.update()
+        if self.sorter.undo_last():
+            self.page.snack_bar = ft.SnackBar(ft.Text("Action Undone"))
+            self.page.snack_bar.open = True
+            self.page.update()
+
+    def undo_last_scan(self, e):
+        def run():
+            undone = self.sorter.undo_last_session("scan")
+            self.page.snack_bar = ft.SnackBar(ft.Text(f"Scan Undone ({len(undone)} files restored)" if undone else "No scan to undo"))
+            self.page.snack_bar.open = True
+            self.page.update()
+
+        threading.Thread(target=run, daemon=True).start()
 
     def start_watcher_logic(self):
-        if self.watcher: self.watcher.stop()
         sources = self.config.get("source_folders", [])
         target = self.config.get("target_folder")
         inplace = self.config.get("inplace_organization", True)
+        if self.watcher and sources:
+            # Reschedule only the folders that changed; queued and settling files are kept
+            self.watcher.update_folders(sources, target, inplace, recursive=self.config.get("watch_recursive", False),
+                                        exclude=self.config.get("scan_exclude", []))
+            return
+        if self.watcher:
+            self.watcher.stop()
+            self.watcher = None
         if sources:
-            self.watcher = FolderWatcher(sources, target, self.sorter, on_move_callback=self.refresh_history, inplace=inplace)
+            self.watcher = FolderWatcher.from_config(self.config, self.sorter)
             self.watcher.start()
             self.status_text.value = "Surveillance On"
             if self.page: self.page.update()
@@ -1,17 +1,19 @@
 import customtkinter as ctk
-import pystray
-from PIL import Image, ImageDraw
 import threading
 import sys
 import os
-import json
 import time
 from tkinter import messagebox, filedialog
 from src.config import ConfigManager
 from src.sorter import FileSorter
 from src.watcher import FolderWatcher
-from plyer import notification
-import winreg as reg
+from src.rules import parse_rule_line, format_rule
+from src.scanner import ManualScanner
+from src.history import HistoryStore
+from src.metrics import MetricsServer, stage_averages
+
+HISTORY_PAGE = 100    # entries fetched per "Load Older" click
+HISTORY_WINDOW = 500  # live inserts beyond this trim the oldest rendered line
 
 class SortAIApp(ctk.CTk):
     def __init__(self):
@@ -24,19 +26,13 @@ class SortAIApp(ctk.CTk):
         self.config_manager = ConfigManager()
         self.config = self.config_manager.config
 
-        self.sorter = FileSorter(
-            api_key=self.config.get("api_key", ""),
-            openai_key=self.config.get("openai_api_key", ""),
-            anthropic_key=self.config.get("anthropic_api_key", ""),
-            local_base_url=self.config.get("local_base_url", ""),
-            model_name=self.config.get("model_name", "gemini/gemini-2.0-flash"),
-            categories=self.config.get("categories", []),
-            auto_categories=self.config.get("auto_categories", True)
-        )
+        self.sorter = FileSorter.from_config(self.config)
         self.watcher = None
+        self.metrics_server = MetricsServer.from_config(self.config)
         
         self.setup_ui()
-        self.setup_tray()
+        self.icon = None  # tray icon, built by setup_tray() when first needed
+        self.after(500, self.sorter.warm_up)  # load the AI SDK once the window is showing
         
         if self.config.get("source_folders") and (self.config.get("target_folder") or self.config.get("inplace_organization")):
             self.start_watcher()
@@ -72,6 +68,20 @@ class SortAIApp(ctk.CTk):
         self.btn_scan = ctk.CTkButton(self.tab_dashboard, text="Run Manual Scan", command=self.scan_existing_files)
         self.btn_scan.grid(row=3, column=0, pady=20)
 
+        self.cache_info = ctk.CTkLabel(self.tab_dashboard, text="", text_color="gray")
+        self.cache_info.grid(row=4, column=0, pady=5)
+
+        self.stage_info = ctk.CTkLabel(self.tab_dashboard, text="", text_color="gray")
+        self.stage_info.grid(row=5, column=0, pady=5)
+
+    def refresh_cache_info(self):
+        stats = self.sorter.cache_stats()
+        local = self.sorter.classifier_stats()
+        if stats.get("hits") or stats.get("misses"):
+            self.cache_info.configure(text=f"Cache: {stats['hits']} hits / {stats['misses']} misses "
+                                           f"(~{stats['saved_seconds']:.0f}s of AI calls saved) · "
+                                           f"Local model answered {local.get('answered', 0)}")
+
     def setup_history_tab(self):
         self.tab_history.grid_columnconfigure(0, weight=1)
         self.tab_history.grid_rowconfigure(0, weight=1)
@@ -82,7 +92,14 @@ class SortAIApp(ctk.CTk):
         btn_frame.grid(row=1, column=0, pady=10)
         self.btn_undo = ctk.CTkButton(btn_frame, text="Undo Last Move", command=self.undo_last_move, fg_color="red", hover_color="darkred")
         self.btn_undo.pack(side="left", padx=10)
+        self.btn_undo_scan = ctk.CTkButton(btn_frame, text="Undo Last Scan", command=self.undo_last_scan, fg_color="red", hover_color="darkred")
+        self.btn_undo_scan.pack(side="left", padx=10)
+        self.btn_older = ctk.CTkButton(btn_frame, text="Load Older", command=self.load_older_history)
+        self.btn_older.pack(side="left", padx=10)
+        self.history_ids = []  # ids of rendered entries, newest first (line N+1 == history_ids[N])
         self.refresh_history()
+        # Entries are written on watcher/scan threads; hop to the Tk thread before touching widgets
+        self.sorter.history.subscribe(lambda event, entry: self.after(0, self.on_history_event, event, entry))
 
     def setup_rules_tab(self):
         self.tab_rules.grid_columnconfigure(1, weight=1)
@@ -95,6 +112,22 @@ class SortAIApp(ctk.CTk):
         self.cat_entry.insert(0, ", ".join(self.config.get("categories", [])))
         if self.auto_cat_var.get(): self.cat_entry.configure(state="disabled")
 
+        ctk.CTkLabel(self.tab_rules, text="Local Rules (checked before AI):").grid(row=2, column=0, padx=20, pady=(10, 0), sticky="nw")
+        ctk.CTkLabel(self.tab_rules, text="One per line, e.g.  *.exe, *.msi -> Installers/Windows   or   invoice*, re:\\d{4}, >10KB -> Work/Finance",
+                     text_color="gray").grid(row=3, column=0, columnspan=2, padx=20, sticky="w")
+        self.rules_box = ctk.CTkTextbox(self.tab_rules, height=200)
+        self.rules_box.grid(row=4, column=0, columnspan=2, padx=20, pady=10, sticky="ew")
+        self.rules_box.insert("1.0", "\n".join(format_rule(r) for r in self.config.get("rules", [])))
+        self.rule_info = ctk.CTkLabel(self.tab_rules, text="", text_color="gray")
+        self.rule_info.grid(row=5, column=0, columnspan=2, padx=20, sticky="w")
+
+    def refresh_rule_info(self):
+        stats = self.sorter.rule_stats()
+        if stats["llm_calls_avoided"]:
+            top = sorted(stats["rules"].items(), key=lambda kv: -kv[1])[:3]
+            self.rule_info.configure(text=f"Rules answered {stats['llm_calls_avoided']} files without AI · "
+                                          + ", ".join(f"{name.split('->')[-1].strip()}: {hits}" for name, hits in top))
+
     def setup_settings_tab(self):
         self.tab_settings.grid_columnconfigure(1, weight=1)
         
@@ -206,41 +239,35 @@ class SortAIApp(ctk.CTk):
 
     def save_pro_settings(self):
         provider = self.provider_combo.get()
-        model_name = self.model_combo.get().strip()
-        
+        sources = [s.strip() for s in self.folders_entry.get().split(",") if s.strip()]
+        values = {
+            "active_provider": provider.lower(),
+            "model_name": self.model_combo.get().strip(),
+            "source_folders": sources,
+            "target_folder": self.target_entry.get().strip(),
+            "auto_start": self.auto_start_var.get(),
+            "inplace_organization": self.inplace_var.get(),
+            "auto_categories": self.auto_cat_var.get(),
+            "categories": [c.strip() for c in self.cat_entry.get().split(",") if c.strip()],
+            "rules": [r for r in map(parse_rule_line, self.rules_box.get("1.0", "end").splitlines()) if r],
+        }
         if provider == "Local":
-            self.config_manager.set("local_base_url", self.local_url_entry.get().strip())
+            values["local_base_url"] = self.local_url_entry.get().strip()
         else:
             key_map = {"Gemini": "api_key", "OpenAI": "openai_api_key", "Anthropic": "anthropic_api_key"}
-            self.config_manager.set(key_map.get(provider), self.api_key_entry.get().strip())
-
-        sources = [s.strip() for s in self.folders_entry.get().split(",") if s.strip()]
-        target = self.target_entry.get().strip()
-        
-        self.config_manager.set("active_provider", provider.lower())
-        self.config_manager.set("model_name", model_name)
-        self.config_manager.set("source_folders", sources)
-        self.config_manager.set("target_folder", target)
-        self.config_manager.set("auto_start", self.auto_start_var.get())
-        self.config_manager.set("inplace_organization", self.inplace_var.get())
+            values[key_map.get(provider)] = self.api_key_entry.get().strip()
+        self.config_manager.update(values)  # one write for the whole form
         
         self.set_auto_start(self.auto_start_var.get())
         
-        # Load all keys for sorter
-        self.sorter.update_config(
-            self.config.get("api_key", ""),
-            self.config.get("openai_api_key", ""),
-            self.config.get("anthropic_api_key", ""),
-            self.config.get("local_base_url", ""),
-            model_name,
-            self.config.get("categories", []),
-            self.config.get("auto_categories", True)
-        )
+        # Swapped live: files being sorted right now finish with the old settings
+        self.sorter.apply_config(self.config)
         self.start_watcher()
         messagebox.showinfo("Success", "Settings persistent.")
 
     def set_auto_start(self, enabled):
         try:
+            import winreg as reg
             key = reg.OpenKey(reg.HKEY_CURRENT_USER, r'Software\Microsoft\Windows\CurrentVersion\Run', 0, reg.KEY_SET_VALUE)
             if enabled: reg.SetValueEx(key, "SortAI", 0, reg.REG_SZ, f'"{sys.executable}" "{os.path.abspath(sys.argv[0])}"')
             else:
@@ -250,50 +277,111 @@ class SortAIApp(ctk.CTk):
         except: pass
 
     def start_watcher(self):
-        if self.watcher: self.watcher.stop()
         sources = self.config.get("source_folders", [])
         target = self.config.get("target_folder")
         inplace = self.config.get("inplace_organization", True)
+        if self.watcher and sources:
+            # Reschedule only the folders that changed; queued and settling files are kept
+            self.watcher.update_folders(sources, target, inplace, recursive=self.config.get("watch_recursive", False),
+                                        exclude=self.config.get("scan_exclude", []))
+            self.watch_info.configure(text=f"Monitoring {len(sources)} folders")
+            return
+        if self.watcher:
+            self.watcher.stop()
+            self.watcher = None
+            self.status_indicator.configure(text="● SYSTEM IDLE", text_color="gray")
         if sources:
-            self.watcher = FolderWatcher(sources, target, self.sorter, on_move_callback=self.notify_user_move, inplace=inplace)
+            self.watcher = FolderWatcher.from_config(self.config, self.sorter, on_move_callback=self.notify_user_move)
             self.watcher.start()
             self.status_indicator.configure(text="● SYSTEM ACTIVE", text_color="green")
             self.watch_info.configure(text=f"Monitoring {len(sources)} folders")
 
     def notify_user_move(self):
-        self.after(0, self.refresh_history)
-        try: notification.notify(title="SortAI Pro", message="File organized.", timeout=3)
+        self.after(0, self.refresh_watch_info)
+        self.after(0, self.refresh_rule_info)
+        try:
+            from plyer import notification  # imported on the first move, not at startup
+            notification.notify(title="SortAI Pro", message="File organized.", timeout=3)
         except: pass
 
+    def refresh_watch_info(self):
+        if not self.watcher: return
+        stats = self.watcher.stats()
+        moves = self.sorter.move_stats()
+        copying = f" · copies {moves['bytes_per_second'] / 1e6:.1f} MB/s" if moves["copies"] else ""
+        rate = self.sorter.rate_stats()
+        ceiling = f" · AI ceiling {rate['ceiling_rps']:.1f} req/s ({rate['throttled']} throttled)" if rate["calls"] else ""
+        self.watch_info.configure(text=f"Monitoring {len(self.watcher.source_folders)} folders · "
+                                       f"queue {stats['queue_depth']} · avg wait {stats['avg_wait']:.1f}s · "
+                                       f"workers {stats['utilization']:.0%} busy{copying}{ceiling}")
+        stages = stage_averages()
+        if stages:
+            self.stage_info.configure(text="Avg per file: " + " · ".join(f"{stage} {seconds:.2f}s" for stage, seconds in stages.items()))
+
+    @staticmethod
+    def history_line(entry):
+        return f"[{entry['timestamp']}] {entry['filename']} -> {entry['category']}\n"
+
     def refresh_history(self):
         self.history_list.configure(state="normal")
         self.history_list.delete("1.0", "end")
-        if os.path.exists("history.json"):
-            with open("history.json", 'r') as f:
-                history = json.load(f)
-                for entry in history:
-                    self.history_list.insert("end", f"[{entry['timestamp']}] {entry['filename']} -> {entry['category']}\n")
+        self.history_list.configure(state="disabled")
+        self.history_ids = []
+        self.load_older_history()
+
+    def load_older_history(self):
+        before = self.history_ids[-1] if self.history_ids else None
+        entries = self.sorter.history.page(limit=HISTORY_PAGE, before_id=before)
+        self.history_list.configure(state="normal")
+        self.history_list.insert("end", "".join(self.history_line(e) for e in entries))
+        self.history_list.configure(state="disabled")
+        self.history_ids.extend(e["id"] for e in entries)
+        self.btn_older.configure(state="normal" if len(entries) == HISTORY_PAGE else "disabled")
+
+    def on_history_event(self, event, entry):
+        self.history_list.configure(state="normal")
+        if event == "added":
+            self.history_list.insert("1.0", self.history_line(entry))
+            self.history_ids.insert(0, entry["id"])
+            if len(self.history_ids) > HISTORY_WINDOW:
+                self.history_list.delete(f"{len(self.history_ids)}.0", f"{len(self.history_ids) + 1}.0")
+                self.history_ids.pop()
+                self.btn_older.configure(state="normal")
+        elif event == "undone" and entry["id"] in self.history_ids:
+            line = self.history_ids.index(entry["id"]) + 1
+            self.history_list.delete(f"{line}.0", f"{line + 1}.0")
+            self.history_ids.pop(line - 1)
         self.history_list.configure(state="disabled")
 
     def undo_last_move(self):
-        if os.path.exists("history.json"):
-            try:
-                with open("history.json", 'r') as f:
-                    history = json.load(f)
-                if history:
-                    entry = history[0]
-                    if self.sorter.undo_move(entry):
-                        history.pop(0)
-                        with open("history.json", 'w') as f:
-                            json.dump(history, f, indent=4)
-                        self.refresh_history()
-                        messagebox.showinfo("Undo", f"Recovered: {entry['filename']}")
-                    else:
-                        messagebox.showerror("Error", "Undo failed. File may have been moved or deleted.")
-                else:
-                    messagebox.showinfo("Info", "History is empty.")
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to load history: {e}")
+        try:
+            if not self.sorter.history.latest():
+                messagebox.showinfo("Info", "History is empty.")
+                return
+            entry = self.sorter.undo_last()
+            if entry:
+                messagebox.showinfo("Undo", f"Recovered: {entry['filename']}")
+            else:
+                messagebox.showerror("Error", "Undo failed. File may have been moved or deleted.")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to load history: {e}")
+
+    def undo_last_scan(self):
+        session = self.sorter.history.latest_session("scan")
+        if not session:
+            messagebox.showinfo("Info", "No scan to undo.")
+            return
+        entries = self.sorter.history.session_entries(session)
+        if not messagebox.askyesno("Undo Last Scan", f"Move {len(entries)} files back to where they were?"):
+            return
+        self.btn_undo_scan.configure(state="disabled", text="Undoing...")
+
+        def run():
+            undone = self.sorter.undo_session(session)
+            self.after(0, lambda: self.btn_undo_scan.configure(state="normal", text="Undo Last Scan"))
+            self.after(0, lambda: messagebox.showinfo("Undo", f"Recovered {len(undone)} of {len(entries)} files."))
+
+        threading.Thread(target=run, daemon=True).start()
 
     def scan_existing_files(self):
         sources = self.config.get("source_folders", [])
@@ -303,28 +391,37 @@ class SortAIApp(ctk.CTk):
 
     def run_multi_scan(self, sources, global_target, inplace):
         self.btn_scan.configure(state="disabled", text="Scanning...")
-        for source in sources:
-            if os.path.exists(source):
-                files = [f for f in os.listdir(source) if os.path.isfile(os.path.join(source, f))]
-                for filename in files:
-                    self.sorter.organize_file(os.path.join(source, filename), source if inplace else global_target)
-                    self.after(0, self.refresh_history)
+        scanner = ManualScanner.for_sources(sources, global_target, inplace,
+                                            recursive=self.config.get("scan_recursive", False),
+                                            exclude=self.config.get("scan_exclude", []),
+                                            chunk_size=self.config.get("scan_chunk_size", 500))
+        session = HistoryStore.new_session("scan")
+        for source, files in scanner.chunks():
+            self.sorter.organize_many(files, source if inplace else global_target, session=session)
+            self.btn_scan.configure(text=f"Scanning... ({scanner.files_seen} files)")
         self.btn_scan.configure(state="normal", text="Run Manual Scan")
+        self.after(0, self.refresh_cache_info)
+        self.after(0, self.refresh_rule_info)
 
     def setup_tray(self):
-        image = Image.new('RGB', (64, 64), "black")
-        dc = ImageDraw.Draw(image)
-        dc.ellipse((16, 16, 48, 48), fill="blue")
-        menu = pystray.Menu(pystray.MenuItem("Show", self.show_window), pystray.MenuItem("Exit", self.quit_app))
-        self.icon = pystray.Icon("SortAI", image, "SortAI", menu)
+        """Builds the tray icon on first use; pystray and PIL are not imported until then."""
+        if self.icon is None:
+            import pystray
+            from PIL import Image, ImageDraw
+            image = Image.new('RGB', (64, 64), "black")
+            dc = ImageDraw.Draw(image)
+            dc.ellipse((16, 16, 48, 48), fill="blue")
+            menu = pystray.Menu(pystray.MenuItem("Show", self.show_window), pystray.MenuItem("Exit", self.quit_app))
+            self.icon = pystray.Icon("SortAI", image, "SortAI", menu)
+        return self.icon
 
     def show_window(self, icon=None, item=None):
-        self.icon.stop()
+        if self.icon: self.icon.stop()
         self.after(0, self.deiconify)
 
     def quit_app(self, icon=None, item=None):
-        self.icon.stop()
-        if self.watcher: self.watcher.stop()
+        if self.icon: self.icon.stop()
+        if self.watcher: self.watcher.stop(drain=False)
         self.quit()
         sys.exit()
 
@@ -0,0 +1,240 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+import uuid
+from typing import Optional, Dict, List
+
+class HistoryStore:
+    """Append-only SQLite journal of file moves, safe to share between the watcher and UI threads."""
+
+    COLUMNS = ("id", "timestamp", "filename", "category", "destination", "original_path", "undone", "session", "source")
+
+    def __init__(self, db_file: str = "history.db", legacy_json: Optional[str] = "history.json", readonly: bool = False):
+        self.db_file = db_file
+        self.legacy_json = legacy_json
+        self.readonly = readonly  # another process owns the journal; we only query it
+        self._conn = None
+        self._lock = threading.Lock()
+        self._subscribers = []
+
+    def subscribe(self, callback):
+        """Registers callback(event, entry) for "added" and "undone" events. Returns an unsubscribe function.
+
+        Callbacks run on the thread that wrote the entry; UI code must hop to its own thread.
+        """
+        self._subscribers.append(callback)
+        return lambda: self._subscribers.remove(callback) if callback in self._subscribers else None
+
+    def _notify(self, event: str, entries: List[Dict]):
+        for callback in list(self._subscribers):
+            for entry in entries:
+                try:
+                    callback(event, entry)
+                except Exception as e:
+                    print(f"History subscriber error: {e}")
+
+    def _connect(self):
+        if self._conn is None and self.readonly:
+            uri = "file:" + os.path.abspath(self.db_file).replace("?", "%3f").replace("#", "%23") + "?mode=ro"
+            self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False, timeout=30)
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_file, check_same_thread=False, timeout=30)
+            # WAL lets readers (the UI) run while the watcher appends, and other processes wait rather than fail
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS moves (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    created REAL NOT NULL,
+                    timestamp TEXT NOT NULL,
+                    filename TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    destination TEXT NOT NULL,
+                    original_path TEXT NOT NULL,
+                    undone INTEGER NOT NULL DEFAULT 0,
+                    session TEXT,
+                    source TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_moves_created ON moves (created);
+                CREATE INDEX IF NOT EXISTS idx_moves_destination ON moves (destination);
+                CREATE INDEX IF NOT EXISTS idx_moves_original_path ON moves (original_path);
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            """)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(moves)")}
+            if "session" not in columns:
+                self._conn.execute("ALTER TABLE moves ADD COLUMN session TEXT")
+            if "source" not in columns:
+                self._conn.execute("ALTER TABLE moves ADD COLUMN source TEXT")  # who chose the category; NULL = unknown
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_moves_session ON moves (session)")
+            self._conn.commit()
+            self._import_legacy()
+        return self._conn
+
+    def _import_legacy(self):
+        """One-time import of the old history.json (newest-first list) into the journal."""
+        conn = self._conn
+        if not self.legacy_json or not os.path.exists(self.legacy_json):
+            return
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'imported_json'").fetchone():
+            return
+        try:
+            with open(self.legacy_json, 'r') as f:
+                entries = json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"Error importing history: {e}")
+            return
+        rows = []
+        for entry in reversed(entries):
+            try:
+                created = time.mktime(time.strptime(entry["timestamp"], "%Y-%m-%d %H:%M:%S"))
+            except (KeyError, ValueError):
+                created = 0.0
+            rows.append((created, entry.get("timestamp", ""), entry.get("filename", ""), entry.get("category", ""),
+                         entry.get("destination", ""), entry.get("original_path", "")))
+        conn.executemany(
+            "INSERT INTO moves (created, timestamp, filename, category, destination, original_path) VALUES (?, ?, ?, ?, ?, ?)",
+            rows
+        )
+        conn.execute("INSERT INTO meta VALUES ('imported_json', ?)", (self.legacy_json,))
+        conn.commit()
+        print(f"Imported {len(rows)} history entries from {self.legacy_json}")
+
+    def _row_to_entry(self, row) -> Dict:
+        entry = dict(zip(self.COLUMNS, row))
+        entry["undone"] = bool(entry["undone"])
+        return entry
+
+    @staticmethod
+    def new_session(kind: str = "scan") -> str:
+        """Returns a fresh session id such as "scan-20240101-120000-1a2b3c" for grouping related moves."""
+        return f"{kind}-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+    def append(self, filename: str, category: str, destination: str, original_path: str, session: Optional[str] = None,
+               source: Optional[str] = None) -> Dict:
+        """Records a move. source names what decided the category ("llm", "cache", "classifier", "rule", "default", "user")."""
+        now = time.time()
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now))
+        with self._lock:
+            conn = self._connect()
+            cursor = conn.execute(
+                "INSERT INTO moves (created, timestamp, filename, category, destination, original_path, session, source) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (now, timestamp, filename, category, destination, original_path, session, source)
+            )
+            conn.commit()
+        entry = {"id": cursor.lastrowid, "timestamp": timestamp, "filename": filename, "category": category,
+                 "destination": destination, "original_path": original_path, "undone": False, "session": session,
+                 "source": source}
+        self._notify("added", [entry])
+        return entry
+
+    def page(self, limit: int = 100, before_id: Optional[int] = None, include_undone: bool = False) -> List[Dict]:
+        """Newest-first page of entries; pass the last id of the previous page as before_id to continue."""
+        query = f"SELECT {', '.join(self.COLUMNS)} FROM moves WHERE 1 = 1"
+        params = []
+        if before_id is not None:
+            query += " AND id < ?"
+            params.append(before_id)
+        if not include_undone:
+            query += " AND undone = 0"
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._connect().execute(query, params).fetchall()
+        return [self._row_to_entry(row) for row in rows]
+
+    def latest(self) -> Optional[Dict]:
+        entries = self.page(limit=1)
+        return entries[0] if entries else None
+
+    def find_by_destination(self, destination: str) -> List[Dict]:
+        with self._lock:
+            rows = self._connect().execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM moves WHERE destination = ? ORDER BY id DESC", (destination,)
+            ).fetchall()
+        return [self._row_to_entry(row) for row in rows]
+
+    def session_entries(self, session: str, include_undone: bool = False) -> List[Dict]:
+        """Every entry of a session, newest first."""
+        query = f"SELECT {', '.join(self.COLUMNS)} FROM moves WHERE session = ?"
+        if not include_undone:
+            query += " AND undone = 0"
+        with self._lock:
+            rows = self._connect().execute(query + " ORDER BY id DESC", (session,)).fetchall()
+        return [self._row_to_entry(row) for row in rows]
+
+    def entries_between(self, start: float, end: float, include_undone: bool = False) -> List[Dict]:
+        """Entries created in [start, end] (epoch seconds), newest first."""
+        query = f"SELECT {', '.join(self.COLUMNS)} FROM moves WHERE created BETWEEN ? AND ?"
+        if not include_undone:
+            query += " AND undone = 0"
+        with self._lock:
+            rows = self._connect().execute(query + " ORDER BY id DESC", (start, end)).fetchall()
+        return [self._row_to_entry(row) for row in rows]
+
+    def latest_session(self, kind: Optional[str] = None) -> Optional[str]:
+        """The most recent session (optionally of one kind, e.g. "scan") that still has moves in effect."""
+        query = "SELECT session FROM moves WHERE undone = 0 AND session IS NOT NULL"
+        params = []
+        if kind:
+            query += " AND session LIKE ?"
+            params.append(f"{kind}-%")
+        with self._lock:
+            row = self._connect().execute(query + " ORDER BY id DESC LIMIT 1", params).fetchone()
+        return row[0] if row else None
+
+    def mark_undone(self, entry_ids: List[int]):
+        """Flags entries as undone in a single transaction and notifies subscribers."""
+        entries = []
+        with self._lock:
+            conn = self._connect()
+            conn.executemany("UPDATE moves SET undone = 1 WHERE id = ?", [(i,) for i in entry_ids])
+            conn.commit()
+            for start in range(0, len(entry_ids), 500):
+                chunk = entry_ids[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT {', '.join(self.COLUMNS)} FROM moves WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                entries.extend(self._row_to_entry(row) for row in rows)
+        self._notify("undone", entries)
+
+    def entries_after(self, after_id: int = 0, limit: int = 1000, include_undone: bool = False) -> List[Dict]:
+        """Oldest-first entries with id > after_id, for consumers that replay the journal incrementally."""
+        query = f"SELECT {', '.join(self.COLUMNS)} FROM moves WHERE id > ?"
+        if not include_undone:
+            query += " AND undone = 0"
+        with self._lock:
+            rows = self._connect().execute(query + " ORDER BY id LIMIT ?", (after_id, limit)).fetchall()
+        return [self._row_to_entry(row) for row in rows]
+
+    def undone_paths(self, paths: List[str]) -> set:
+        """The paths among `paths` whose latest move away was undone, i.e. files put back there on purpose."""
+        undone = set()
+        with self._lock:
+            conn = self._connect()
+            for start in range(0, len(paths), 500):
+                chunk = paths[start:start + 500]
+                rows = conn.execute(
+                    "SELECT original_path, undone FROM moves WHERE id IN (SELECT MAX(id) FROM moves WHERE original_path IN "
+                    f"({', '.join('?' * len(chunk))}) GROUP BY original_path)", chunk
+                ).fetchall()
+                undone.update(path for path, flag in rows if flag)
+        return undone
+
+    def destination_dirs(self) -> set:
+        """Every folder we have moved files into (moves still in effect), e.g. to recognize our own output."""
+        with self._lock:
+            cursor = self._connect().execute("SELECT DISTINCT destination FROM moves WHERE undone = 0")
+            return {os.path.dirname(row[0]) for row in cursor}
+
+    def count(self, include_undone: bool = False) -> int:
+        query = "SELECT COUNT(*) FROM moves" + ("" if include_undone else " WHERE undone = 0")
+        with self._lock:
+            return self._connect().execute(query).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
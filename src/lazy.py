@@ -0,0 +1,49 @@
+import importlib
+import importlib.util
+import threading
+
+class LazyModule:
+    """Stands in for a module and imports it on first attribute access.
+
+    `litellm = LazyModule("litellm")` keeps `litellm.completion(...)` call sites (and mock.patch
+    targets like "src.sorter.litellm.completion") unchanged while moving the import cost from
+    startup to the first call.
+    """
+
+    def __init__(self, name: str):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+        self.__dict__["_lock"] = threading.Lock()
+
+    def _load(self):
+        module = self.__dict__["_module"]
+        if module is None:
+            with self.__dict__["_lock"]:
+                module = self.__dict__["_module"]
+                if module is None:
+                    module = importlib.import_module(self.__dict__["_name"])
+                    self.__dict__["_module"] = module
+        return module
+
+    def preload(self) -> threading.Thread:
+        """Imports the module on a daemon thread, e.g. once the UI is up and the process is idle."""
+        thread = threading.Thread(target=self._load, daemon=True, name=f"import-{self.__dict__['_name']}")
+        thread.start()
+        return thread
+
+    @property
+    def loaded(self) -> bool:
+        return self.__dict__["_module"] is not None
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        return f"<lazy module '{self.__dict__['_name']}' ({'loaded' if self.loaded else 'not loaded'})>"
+
+def installed(name: str) -> bool:
+    """Whether a module can be imported, without importing it."""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
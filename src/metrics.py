@@ -0,0 +1,276 @@
+import json
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+def _label_key(labels: Dict) -> Tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _format_labels(key: Tuple, extra: Optional[Tuple] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (k + '="' + v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"' for k, v in pairs)
+    return "{" + ",".join(escaped) + "}"
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self.values = {}  # {label_key: float}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self.values.get(_label_key(labels), 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in self.values.items():
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+    def snapshot(self):
+        with self._lock:
+            return [{"labels": dict(key), "value": value} for key, value in self.values.items()]
+
+    def dump(self) -> Dict:
+        with self._lock:
+            return {"type": "counter", "help": self.help, "values": dict(self.values)}
+
+    def absorb(self, dump: Dict):
+        with self._lock:
+            for key, value in dump["values"].items():
+                self.values[key] = self.values.get(key, 0) + value
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self.series = {}  # {label_key: [bucket_counts, sum, count]}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels) -> int:
+        series = self.series.get(_label_key(labels))
+        return series[2] if series else 0
+
+    def quantile(self, q: float, **labels) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile (what Prometheus' histogram_quantile approximates)."""
+        series = self.series.get(_label_key(labels))
+        if not series or not series[2]:
+            return None
+        rank, seen = q * series[2], 0
+        for bound, bucket in zip(self.buckets + (float("inf"),), series[0]):
+            seen += bucket
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (buckets, total, count) in self.series.items():
+                cumulative = 0
+                for bound, bucket in zip(self.buckets, buckets):
+                    cumulative += bucket
+                    lines.append(f"{self.name}_bucket{_format_labels(key, ('le', repr(float(bound))))} {cumulative}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', '+Inf'))} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+    def snapshot(self):
+        with self._lock:
+            items = [(key, total, count) for key, (_, total, count) in self.series.items()]
+        return [{"labels": dict(key), "count": count, "sum": total, "avg": total / count if count else 0.0,
+                 "p50": self.quantile(0.5, **dict(key)), "p95": self.quantile(0.95, **dict(key))}
+                for key, total, count in items]
+
+    def dump(self) -> Dict:
+        with self._lock:
+            series = {key: [list(buckets), total, count] for key, (buckets, total, count) in self.series.items()}
+        return {"type": "histogram", "help": self.help, "buckets": self.buckets, "series": series}
+
+    def absorb(self, dump: Dict):
+        if tuple(dump["buckets"]) != self.buckets:
+            return  # different layouts cannot be added bucket by bucket
+        with self._lock:
+            for key, (buckets, total, count) in dump["series"].items():
+                series = self.series.get(key)
+                if series is None:
+                    series = self.series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                series[0] = [a + b for a, b in zip(series[0], buckets)]
+                series[1] += total
+                series[2] += count
+
+class MetricsRegistry:
+    """Named counters and histograms, renderable as Prometheus text or a JSON-friendly dict."""
+
+    def __init__(self):
+        self.metrics = {}
+        self.children = {}  # {source: dump} from other processes, added into render() and snapshot()
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help_text, **kwargs):
+        with self._lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, help_text, **kwargs)
+            return metric
+
+    def counter(self, name: str, help_text: str = "") -> Counter:
+        return self._get(Counter, name, help_text)
+
+    def histogram(self, name: str, help_text: str = "", buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help_text, buckets=buckets)
+
+    def dump(self) -> Dict:
+        """Raw, picklable state of this process's metrics, for another process to attach()."""
+        with self._lock:
+            metrics = list(self.metrics.values())
+        return {metric.name: metric.dump() for metric in metrics}
+
+    def absorb(self, dump: Dict):
+        """Adds a dump() into these metrics."""
+        for name, state in dump.items():
+            if state["type"] == "counter":
+                self.counter(name, state["help"]).absorb(state)
+            else:
+                self.histogram(name, state["help"], buckets=state["buckets"]).absorb(state)
+
+    def attach(self, source: str, dump: Dict):
+        """Replaces the latest cumulative dump() reported by another process (e.g. a shard worker)."""
+        with self._lock:
+            self.children[source] = dump
+
+    def _metrics(self):
+        with self._lock:
+            metrics, children = list(self.metrics.values()), list(self.children.values())
+        if not children:
+            return metrics
+        merged = MetricsRegistry()
+        merged.absorb(self.dump())
+        for dump in children:
+            merged.absorb(dump)
+        return list(merged.metrics.values())
+
+    def render(self) -> str:
+        return "\n".join(line for metric in self._metrics() for line in metric.render()) + "\n"
+
+    def snapshot(self) -> Dict:
+        return {metric.name: metric.snapshot() for metric in self._metrics()}
+
+REGISTRY = MetricsRegistry()
+
+# Pipeline metrics, shared by the watcher, sorter, router, mover and caches
+EVENT_TO_ENQUEUE = REGISTRY.histogram("sortai_event_to_enqueue_seconds", "First filesystem event until the file is queued for sorting")
+STABILITY_WAIT = REGISTRY.histogram("sortai_stability_wait_seconds", "Time a file spent settling before it was considered complete")
+QUEUE_WAIT = REGISTRY.histogram("sortai_queue_wait_seconds", "Time a queued file waited for a watcher worker")
+CATEGORIZE_SECONDS = REGISTRY.histogram("sortai_categorize_seconds", "Provider request latency per model, including rate-limit waits")
+MOVE_SECONDS = REGISTRY.histogram("sortai_move_seconds", "Duration of one file move by method (rename or copy)")
+MOVE_BYTES = REGISTRY.counter("sortai_move_bytes_total", "Bytes copied by moves that crossed filesystems")
+DECISIONS = REGISTRY.counter("sortai_decisions_total", "Categorization decisions by source (rule, cache, classifier, llm, default)")
+CACHE_LOOKUPS = REGISTRY.counter("sortai_cache_lookups_total", "Category cache lookups by result")
+COLLISIONS = REGISTRY.counter("sortai_name_collisions_total", "Destination names that needed a numeric suffix")
+ERRORS = REGISTRY.counter("sortai_errors_total", "Errors by pipeline stage")
+
+STAGES = {"event": EVENT_TO_ENQUEUE, "settle": STABILITY_WAIT, "queue": QUEUE_WAIT, "ai": CATEGORIZE_SECONDS, "move": MOVE_SECONDS}
+
+def stage_averages() -> Dict[str, float]:
+    """Mean seconds per pipeline stage across all label sets, for a compact dashboard line."""
+    averages = {}
+    for stage, histogram in STAGES.items():
+        series = histogram.snapshot()
+        count = sum(s["count"] for s in series)
+        if count:
+            averages[stage] = sum(s["sum"] for s in series) / count
+    return averages
+
+class _Handler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?")[0] in ("/metrics.json", "/snapshot"):
+            body = json.dumps(self.registry.snapshot(), default=str).encode()
+            content_type = "application/json"
+        elif self.path.split("?")[0] in ("/", "/metrics"):
+            body = self.registry.render().encode()
+            content_type = "text/plain; version=0.0.4"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # keep scrapes out of the console
+
+class MetricsServer:
+    """Serves /metrics (Prometheus text) and /metrics.json on localhost from a daemon thread."""
+
+    def __init__(self, port: int = 9464, host: str = "127.0.0.1", registry: MetricsRegistry = REGISTRY):
+        self.host = host
+        self.port = port
+        self.registry = registry
+        self.server = None
+        self.thread = None
+
+    @classmethod
+    def from_config(cls, config: Dict) -> Optional["MetricsServer"]:
+        """Starts the endpoint if config sets metrics_port. Returns None when it is off or the port is taken."""
+        if not config.get("metrics_port"):
+            return None
+        server = cls(config["metrics_port"])
+        try:
+            server.start()
+        except OSError as e:
+            print(f"Metrics endpoint unavailable: {e}")
+            return None
+        return server
+
+    def start(self):
+        handler = type("MetricsHandler", (_Handler,), {"registry": self.registry})
+        self.server = ThreadingHTTPServer((self.host, self.port), handler)
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True, name="SortAI-metrics")
+        self.thread.start()
+        print(f"Metrics on http://{self.host}:{self.port}/metrics")
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+            self.thread = None
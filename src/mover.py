@@ -0,0 +1,155 @@
+import os
+import time
+import errno
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+from src.metrics import MOVE_SECONDS, MOVE_BYTES
+
+COPY_CHUNK = 8 * 1024 * 1024
+
+class MoveEngine:
+    """Moves files with a plain rename when possible and a kernel-assisted copy when not.
+
+    Cross-device copies go through one bounded pool per destination device, are written to a
+    hidden `.part` name (which the sorter and watcher already ignore) and only renamed into place
+    once complete, so a partial copy is never visible under its final name.
+    """
+
+    def __init__(self, copies_per_device: int = 2):
+        self.copies_per_device = max(1, copies_per_device)
+        self.pools = {}  # {st_dev: ThreadPoolExecutor}
+        self.renames = 0
+        self.copies = 0
+        self.bytes_copied = 0
+        self.copy_seconds = 0.0
+        self.active = {}  # {destination: [copied, total, started]}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _device(path: str) -> Optional[int]:
+        try:
+            return os.stat(path).st_dev
+        except OSError:
+            return None
+
+    def _pool(self, device) -> ThreadPoolExecutor:
+        with self._lock:
+            if device not in self.pools:
+                self.pools[device] = ThreadPoolExecutor(max_workers=self.copies_per_device,
+                                                        thread_name_prefix=f"SortAI-copy-{device}")
+            return self.pools[device]
+
+    def move(self, src: str, dst: str, on_progress=None):
+        """Moves src to dst (which must not exist). Raises OSError on failure, like shutil.move."""
+        if os.path.exists(dst):
+            raise FileExistsError(errno.EEXIST, "Destination exists", dst)
+        started = time.perf_counter()
+        # Same filesystem: a rename is atomic and O(1). st_dev is only a hint (bind mounts, overlayfs),
+        # so the rename itself is the authority and EXDEV is what routes us to the copy path.
+        try:
+            os.rename(src, dst)
+            with self._lock:
+                self.renames += 1
+            MOVE_SECONDS.observe(time.perf_counter() - started, method="rename")
+            return
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+        copied = self._pool(self._device(os.path.dirname(dst) or ".")).submit(self._copy_then_swap, src, dst, on_progress).result()
+        MOVE_SECONDS.observe(time.perf_counter() - started, method="copy")
+        MOVE_BYTES.inc(copied, method="copy")
+
+    def _copy_then_swap(self, src: str, dst: str, on_progress):
+        directory, name = os.path.split(dst)
+        tmp = os.path.join(directory, f".{name}.sortai.part")
+        total = os.path.getsize(src)
+        started = time.time()
+        with self._lock:
+            self.active[dst] = [0, total, started]
+        try:
+            with open(src, "rb") as fsrc, open(tmp, "wb") as fdst:
+                copied = self._copy_data(fsrc, fdst, total, dst, on_progress)
+                fdst.flush()
+                os.fsync(fdst.fileno())
+            if copied != total:
+                raise OSError(errno.EIO, f"Copied {copied} of {total} bytes", src)  # never unlink src after a short copy
+            shutil.copystat(src, tmp)
+            os.replace(tmp, dst)
+            os.unlink(src)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+        finally:
+            with self._lock:
+                copied = self.active.pop(dst, [0])[0]
+                self.bytes_copied += copied
+                self.copy_seconds += time.time() - started
+        with self._lock:
+            self.copies += 1
+        return total
+
+    def _copy_data(self, fsrc, fdst, total: int, key: str, on_progress) -> int:
+        """Copies fsrc into fdst and returns the number of bytes written."""
+        in_fd, out_fd = fsrc.fileno(), fdst.fileno()
+        copied = 0
+
+        def advance(n):
+            nonlocal copied
+            copied += n
+            with self._lock:
+                self.active[key][0] = copied
+            if on_progress:
+                on_progress(copied, total)
+
+        # copy_file_range keeps data in the kernel (and can reflink); sendfile is the older in-kernel path
+        for kernel_copy in (getattr(os, "copy_file_range", None), getattr(os, "sendfile", None)):
+            if kernel_copy is None:
+                continue
+            try:
+                while copied < total:
+                    if kernel_copy is os.sendfile:
+                        n = os.sendfile(out_fd, in_fd, copied, min(COPY_CHUNK, total - copied))
+                    else:
+                        n = os.copy_file_range(in_fd, out_fd, min(COPY_CHUNK, total - copied))
+                    if n == 0:
+                        break  # some filesystems answer 0 (even at offset 0) instead of failing; finish with read/write
+                    advance(n)
+                break
+            except OSError as e:
+                if copied or e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.ENOTSUP, errno.EOPNOTSUPP):
+                    raise
+        if copied < total:
+            # The kernel copies moved the raw fds; line the buffered files up with what was already copied
+            fsrc.seek(copied)
+            fdst.seek(copied)
+            while True:
+                buf = fsrc.read(COPY_CHUNK)
+                if not buf:
+                    break
+                fdst.write(buf)
+                advance(len(buf))
+        return copied
+
+    def stats(self) -> Dict:
+        with self._lock:
+            now = time.time()
+            in_progress = {dst: {"copied": c, "total": t, "bytes_per_second": c / max(now - s, 1e-9)}
+                           for dst, (c, t, s) in self.active.items()}
+            return {
+                "renames": self.renames,
+                "copies": self.copies,
+                "bytes_copied": self.bytes_copied,
+                "bytes_per_second": self.bytes_copied / self.copy_seconds if self.copy_seconds else 0.0,
+                "active": in_progress
+            }
+
+    def shutdown(self):
+        with self._lock:
+            pools, self.pools = list(self.pools.values()), {}
+        for pool in pools:
+            pool.shutdown(wait=True)
@@ -0,0 +1,142 @@
+import os
+import json
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from src.sorter import FileSorter
+from src.scanner import ManualScanner
+from src.dirindex import DirectoryIndex
+from src.history import HistoryStore
+
+class MovePlan:
+    """A serializable list of source -> destination moves, computed without touching any file."""
+
+    def __init__(self, moves: Optional[List[Dict]] = None, created: Optional[str] = None, session: Optional[str] = None):
+        self.moves = moves or []  # {"source", "destination", "folder", "subfolder", "status", "decided_by", "decided"}
+        self.created = created or time.strftime("%Y-%m-%d %H:%M:%S")
+        self.session = session  # history session of the run, kept so a resumed run undoes as one unit
+
+    def to_dict(self) -> Dict:
+        return {"version": 1, "created": self.created, "session": self.session, "moves": self.moves}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "MovePlan":
+        return cls(data.get("moves", []), data.get("created"), data.get("session"))
+
+    def save(self, path: str):
+        tmp = path + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump(self.to_dict(), f, indent=4)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "MovePlan":
+        with open(path, 'r') as f:
+            return cls.from_dict(json.load(f))
+
+    def autosave(self, path: str, interval: float = 2.0):
+        """Returns an execute_plan on_progress callback that re-saves the plan at most every `interval` seconds.
+
+        A run that dies halfway then resumes from its last checkpoint instead of re-trying finished moves.
+        """
+        lock = threading.Lock()
+        last = [time.monotonic()]
+
+        def on_progress(move):
+            with lock:
+                if time.monotonic() - last[0] >= interval:
+                    self.save(path)
+                    last[0] = time.monotonic()
+        return on_progress
+
+    def summary(self) -> Dict:
+        counts = {}
+        for move in self.moves:
+            counts[move.get("status", "pending")] = counts.get(move.get("status", "pending"), 0) + 1
+        return {"moves": len(self.moves), **counts}
+
+def build_plan(sorter: FileSorter, sources: List[str], target: str, inplace: bool, recursive: bool = False,
+               exclude: Optional[List[str]] = None) -> MovePlan:
+    """Categorizes every file under sources (rules, cache, local model, then batched AI) and plans its move."""
+    scanner = ManualScanner.for_sources(sources, target, inplace, recursive=recursive, exclude=exclude)
+    scanner.checkpoint_file = None
+    reservations = DirectoryIndex(max_dirs=1 << 30)  # private to the plan: nothing is created or moved
+    plan = MovePlan()
+
+    async def categorize_all():
+        limit = asyncio.Semaphore(sorter.max_in_flight)
+
+        async def categorize(paths):
+            async with limit:
+                return await sorter.acategorize_paths(paths)
+
+        jobs = []
+        for source, chunk in scanner.chunks():
+            # Same gate as sorting: no partial downloads, nothing we just restored or moved
+            chunk = [p for p in (sorter._prepare_file(p, wait=False) for p in chunk) if p]
+            for start in range(0, len(chunk), sorter.batch_size):
+                paths = chunk[start:start + sorter.batch_size]
+                jobs.append((source, paths, asyncio.ensure_future(categorize(paths))))
+        # Reserve names in scan order so the plan is deterministic
+        for source, paths, job in jobs:
+            categories = await job
+            for path in paths:
+                category = categories.get(path)
+                if category is None:
+                    print(f"Leaving {os.path.basename(path)} out of the plan: the provider is throttling")
+                    continue
+                folder, subfolder = category.get("folder", "Other"), category.get("subfolder", "Misc")
+                directory = os.path.join(source if inplace else target, folder, subfolder)
+                plan.moves.append({"source": path, "destination": reservations.allocate(directory, os.path.basename(path)),
+                                   "folder": folder, "subfolder": subfolder, "status": "pending",
+                                   "decided_by": getattr(category, "source", None), "decided": f"{folder}/{subfolder}"})
+
+    asyncio.run(categorize_all())
+    return plan
+
+def decided_by(move: Dict) -> Optional[str]:
+    """The move's decision source for history; a folder edited by hand in the plan file is the user's correction."""
+    if move.get("decided") and move["decided"] != f"{move['folder']}/{move['subfolder']}":
+        return "user"
+    return move.get("decided_by")
+
+def execute_plan(sorter: FileSorter, plan: MovePlan, workers: int = 8, on_progress=None, session: Optional[str] = None) -> Dict:
+    """Applies pending moves in parallel, one task per destination directory. Safe to re-run.
+
+    All moves are recorded under one history session (the plan's, or a fresh "plan-..." id) so they can be undone together.
+    """
+    session = plan.session = session or plan.session or HistoryStore.new_session("plan")
+    by_directory = {}
+    for move in plan.moves:
+        if move.get("status") != "done":
+            by_directory.setdefault(os.path.dirname(move["destination"]), []).append(move)
+
+    def run_directory(directory, moves):
+        try:
+            sorter.dirindex.ensure_dir(directory)
+        except OSError as e:
+            print(f"Cannot create {directory}: {e}")
+            for move in moves:
+                move["status"] = "failed"
+            return
+        for move in moves:
+            if not os.path.exists(move["source"]):
+                move["status"] = "missing"
+                continue
+            destination = move["destination"]
+            if not sorter.dirindex.claim(destination):
+                # Something appeared there since the plan was made; fall back to a fresh suffix
+                destination = sorter.dirindex.allocate(directory, os.path.basename(move["source"]))
+            ok = sorter.move_to(move["source"], destination, move["folder"], move["subfolder"], session, decided_by(move))
+            move["status"] = "done" if ok else "failed"
+            if ok:
+                move["destination"] = destination
+            if on_progress:
+                on_progress(move)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for future in [pool.submit(run_directory, d, m) for d, m in by_directory.items()]:
+            future.result()
+    return {**plan.summary(), "session": session}
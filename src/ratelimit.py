@@ -0,0 +1,277 @@
+import time
+import random
+import asyncio
+import threading
+from typing import Dict, Optional
+
+RETRYABLE_NAMES = ("RateLimitError", "ServiceUnavailableError", "InternalServerError", "Timeout",
+                   "APIConnectionError", "BadGatewayError")
+
+def provider_of(model_name: str) -> str:
+    """"gemini/gemini-2.0-flash" -> "gemini", "gpt-4o" -> "openai", "claude-3-haiku" -> "anthropic"."""
+    if "/" in model_name:
+        return model_name.split("/", 1)[0]
+    if model_name.startswith(("gpt-", "o1", "o3", "o4")):
+        return "openai"
+    if model_name.startswith("claude"):
+        return "anthropic"
+    return model_name or "default"
+
+def estimate_tokens(prompt: str, files: int = 1) -> int:
+    """Rough prompt + answer size (about 4 characters per token, ~20 tokens of JSON per file)."""
+    return len(prompt) // 4 + 20 * max(1, files)
+
+def error_status(error: Exception) -> Optional[int]:
+    """HTTP status of a provider error: 429 for throttling, 5xx for outages, None when unknown."""
+    status = getattr(error, "status_code", None)
+    if isinstance(status, int):
+        return status
+    name = type(error).__name__
+    if name == "RateLimitError":
+        return 429
+    if name in RETRYABLE_NAMES:
+        return 503
+    return None
+
+def retry_after(error: Exception) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+class ThrottledError(Exception):
+    """A provider still answered 429 after every retry. The files should wait, not go to a default folder."""
+
+    def __init__(self, provider: str, error: Exception):
+        super().__init__(f"{provider} is still throttling after retries: {error}")
+        self.provider = provider
+
+class TokenBucket:
+    """Refills `per_minute` units per minute up to one minute of burst. A rate of 0 means unlimited."""
+
+    def __init__(self, per_minute: float = 0):
+        self.per_minute = per_minute
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float = 1) -> float:
+        """Takes `amount` units (the level may go negative) and returns how long the caller must wait."""
+        if not self.per_minute:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self.level = min(self.per_minute, self.level + (now - self.updated) * self.per_minute / 60)
+            self.updated = now
+            self.level -= amount
+            return max(0.0, -self.level * 60 / self.per_minute)
+
+    def refund(self, amount: float):
+        """Corrects an estimate once the real usage is known (negative amounts charge more)."""
+        if self.per_minute:
+            with self._lock:
+                self.level = min(self.per_minute, self.level + amount)
+
+class ProviderLimiter:
+    """Rate limits, adaptive concurrency and retries for one provider.
+
+    Requests wait on requests/min and tokens/min buckets, then on a concurrency limit that grows by one
+    per `limit` successes and halves on every 429/5xx (AIMD). Throttled and failed calls are retried with
+    full-jitter exponential backoff, honouring Retry-After when the provider sends one.
+    """
+
+    def __init__(self, name: str, rpm: float = 0, tpm: float = 0, max_concurrency: int = 8, max_retries: int = 4,
+                 base_delay: float = 1.0, max_delay: float = 60.0):
+        self.name = name
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = float(self.max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.in_flight = 0
+        self.calls = 0
+        self.throttled = 0
+        self.retries = 0
+        self.failures = 0
+        self.waited = 0.0
+        self.latency = 0.0  # exponential moving average of successful calls
+        self._cond = threading.Condition()
+
+    # --- admission ---
+
+    def _try_enter(self) -> bool:
+        with self._cond:
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return True
+            return False
+
+    def _enter(self):
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait(0.5)
+            self.in_flight += 1
+
+    async def _aenter(self):
+        # Polling instead of an asyncio primitive: each organize_many run has its own event loop,
+        # and the same limiter is shared with the watcher's worker threads.
+        while not self._try_enter():
+            await asyncio.sleep(0.02)
+
+    def _leave(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def _admission_delay(self, tokens: int) -> float:
+        delay = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+        self.waited += delay
+        return delay
+
+    # --- feedback ---
+
+    def _on_success(self, elapsed: float, estimated: int, response):
+        with self._cond:
+            self.calls += 1
+            self.latency = elapsed if not self.latency else 0.8 * self.latency + 0.2 * elapsed
+            self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+        used = getattr(getattr(response, "usage", None), "total_tokens", None)
+        if isinstance(used, int):
+            self.tokens.refund(estimated - used)
+
+    def _on_error(self, error: Exception, attempt: int) -> Optional[float]:
+        """Returns the backoff before the next attempt, or None if the error should be raised."""
+        status = error_status(error)
+        retryable = status is not None and (status == 429 or status >= 500)
+        with self._cond:
+            if status == 429:
+                self.throttled += 1
+            if retryable:
+                self.limit = max(1.0, self.limit / 2)
+            if not retryable or attempt >= self.max_retries:
+                self.failures += 1
+                return None
+            self.retries += 1
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        hinted = retry_after(error)
+        if hinted is not None:
+            delay = max(delay, min(hinted, self.max_delay))
+        self.waited += delay
+        return delay
+
+    # --- calls ---
+
+    def call(self, request, tokens: int = 0):
+        """Runs request() under the limits, retrying throttled/5xx failures. Re-raises anything else.
+
+        Raises ThrottledError once the retries are spent on 429s.
+        """
+        attempt = 0
+        while True:
+            time.sleep(self._admission_delay(tokens))
+            self._enter()
+            started = time.time()
+            try:
+                response = request()
+            except Exception as e:
+                self._leave()
+                delay = self._on_error(e, attempt)
+                if delay is None:
+                    if error_status(e) == 429:
+                        raise ThrottledError(self.name, e) from e
+                    raise
+                print(f"{self.name}: {type(e).__name__}, retrying in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self._leave()
+            self._on_success(time.time() - started, tokens, response)
+            return response
+
+    async def acall(self, request, tokens: int = 0):
+        """Async twin of call(); request() must return an awaitable."""
+        attempt = 0
+        while True:
+            await asyncio.sleep(self._admission_delay(tokens))
+            await self._aenter()
+            started = time.time()
+            try:
+                response = await request()
+            except asyncio.CancelledError:
+                self._leave()  # e.g. the losing half of a hedged request
+                raise
+            except Exception as e:
+                self._leave()
+                delay = self._on_error(e, attempt)
+                if delay is None:
+                    if error_status(e) == 429:
+                        raise ThrottledError(self.name, e) from e
+                    raise
+                print(f"{self.name}: {type(e).__name__}, retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self._leave()
+            self._on_success(time.time() - started, tokens, response)
+            return response
+
+    def ceiling(self) -> float:
+        """Current best-case requests/second: the tightest of the rpm bucket and concurrency / latency."""
+        limits = []
+        if self.requests.per_minute:
+            limits.append(self.requests.per_minute / 60)
+        if self.latency:
+            limits.append(int(self.limit) / self.latency)
+        return min(limits) if limits else 0.0
+
+    def stats(self) -> Dict:
+        return {
+            "concurrency": int(self.limit),
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "calls": self.calls,
+            "throttled": self.throttled,
+            "retries": self.retries,
+            "failures": self.failures,
+            "waited_seconds": self.waited,
+            "avg_latency": self.latency,
+            "ceiling_rps": self.ceiling(),
+        }
+
+class RateLimiter:
+    """One ProviderLimiter per provider, configured from config["rate_limits"].
+
+    Example: {"gemini": {"rpm": 15, "tpm": 1000000, "concurrency": 4}}. Unlisted providers get no
+    fixed rate but still adapt their concurrency to 429s.
+    """
+
+    def __init__(self, limits: Optional[Dict] = None, max_retries: int = 4):
+        self.limits = limits or {}
+        self.max_retries = max_retries
+        self.providers = {}
+        self._lock = threading.Lock()
+
+    def for_provider(self, name: str) -> ProviderLimiter:
+        with self._lock:
+            limiter = self.providers.get(name)
+            if limiter is None:
+                settings = self.limits.get(name, {})
+                limiter = ProviderLimiter(name, rpm=settings.get("rpm", 0), tpm=settings.get("tpm", 0),
+                                          max_concurrency=settings.get("concurrency", 8), max_retries=self.max_retries)
+                self.providers[name] = limiter
+            return limiter
+
+    def configure(self, limits: Optional[Dict] = None, max_retries: Optional[int] = None):
+        """Applies new settings; providers are rebuilt on their next call (counters restart)."""
+        with self._lock:
+            self.limits = limits or {}
+            if max_retries is not None:
+                self.max_retries = max_retries
+            self.providers = {}
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {name: limiter.stats() for name, limiter in self.providers.items()}
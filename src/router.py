@@ -0,0 +1,172 @@
+import time
+import asyncio
+import threading
+from collections import deque
+from typing import Dict, List, Optional
+from src.metrics import CATEGORIZE_SECONDS, ERRORS
+
+class ModelHealth:
+    """Rolling latency and error window of one model."""
+
+    def __init__(self, window: int = 100):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)  # True = success
+        self.down_until = 0.0
+        self.requests = 0
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def error_rate(self) -> float:
+        return (1 - sum(self.outcomes) / len(self.outcomes)) if self.outcomes else 0.0
+
+class ProviderRouter:
+    """Routes each request to the fastest healthy model and fails over to the next one.
+
+    A model is unhealthy for `cooldown` seconds once its rolling error rate reaches `max_error_rate`;
+    after that it gets traffic again and recovers with its next successes. Models with fewer than
+    `min_samples` measurements rank first so that every candidate gets measured. With `hedge` on,
+    async requests that outlive the p95 of their model start a second request on the runner-up and
+    the slower of the two is cancelled.
+    """
+
+    def __init__(self, hedge: bool = False, window: int = 100, min_samples: int = 5, max_error_rate: float = 0.5,
+                 cooldown: float = 30.0, min_hedge_delay: float = 0.2):
+        self.hedge = hedge
+        self.window = window
+        self.min_samples = min_samples
+        self.max_error_rate = max_error_rate
+        self.cooldown = cooldown
+        self.min_hedge_delay = min_hedge_delay
+        self.models = {}  # {model: ModelHealth}
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._lock = threading.Lock()
+
+    def _health(self, model: str) -> ModelHealth:
+        health = self.models.get(model)
+        if health is None:
+            health = self.models[model] = ModelHealth(self.window)
+        return health
+
+    def record(self, model: str, latency: float, ok: bool):
+        if ok:
+            CATEGORIZE_SECONDS.observe(latency, model=model)
+        else:
+            ERRORS.inc(stage="provider", model=model)
+        with self._lock:
+            health = self._health(model)
+            health.requests += 1
+            health.outcomes.append(ok)
+            if ok:
+                health.latencies.append(latency)
+            elif len(health.outcomes) >= self.min_samples and health.error_rate() >= self.max_error_rate:
+                health.down_until = time.monotonic() + self.cooldown
+                health.outcomes.clear()  # start from a clean slate after the cooldown
+
+    def healthy(self, model: str) -> bool:
+        with self._lock:
+            return self._health(model).down_until <= time.monotonic()
+
+    def rank(self, models: List[str]) -> List[str]:
+        """Healthy models fastest (p50) first, then unhealthy ones as a last resort; ties keep the given order."""
+        now = time.monotonic()
+        with self._lock:
+            def key(item):
+                index, model = item
+                health = self._health(model)
+                p50 = health.percentile(0.5) if len(health.latencies) >= self.min_samples else 0.0
+                return (health.down_until > now, p50, index)
+            return [model for _, model in sorted(enumerate(models), key=key)]
+
+    def deadline(self, model: str) -> Optional[float]:
+        """How long to wait for model before hedging: its p95, once enough samples exist."""
+        with self._lock:
+            health = self._health(model)
+            if len(health.latencies) < self.min_samples:
+                return None
+            return max(self.min_hedge_delay, health.percentile(0.95))
+
+    def _timed(self, model: str, request):
+        started = time.time()
+        try:
+            response = request(model)
+        except Exception:
+            self.record(model, time.time() - started, False)
+            raise
+        self.record(model, time.time() - started, True)
+        return response
+
+    def run(self, models: List[str], request):
+        """Calls request(model) on the best model, failing over down the ranking. Raises the last error."""
+        error = None
+        for model in self.rank(models):
+            try:
+                return self._timed(model, request)
+            except Exception as e:
+                error = e
+                print(f"Routing: {model} failed ({type(e).__name__})")
+        raise error
+
+    async def _atimed(self, model: str, request):
+        started = time.time()
+        try:
+            response = await request(model)
+        except asyncio.CancelledError:
+            raise  # a hedge loser says nothing about the model's health
+        except Exception:
+            self.record(model, time.time() - started, False)
+            raise
+        self.record(model, time.time() - started, True)
+        return response
+
+    async def arun(self, models: List[str], request):
+        """Async run(); request(model) must return an awaitable. Hedges slow requests when enabled."""
+        ranked = self.rank(models)
+        error = None
+        while ranked:
+            model = ranked.pop(0)
+            primary = asyncio.ensure_future(self._atimed(model, request))
+            deadline = self.deadline(model) if self.hedge and ranked else None
+            pending = {primary}
+            if deadline is not None:
+                done, _ = await asyncio.wait(pending, timeout=deadline)
+                if not done:
+                    pending.add(asyncio.ensure_future(self._atimed(ranked.pop(0), request)))
+                    with self._lock:
+                        self.hedges += 1
+            try:
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        if task.exception() is None:
+                            if task is not primary:
+                                with self._lock:
+                                    self.hedge_wins += 1
+                            return task.result()
+                        error = task.exception()
+                        print(f"Routing: request failed ({type(error).__name__})")
+            finally:
+                for task in pending:
+                    task.cancel()
+                if pending:
+                    await asyncio.gather(*pending, return_exceptions=True)
+        raise error
+
+    def stats(self) -> Dict:
+        with self._lock:
+            now = time.monotonic()
+            models = {
+                model: {
+                    "requests": health.requests,
+                    "p50": health.percentile(0.5),
+                    "p95": health.percentile(0.95),
+                    "error_rate": health.error_rate(),
+                    "healthy": health.down_until <= now,
+                }
+                for model, health in self.models.items()
+            }
+            return {"models": models, "hedges": self.hedges, "hedge_wins": self.hedge_wins}
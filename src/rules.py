@@ -0,0 +1,143 @@
+import os
+import re
+import fnmatch
+import threading
+from typing import Optional, Dict, List
+
+SIZE_UNITS = {"B": 1, "KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3, "TB": 1024 ** 4}
+
+def parse_size(text: str) -> int:
+    match = re.fullmatch(r"\s*([\d.]+)\s*([KMGT]?B)?\s*", text.upper())
+    if not match:
+        raise ValueError(f"Bad size: {text}")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2) or "B"])
+
+def parse_rule_line(line: str) -> Optional[Dict]:
+    """Parses the Rules tab syntax: `*.exe, *.msi, >1MB -> Installers/Windows`.
+
+    Conditions are comma separated: `*.ext` (extension), `re:<regex>`, `>size` / `<size`,
+    `in:<folder>`, anything else is a glob on the filename. Every condition must match.
+    """
+    line = line.strip()
+    if not line or line.startswith("#") or "->" not in line:
+        return None
+    conditions, _, destination = line.rpartition("->")
+    folder, _, subfolder = destination.strip().partition("/")
+    rule = {"name": line, "folder": folder.strip() or "Other", "subfolder": subfolder.strip() or "Misc",
+            "extensions": [], "globs": [], "regex": None, "min_size": None, "max_size": None, "source": None}
+    for token in (t.strip() for t in conditions.split(",")):
+        if not token:
+            continue
+        if re.fullmatch(r"\*?\.[\w\-]+", token):
+            rule["extensions"].append(token.lstrip("*"))
+        elif token.startswith("re:"):
+            rule["regex"] = token[3:]
+        elif token[0] in "<>":
+            try:
+                rule["min_size" if token[0] == ">" else "max_size"] = parse_size(token[1:])
+            except ValueError as e:
+                print(f"Skipping rule '{line}': {e}")
+                return None
+        elif token.startswith("in:"):
+            rule["source"] = token[3:].strip()
+        else:
+            rule["globs"].append(token)
+    return rule
+
+def format_rule(rule: Dict) -> str:
+    conditions = [f"*{ext}" for ext in rule.get("extensions") or []] + list(rule.get("globs") or [])
+    if rule.get("regex"): conditions.append(f"re:{rule['regex']}")
+    if rule.get("min_size") is not None: conditions.append(f">{rule['min_size']}B")
+    if rule.get("max_size") is not None: conditions.append(f"<{rule['max_size']}B")
+    if rule.get("source"): conditions.append(f"in:{rule['source']}")
+    return f"{', '.join(conditions)} -> {rule.get('folder', 'Other')}/{rule.get('subfolder', 'Misc')}"
+
+class CompiledRule:
+    def __init__(self, index: int, rule: Dict):
+        self.index = index
+        self.name = rule.get("name") or f"rule {index + 1}"
+        self.category = {"folder": rule.get("folder", "Other"), "subfolder": rule.get("subfolder", "Misc")}
+        self.extensions = {e.lower() if e.startswith(".") else f".{e.lower()}" for e in rule.get("extensions") or []}
+        patterns = [fnmatch.translate(g.lower()) for g in rule.get("globs") or []]
+        # Globs are OR-ed together into one regex; an explicit regex is an additional AND condition
+        self.glob_regex = re.compile("|".join(patterns)) if patterns else None
+        self.regex = re.compile(rule["regex"], re.IGNORECASE) if rule.get("regex") else None
+        self.min_size = rule.get("min_size")
+        self.max_size = rule.get("max_size")
+        source = rule.get("source")
+        self.source = os.path.normcase(os.path.abspath(source)) if source else None
+
+    @property
+    def needs_size(self):
+        return self.min_size is not None or self.max_size is not None
+
+    def matches(self, name: str, lowered: str, size: Optional[int], source: Optional[str]) -> bool:
+        if self.glob_regex and not self.glob_regex.match(lowered):
+            return False
+        if self.regex and not self.regex.search(name):
+            return False
+        if self.needs_size:
+            if size is None:
+                return False
+            if self.min_size is not None and size < self.min_size:
+                return False
+            if self.max_size is not None and size > self.max_size:
+                return False
+        if self.source and (source is None or not (source == self.source or source.startswith(self.source + os.sep))):
+            return False
+        return True
+
+class RuleEngine:
+    """Compiles user rules once so each lookup is a dict probe plus a few pre-compiled checks."""
+
+    def __init__(self, rules: List[Dict] = None):
+        self.hits = {}
+        self._lock = threading.Lock()
+        self.compile(rules or [])
+
+    def compile(self, rules: List[Dict]):
+        compiled = []
+        for i, rule in enumerate(rules):
+            try:
+                compiled.append(CompiledRule(i, rule))
+            except (re.error, TypeError, ValueError) as e:
+                print(f"Skipping invalid rule {rule!r}: {e}")
+        any_ext = [r for r in compiled if not r.extensions]
+        by_ext = {}
+        for r in compiled:
+            for ext in r.extensions:
+                by_ext.setdefault(ext, []).append(r)
+        # Pre-merge each extension's candidates with the extension-less rules, keeping the user's order
+        self.by_ext = {ext: sorted(rs + any_ext, key=lambda r: r.index) for ext, rs in by_ext.items()}
+        self.any_ext = any_ext
+        self.rules = compiled
+        self.needs_size = any(r.needs_size for r in compiled)
+        with self._lock:
+            self.hits = {r.name: self.hits.get(r.name, 0) for r in compiled}
+
+    def match(self, filepath: str) -> Optional[Dict]:
+        """Returns the category of the first rule matching filepath, or None."""
+        if not self.rules:
+            return None
+        name = os.path.basename(filepath)
+        lowered = name.lower()
+        candidates = self.by_ext.get(os.path.splitext(lowered)[1], self.any_ext)
+        if not candidates:
+            return None
+        size = None
+        if self.needs_size:
+            try:
+                size = os.path.getsize(filepath)
+            except OSError:
+                pass
+        source = os.path.normcase(os.path.dirname(os.path.abspath(filepath)))
+        for rule in candidates:
+            if rule.matches(name, lowered, size, source):
+                with self._lock:
+                    self.hits[rule.name] = self.hits.get(rule.name, 0) + 1
+                return dict(rule.category)
+        return None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"rules": dict(self.hits), "llm_calls_avoided": sum(self.hits.values())}
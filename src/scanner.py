@@ -0,0 +1,128 @@
+import os
+import re
+import glob
+import json
+import fnmatch
+import hashlib
+from typing import Iterator, List, Optional, Tuple
+
+def compile_excludes(patterns: Optional[List[str]]):
+    """Folds exclude globs into one regex matched against both the entry name and its full path."""
+    if not patterns:
+        return None
+    return re.compile("|".join(fnmatch.translate(os.path.normcase(p)) for p in patterns))
+
+class ManualScanner:
+    """Streams files from the source folders with os.scandir and checkpoints finished directories.
+
+    Only the pending-directory stack is kept (in memory and in the checkpoint), never the file list,
+    so memory stays flat on huge shares. Resuming re-lists the directory that was interrupted:
+    files already sorted out of it are simply no longer there.
+    """
+
+    def __init__(self, sources: List[str], recursive: bool = False, exclude: Optional[List[str]] = None,
+                 checkpoint_file: Optional[str] = "scan_checkpoint.json", chunk_size: int = 500):
+        self.sources = [os.path.abspath(s) for s in sources]
+        self.recursive = recursive
+        self.exclude = compile_excludes(exclude)
+        self.checkpoint_file = checkpoint_file
+        self.chunk_size = max(1, chunk_size)
+        self.signature = hashlib.sha1(json.dumps([self.sources, recursive, exclude or []]).encode("utf-8")).hexdigest()
+        self.pending: List[Tuple[str, str]] = []  # (source root, directory) stack; the top is being listed
+        self.files_seen = 0
+        self.resumed = False
+
+    def _excluded(self, entry: os.DirEntry) -> bool:
+        if not self.exclude:
+            return False
+        return bool(self.exclude.match(os.path.normcase(entry.name)) or self.exclude.match(os.path.normcase(entry.path)))
+
+    def _load_checkpoint(self) -> bool:
+        if not self.checkpoint_file or not os.path.exists(self.checkpoint_file):
+            return False
+        try:
+            with open(self.checkpoint_file, 'r') as f:
+                state = json.load(f)
+        except (json.JSONDecodeError, IOError):
+            return False
+        if state.get("signature") != self.signature:
+            return False
+        self.pending = [tuple(item) for item in state.get("pending", [])]
+        self.files_seen = state.get("files_seen", 0)
+        return True
+
+    def save_checkpoint(self):
+        if not self.checkpoint_file:
+            return
+        tmp = self.checkpoint_file + ".tmp"
+        try:
+            with open(tmp, 'w') as f:
+                json.dump({"signature": self.signature, "pending": self.pending, "files_seen": self.files_seen}, f)
+            os.replace(tmp, self.checkpoint_file)
+        except IOError as e:
+            print(f"Error saving scan checkpoint: {e}")
+
+    def clear_checkpoint(self):
+        if self.checkpoint_file and os.path.exists(self.checkpoint_file):
+            os.remove(self.checkpoint_file)
+
+    def iter_files(self) -> Iterator[Tuple[str, os.DirEntry]]:
+        """Yields (source root, DirEntry) for every file, resuming from the checkpoint if one matches.
+
+        Callers that consume this directly are responsible for save_checkpoint()/clear_checkpoint().
+        """
+        self.resumed = self._load_checkpoint()
+        if not self.resumed:
+            self.pending = [(s, s) for s in reversed(self.sources) if os.path.isdir(s)]
+            self.files_seen = 0
+        while self.pending:
+            source, directory = self.pending[-1]
+            children = []
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if self._excluded(entry):
+                            continue
+                        try:
+                            if entry.is_file():
+                                self.files_seen += 1
+                                yield source, entry
+                            elif self.recursive and entry.is_dir(follow_symlinks=False):
+                                children.append(entry.path)
+                        except OSError:
+                            continue
+            except OSError as e:
+                print(f"Cannot scan {directory}: {e}")
+            self.pending.pop()
+            self.pending.extend((source, child) for child in reversed(children))
+
+    def chunks(self) -> Iterator[Tuple[str, List[str]]]:
+        """Groups the file stream into (source root, [paths]) chunks of at most chunk_size.
+
+        The checkpoint is refreshed each time the consumer asks for the next chunk, i.e. after
+        it has finished with the previous one, and removed once the last chunk is done.
+        """
+        current_source, chunk = None, []
+        for source, entry in self.iter_files():
+            if chunk and (source != current_source or len(chunk) >= self.chunk_size):
+                yield current_source, chunk
+                self.save_checkpoint()
+                chunk = []
+            current_source = source
+            chunk.append(entry.path)
+        if chunk:
+            yield current_source, chunk
+        self.clear_checkpoint()
+
+    @classmethod
+    def for_sources(cls, sources: List[str], target: str, inplace: bool, recursive: bool = False,
+                    exclude: Optional[List[str]] = None, chunk_size: int = 500) -> "ManualScanner":
+        """Builds a scanner that never walks into its own output.
+
+        In-place mode sorts into subfolders of each source, so recursion is disabled there;
+        otherwise the organized root is excluded in case it lives inside a source.
+        """
+        exclude = list(exclude or [])
+        if not inplace and target:
+            exclude.append(glob.escape(os.path.abspath(target)))
+        return cls(sources, recursive=recursive and not inplace, exclude=exclude, chunk_size=chunk_size)
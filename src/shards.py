@@ -0,0 +1,188 @@
+import os
+import sys
+import queue
+import signal
+import threading
+import multiprocessing
+from multiprocessing.managers import BaseManager
+from typing import Dict, List, Optional
+from src.sorter import FileSorter
+from src.watcher import FolderWatcher
+from src.history import HistoryStore
+from src.dirindex import DirectoryIndex
+from src.ratelimit import provider_of
+from src.metrics import REGISTRY, ERRORS
+
+REPORT_INTERVAL = 2.0  # seconds between a busy shard's stats/metrics reports
+
+class _IndexManager(BaseManager):
+    pass
+
+_IndexManager.register("DirectoryIndex", DirectoryIndex)
+
+def assign_shards(roots: List[str], processes: int) -> List[List[str]]:
+    """Deals the roots round-robin (in sorted order, so the split is stable) over at most `processes` groups."""
+    roots = sorted(roots)
+    count = max(1, min(processes, len(roots)))
+    return [roots[i::count] for i in range(count) if roots[i::count]]
+
+def split_limits(limits: Dict, shards: int, providers=()) -> Dict:
+    """Divides each provider's rpm/tpm/concurrency budget evenly between shard processes."""
+    split = {}
+    for name in set(limits) | set(providers):
+        settings = dict(limits.get(name, {}))
+        for key in ("rpm", "tpm"):
+            if settings.get(key):
+                settings[key] = settings[key] / shards
+        settings["concurrency"] = max(1, settings.get("concurrency", 8) // shards)
+        split[name] = settings
+    return split
+
+def _shard_main(shard: int, roots: List[str], target: str, inplace: bool, config: Dict, overrides: Dict, outputs: List[str],
+                index, events, commands, parent_pid: int, stdout: Optional[str] = None, history_file: Optional[str] = None):
+    if stdout:
+        sys.stdout = open(stdout, "a", buffering=1)
+    # The coordinator decides when to stop (and drains us first); don't die halfway on the group's Ctrl+C/SIGTERM
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    # History lives in the coordinator and the classifier file is its alone, so this process keeps neither
+    sorter = FileSorter.from_config(config, history_file=":memory:", classifier_file=None, **overrides)
+    sorter.dirindex = index
+    sorter.history.subscribe(lambda event, entry: events.put(("moved", shard, entry)) if event == "added" else None)
+    # Read-only view of the coordinator's journal, so catch-up still leaves files an undo put back alone
+    history = HistoryStore(history_file, legacy_json=None, readonly=True) if history_file else None
+    watcher = FolderWatcher.from_config(config, sorter, source_folders=roots, target_folder=target, inplace=inplace,
+                                        outputs=outputs, history=history)
+    source = f"shard-{os.getpid()}"
+    last = None
+
+    def report(stats):
+        events.put(("report", shard, {"source": source, "stats": stats, "metrics": REGISTRY.dump()}))
+
+    watcher.start()
+    drain = True
+    while True:
+        try:
+            command, argument = commands.get(timeout=REPORT_INTERVAL)
+        except queue.Empty:
+            if os.getppid() != parent_pid:
+                break  # the coordinator is gone; finish what we have and exit
+            stats = watcher.stats()
+            state = (stats["processed"], stats["events_received"], stats["queue_depth"])
+            if state != last:  # an idle shard sends nothing
+                report(stats)
+                last = state
+            continue
+        if command == "stop":
+            drain = argument
+            break
+    watcher.stop(drain=drain)
+    report(watcher.stats())
+    sorter.history.close()
+    if history:
+        history.close()
+
+class ShardedWatcher:
+    """FolderWatcher stand-in that spreads the source folders over worker processes.
+
+    Each shard process owns its own Observer, FolderWatcher and FileSorter built from the same config,
+    so a busy or stalled root only holds up its own process. This object is the coordinator: it keeps
+    the only history journal (appending the moves shards report), folds their metrics into REGISTRY,
+    and serves the single DirectoryIndex every process allocates destination names from, so two
+    shards can never choose the same target path.
+    """
+
+    def __init__(self, source_folders: list, target_folder: str, sorter: FileSorter, config: Dict, processes: int = 2,
+                 on_move_callback=None, inplace: bool = False, stdout: Optional[str] = None):
+        self.source_folders = [source_folders] if isinstance(source_folders, str) else source_folders
+        self.target_folder = target_folder
+        self.sorter = sorter
+        self.config = config
+        self.processes = max(1, processes)
+        self.on_move_callback = on_move_callback
+        self.inplace = inplace
+        self.stdout = stdout  # file the shards print to (e.g. os.devnull); None inherits ours
+        self.ctx = multiprocessing.get_context("spawn")  # forking a process full of threads is unsafe
+        self.shards = []  # [(process, commands, roots)]
+        self.reports = {}  # {shard: latest FolderWatcher.stats()}
+        self.manager = None
+        self.events = None
+        self.collector = None
+
+    def start(self):
+        roots = [folder for folder in self.source_folders if os.path.exists(folder)]
+        if not roots:
+            return
+        groups = assign_shards(roots, self.processes)
+        self.manager = _IndexManager(ctx=self.ctx)
+        self.manager.start()
+        index = self.manager.DirectoryIndex()
+        self.sorter.dirindex = index  # scans run by the coordinator allocate from the shared index too
+        self.events = self.ctx.Queue()
+        models = [self.config.get("model_name", "gemini/gemini-2.0-flash")] + self.config.get("route_models", [])
+        overrides = {"rate_limits": split_limits(self.config.get("rate_limits", {}), len(groups), {provider_of(m) for m in models}),
+                     "cache_file": self.sorter.cache.db_file if self.sorter.cache else None}  # the cache file is shared
+        # Shards keep no journal of their own, so they learn our earlier output folders from ours
+        outputs = sorted(self.sorter.history.destination_dirs()) if self.inplace and self.config.get("watch_recursive") else []
+        history_file = self.sorter.history.db_file
+        if history_file == ":memory:" or not os.path.exists(history_file):
+            history_file = None  # no journal on disk yet, so nothing has been undone
+        for shard, group in enumerate(groups):
+            commands = self.ctx.Queue()
+            process = self.ctx.Process(target=_shard_main, name=f"SortAI-shard-{shard}", daemon=True,
+                                       args=(shard, group, self.target_folder, self.inplace, self.config, overrides, outputs,
+                                             index, self.events, commands, os.getpid(), self.stdout, history_file))
+            process.start()
+            self.shards.append((process, commands, group))
+        self.collector = threading.Thread(target=self._collect, daemon=True, name="SortAI-shard-collector")
+        self.collector.start()
+        print(f"Watching {len(roots)} folders with {len(groups)} shard processes (In-place: {self.inplace})")
+
+    def _collect(self):
+        while True:
+            kind, shard, payload = self.events.get()
+            if kind == "closed":
+                return
+            if kind == "moved":
+                try:
+                    self.sorter.history.append(payload["filename"], payload["category"], payload["destination"],
+                                               payload["original_path"], payload.get("session"), payload.get("source"))
+                except Exception as e:
+                    ERRORS.inc(stage="history")
+                    print(f"Error saving history: {e}")
+                if self.on_move_callback:
+                    self.on_move_callback()
+            elif kind == "report":
+                self.reports[shard] = payload["stats"]
+                REGISTRY.attach(payload["source"], payload["metrics"])
+
+    def stats(self) -> Dict:
+        """FolderWatcher.stats() summed over the shards' latest reports."""
+        reports = list(self.reports.values())
+        total = {}
+        for report in reports:
+            for key, value in report.items():
+                total[key] = max(total.get(key, 0), value) if key == "max_wait" else total.get(key, 0) + value
+        processed = total.get("processed", 0)
+        total["avg_wait"] = sum(r["avg_wait"] * r["processed"] for r in reports) / processed if processed else 0.0
+        total["utilization"] = sum(r["utilization"] for r in reports) / len(reports) if reports else 0.0
+        total["shards"] = len(self.shards)
+        total["shards_alive"] = sum(1 for process, _, _ in self.shards if process.is_alive())
+        return total
+
+    def stop(self, drain: bool = True):
+        """Asks every shard to stop (draining its queue unless drain=False) and waits for their last moves."""
+        for _, commands, _ in self.shards:
+            commands.put(("stop", drain))
+        for process, _, _ in self.shards:
+            process.join()
+        if self.collector:
+            self.events.put(("closed", None, None))
+            self.collector.join()
+            self.collector = None
+        self.shards = []
+        if self.manager:
+            self.sorter.dirindex = DirectoryIndex()  # our view of the destinations is stale after the shards' moves
+            self.manager.shutdown()
+            self.manager = None
+        print("Stopped watching folder.")
@@ -0,0 +1,101 @@
+import os
+import time
+import sqlite3
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+Entry = Tuple[int, int, int]  # (size, mtime_ns, inode)
+
+def list_folder(root: str, recursive: bool = False, excluded: Optional[Callable[[str, bool], bool]] = None) -> Dict[str, Entry]:
+    """{path relative to root: (size, mtime_ns, inode)} of the files under root, via os.scandir.
+
+    `excluded(path, is_dir)` prunes folders (and skips files) the watcher ignores anyway, such as
+    our own output subtrees, so they never bloat the snapshot.
+    """
+    listing = {}
+    pending = [root]
+    while pending:
+        directory = pending.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if recursive and not (excluded and excluded(entry.path, True)):
+                                pending.append(entry.path)
+                            continue
+                        if not entry.is_file(follow_symlinks=False) or (excluded and excluded(entry.path, False)):
+                            continue
+                        st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue  # vanished while listing
+                    listing[os.path.relpath(entry.path, root)] = (st.st_size, st.st_mtime_ns, st.st_ino)
+        except OSError:
+            continue
+    return listing
+
+class FolderSnapshot:
+    """Per watched root, the files it held when we last looked, persisted in SQLite between runs.
+
+    Diffing a fresh listing against it tells the watcher which files arrived or changed while the
+    app was closed, so only those are sorted on start instead of rescanning everything.
+    """
+
+    def __init__(self, db_file: str = "folder_snapshot.db"):
+        self.db_file = db_file
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_file, check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")  # shard processes write their own roots concurrently
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS roots (root TEXT PRIMARY KEY, taken REAL NOT NULL);
+                CREATE TABLE IF NOT EXISTS files (
+                    root TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    inode INTEGER NOT NULL,
+                    PRIMARY KEY (root, path)
+                ) WITHOUT ROWID;
+            """)
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def _key(root: str) -> str:
+        return os.path.normcase(os.path.abspath(root))
+
+    def load(self, root: str) -> Optional[Dict[str, Entry]]:
+        """The saved listing of root, or None if root has never been snapshotted."""
+        key = self._key(root)
+        with self._lock:
+            conn = self._connect()
+            if not conn.execute("SELECT 1 FROM roots WHERE root = ?", (key,)).fetchone():
+                return None
+            rows = conn.execute("SELECT path, size, mtime_ns, inode FROM files WHERE root = ?", (key,))
+            return {path: (size, mtime_ns, inode) for path, size, mtime_ns, inode in rows}
+
+    def save(self, root: str, listing: Dict[str, Entry]):
+        """Replaces root's snapshot in one transaction."""
+        key = self._key(root)
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("DELETE FROM files WHERE root = ?", (key,))
+                conn.executemany("INSERT INTO files (root, path, size, mtime_ns, inode) VALUES (?, ?, ?, ?, ?)",
+                                 ((key, path, *entry) for path, entry in listing.items()))
+                conn.execute("INSERT OR REPLACE INTO roots (root, taken) VALUES (?, ?)", (key, time.time()))
+
+    @staticmethod
+    def changes(previous: Dict[str, Entry], current: Dict[str, Entry]):
+        """Relative paths that are new in current or whose size, mtime or inode differ."""
+        return [path for path, entry in current.items() if previous.get(path) != entry]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
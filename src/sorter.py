@@ -1,12 +1,38 @@
 import os
-import shutil
 import time
 import json
-import litellm
-from typing import Optional, Dict
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, List
+from src.cache import CategoryCache
+from src.history import HistoryStore
+from src.rules import RuleEngine
+from src.classifier import FilenameClassifier
+from src.mover import MoveEngine
+from src.dirindex import DirectoryIndex
+from src.ratelimit import RateLimiter, ThrottledError, provider_of, estimate_tokens
+from src.router import ProviderRouter
+from src.metrics import DECISIONS, ERRORS
+from src.lazy import LazyModule
+from src.suppression import SuppressionSet
+
+# litellm takes seconds to import; it is loaded by the first categorization instead of at startup
+litellm = LazyModule("litellm")
+
+class Category(dict):
+    """A {"folder", "subfolder"} answer that remembers what decided it (the DECISIONS source), for the history journal."""
+
+    def __init__(self, category: Dict, source: str):
+        super().__init__(category)
+        self.source = source
 
 class FileSorter:
-    def __init__(self, api_key: str = "", openai_key: str = "", anthropic_key: str = "", local_base_url: str = "", model_name: str = "gemini/gemini-2.0-flash", categories: list = None, auto_categories: bool = True):
+    def __init__(self, api_key: str = "", openai_key: str = "", anthropic_key: str = "", local_base_url: str = "", model_name: str = "gemini/gemini-2.0-flash", categories: list = None, auto_categories: bool = True, batch_size: int = 25, max_in_flight: int = 4,
+                 cache_file: Optional[str] = "category_cache.db", cache_max_entries: int = 10000, cache_ttl_days: float = 30,
+                 history_file: str = "history.db", rules: list = None,
+                 classifier_file: Optional[str] = "classifier.npz", classifier_threshold: float = 0.9, classifier_min_examples: int = 50,
+                 copies_per_device: int = 2, rate_limits: Optional[Dict] = None, max_retries: int = 4,
+                 route_models: list = None, hedge_requests: bool = False):
         self.api_key = api_key
         self.openai_key = openai_key
         self.anthropic_key = anthropic_key
@@ -14,17 +40,66 @@ class FileSorter:
         self.model_name = model_name
         self.categories = categories or []
         self.auto_categories = auto_categories
-        self.history_file = "history.json"
-        self.ignored_paths = {}  # {path: timestamp}
+        self.batch_size = max(1, batch_size)
+        self.max_in_flight = max(1, max_in_flight)
+        self.history = HistoryStore(history_file)
+        self.ignored_paths = SuppressionSet(10)  # paths we just restored or moved; their events are our own
+        self.rules = RuleEngine(rules)
+        self.mover = MoveEngine(copies_per_device)
+        self.dirindex = DirectoryIndex()
+        self.limiter = RateLimiter(rate_limits, max_retries)
+        self.route_models = route_models or []
+        self.router = ProviderRouter(hedge=hedge_requests)
+        self.classifier = FilenameClassifier(classifier_file, threshold=classifier_threshold, min_examples=classifier_min_examples) \
+            if classifier_file else None
+        if self.classifier and self.classifier.available:
+            self.history.subscribe(self.classifier.observe)
+        self.cache = CategoryCache(cache_file, cache_max_entries, cache_ttl_days) if cache_file else None
+        if self.cache:
+            self.cache.set_namespace(self.model_name, self._fixed_categories())
         
         self._set_env_vars()
 
+    @classmethod
+    def from_config(cls, config: Dict, **overrides) -> "FileSorter":
+        """Builds a sorter from a config.json dict (see src.config.DEFAULT_CONFIG); keyword overrides win."""
+        settings = dict(
+            api_key=config.get("api_key", ""),
+            openai_key=config.get("openai_api_key", ""),
+            anthropic_key=config.get("anthropic_api_key", ""),
+            local_base_url=config.get("local_base_url", ""),
+            model_name=config.get("model_name", "gemini/gemini-2.0-flash"),
+            categories=config.get("categories", []),
+            auto_categories=config.get("auto_categories", True),
+            batch_size=config.get("batch_size", 25),
+            max_in_flight=config.get("max_in_flight", 4),
+            cache_max_entries=config.get("cache_max_entries", 10000),
+            cache_ttl_days=config.get("cache_ttl_days", 30),
+            rules=config.get("rules", []),
+            classifier_threshold=config.get("classifier_threshold", 0.9),
+            rate_limits=config.get("rate_limits", {}),
+            max_retries=config.get("max_retries", 4),
+            route_models=config.get("route_models", []),
+            hedge_requests=config.get("hedge_requests", False),
+            classifier_min_examples=config.get("classifier_min_examples", 50),
+            copies_per_device=config.get("copies_per_device", 2)
+        )
+        settings.update(overrides)
+        return cls(**settings)
+
+    def warm_up(self):
+        """Starts importing the provider SDK in the background so the first categorization does not wait for it."""
+        if not litellm.loaded:
+            litellm.preload()
+
     def _set_env_vars(self):
         if self.api_key: os.environ["GEMINI_API_KEY"] = self.api_key
         if self.openai_key: os.environ["OPENAI_API_KEY"] = self.openai_key
         if self.anthropic_key: os.environ["ANTHROPIC_API_KEY"] = self.anthropic_key
 
-    def update_config(self, api_key: str, openai_key: str, anthropic_key: str, local_base_url: str, model_name: str, categories: list, auto_categories: bool):
+    def update_config(self, api_key: str, openai_key: str, anthropic_key: str, local_base_url: str, model_name: str, categories: list, auto_categories: bool, rules: list = None):
+        namespace_changed = model_name != self.model_name or sorted(categories or []) != sorted(self.categories) \
+            or auto_categories != self.auto_categories
         self.api_key = api_key
         self.openai_key = openai_key
         self.anthropic_key = anthropic_key
@@ -32,43 +107,156 @@ class FileSorter:
         self.model_name = model_name
         self.categories = categories
         self.auto_categories = auto_categories
+        if rules is not None:
+            self.rules.compile(rules)
         self._set_env_vars()
+        if self.cache and namespace_changed:
+            self.cache.set_namespace(self.model_name, self._fixed_categories())
+            self.cache.invalidate()
 
-    def log_history(self, filename, folder, subfolder, destination, original_path):
-        entry = {
-            "id": str(time.time()),
-            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-            "filename": filename,
-            "category": f"{folder}/{subfolder}",
-            "destination": destination,
-            "original_path": original_path
-        }
+    def apply_config(self, config: Dict):
+        """Swaps in the settings from a config.json dict that can change while files are in flight.
+
+        Each is read when a file or batch starts, so work already running finishes under the old values.
+        Storage locations (cache, history, classifier files) and copies_per_device need a new sorter.
+        """
+        self.update_config(
+            config.get("api_key", ""),
+            config.get("openai_api_key", ""),
+            config.get("anthropic_api_key", ""),
+            config.get("local_base_url", ""),
+            config.get("model_name", "gemini/gemini-2.0-flash"),
+            config.get("categories", []),
+            config.get("auto_categories", True),
+            config.get("rules", [])
+        )
+        self.batch_size = max(1, config.get("batch_size", 25))
+        self.max_in_flight = max(1, config.get("max_in_flight", 4))
+        self.route_models = config.get("route_models", [])
+        self.router.hedge = config.get("hedge_requests", False)
+        if self.classifier:
+            self.classifier.threshold = config.get("classifier_threshold", 0.9)
+        limits, retries = config.get("rate_limits", {}), config.get("max_retries", 4)
+        if limits != self.limiter.limits or retries != self.limiter.max_retries:
+            self.limiter.configure(limits, retries)  # otherwise keep the learned ceilings and in-flight slots
+
+    def _fixed_categories(self) -> List[str]:
+        """The manual category list, which only constrains the AI when auto categories are off."""
+        return [] if self.auto_categories else list(self.categories or [])
+
+    def _folder_hint(self) -> str:
+        fixed = self._fixed_categories()
+        if fixed:
+            return f"The folder MUST be one of: {', '.join(fixed)}."
+        return "Common folders: Documents, Images, Videos, Music, Code, Archives, etc."
+
+    def _local_guess(self, filename: str) -> Optional[Dict]:
+        """Asks the offline classifier, training it from history on first use."""
+        if not self.classifier or not self.classifier.available:
+            return None
+        if not self.classifier.trained:
+            self.classifier.train_from_history(self.history)
+        return self.classifier.classify(filename)
+
+    def classifier_stats(self) -> Dict:
+        return self.classifier.stats() if self.classifier else {}
+
+    def move_stats(self) -> Dict:
+        return self.mover.stats()
+
+    def rule_stats(self) -> Dict:
+        return self.rules.stats()
+
+    def rate_stats(self) -> Dict:
+        """Limiter state of the active provider, including its current throughput ceiling."""
+        return self.limiter.for_provider(provider_of(self.model_name)).stats()
+
+    def route_stats(self) -> Dict:
+        return self.router.stats()
+
+    def cache_stats(self) -> Dict:
+        return self.cache.stats() if self.cache else {}
+
+    def _cache_get(self, filename: str) -> Optional[Dict]:
+        return self.cache.get(filename) if self.cache else None
+
+    def _cache_put(self, filename: str, category: Dict):
+        if self.cache and self._valid_category(category):
+            self.cache.put(filename, category)
+
+    def log_history(self, filename, folder, subfolder, destination, original_path, session=None, source=None):
         try:
-            history = []
-            if os.path.exists(self.history_file):
-                with open(self.history_file, 'r') as f:
-                    history = json.load(f)
-            history.insert(0, entry)
-            history = history[:100]
-            with open(self.history_file, 'w') as f:
-                json.dump(history, f, indent=4)
+            return self.history.append(filename, f"{folder}/{subfolder}", destination, original_path, session, source)
         except Exception as e:
+            ERRORS.inc(stage="history")
             print(f"Error logging history: {e}")
 
     def undo_move(self, entry):
         """Reverses a move."""
+        return bool(self.undo_entries([entry]))
+
+    def _restore(self, entry) -> bool:
         dest = entry.get("destination")
         orig = entry.get("original_path")
-        if dest and orig and os.path.exists(dest):
-            try:
-                os.makedirs(os.path.dirname(orig), exist_ok=True)
-                shutil.move(dest, orig)
-                # Add to ignore list to prevent immediate re-sorting
-                self.ignored_paths[os.path.abspath(orig)] = time.time()
-                return True
-            except Exception as e:
-                print(f"Undo failed: {e}")
-        return False
+        if not (dest and orig and os.path.exists(dest)):
+            return False
+        try:
+            os.makedirs(os.path.dirname(orig), exist_ok=True)
+            self.mover.move(dest, orig)
+            self.dirindex.release(dest)
+            self.dirindex.add(orig)
+            return True
+        except Exception as e:
+            ERRORS.inc(stage="undo")
+            print(f"Undo failed: {e}")
+            return False
+
+    def undo_entries(self, entries: List[Dict], workers: int = 8) -> List[Dict]:
+        """Reverses many moves in parallel with one history commit. Returns the entries actually undone."""
+        entries = [e for e in entries if not e.get("undone")]
+        if not entries:
+            return []
+        # Moves that share a path (a file sorted twice, a name reused) must be reverted newest first, one by one
+        uses = {}
+        for entry in entries:
+            for path in (entry.get("destination"), entry.get("original_path")):
+                uses[path] = uses.get(path, 0) + 1
+        chained = [e for e in entries if uses[e.get("destination")] > 1 or uses[e.get("original_path")] > 1]
+        chained_ids = {id(e) for e in chained}
+        independent = [e for e in entries if id(e) not in chained_ids]
+        # Register restored paths before they reappear so the watcher does not re-sort them
+        self.ignored_paths.update(os.path.abspath(e["original_path"]) for e in entries if e.get("original_path"))
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(independent) or 1))) as pool:
+            results = list(zip(independent, pool.map(self._restore, independent)))
+        for entry in sorted(chained, key=lambda e: e.get("id") or 0, reverse=True):
+            results.append((entry, self._restore(entry)))
+        undone = [entry for entry, ok in results if ok]
+        # Restart the grace period now that the whole batch is back in place
+        self.ignored_paths.update(os.path.abspath(e["original_path"]) for e in undone)
+        ids = [e["id"] for e in undone if e.get("id") is not None]
+        if ids:
+            self.history.mark_undone(ids)
+        return undone
+
+    def undo_session(self, session: str, workers: int = 8) -> List[Dict]:
+        """Reverts every move of a scan/plan session still in effect."""
+        return self.undo_entries(self.history.session_entries(session), workers)
+
+    def undo_range(self, start: float, end: float, workers: int = 8) -> List[Dict]:
+        """Reverts every move made between two epoch timestamps."""
+        return self.undo_entries(self.history.entries_between(start, end), workers)
+
+    def undo_last_session(self, kind: Optional[str] = "scan", workers: int = 8) -> List[Dict]:
+        """Reverts the most recent session of the given kind (e.g. the last manual scan)."""
+        session = self.history.latest_session(kind)
+        return self.undo_session(session, workers) if session else []
+
+    def undo_last(self) -> Optional[Dict]:
+        """Reverts the most recent move still in effect. Returns the entry, or None if nothing was undone."""
+        entry = self.history.latest()
+        if entry and self.undo_move(entry):
+            return entry
+        return None
 
     def wait_for_file_stability(self, filepath: str, timeout: int = 5):
         """Wait until the file size stops changing."""
@@ -85,83 +273,417 @@ class FileSorter:
             time.sleep(0.5)
         return False
 
-    def categorize_file(self, filename: str) -> Dict:
-        """Uses AI (LiteLLM) to categorize a file based on its name."""
-        if not self.api_key:
-            return {"folder": "Other", "subfolder": "Misc"}
+    def _api_base(self, model_name: Optional[str] = None):
+        model_name = model_name or self.model_name
+        if provider_of(model_name) in ("gemini", "openai", "anthropic"):
+            return None
+        return self.local_base_url if "ollama" in model_name.lower() or "localhost" in self.local_base_url else None
+
+    def _completion_kwargs(self, prompt: str, model_name: Optional[str] = None) -> Dict:
+        return {
+            "model": model_name or self.model_name,
+            "messages": [{"role": "user", "content": prompt}],
+            "api_base": self._api_base(model_name),
+            "response_format": {"type": "json_object"}
+        }
+
+    def _has_credentials(self, model_name: str) -> bool:
+        keys = {"gemini": self.api_key, "openai": self.openai_key, "anthropic": self.anthropic_key}
+        provider = provider_of(model_name)
+        return bool(keys[provider]) if provider in keys else bool(self.local_base_url)
+
+    def _candidate_models(self) -> List[str]:
+        """The configured model first, then any route_models whose provider has credentials."""
+        extra = [m for m in self.route_models if m != self.model_name and self._has_credentials(m)]
+        return [self.model_name] + extra
+
+    def _can_ask_ai(self) -> bool:
+        """True if any candidate model has a key (or a local endpoint) to call it with."""
+        return any(self._has_credentials(m) for m in self._candidate_models())
+
+    def _complete(self, prompt: str, files: int = 1):
+        """litellm.completion on the best routed model, behind its provider's rate limits and retries."""
+        def request(model_name):
+            kwargs = self._completion_kwargs(prompt, model_name)
+            limiter = self.limiter.for_provider(provider_of(model_name))
+            return limiter.call(lambda: litellm.completion(**kwargs), estimate_tokens(prompt, files))
+        return self.router.run(self._candidate_models(), request)
 
-        prompt = f"""
+    async def _acomplete(self, prompt: str, files: int = 1):
+        def request(model_name):
+            kwargs = self._completion_kwargs(prompt, model_name)
+            limiter = self.limiter.for_provider(provider_of(model_name))
+            return limiter.acall(lambda: litellm.acompletion(**kwargs), estimate_tokens(prompt, files))
+        return await self.router.arun(self._candidate_models(), request)
+
+    def _single_prompt(self, filename: str) -> str:
+        return f"""
         Categorize the file '{filename}' into a folder and subfolder.
         Return ONLY a JSON object: {{"folder": "string", "subfolder": "string"}}
-        Common folders: Documents, Images, Videos, Music, Code, Archives, etc.
+        {self._folder_hint()}
         """
-        
+
+    def categorize_file(self, filename: str) -> Dict:
+        """Uses AI (LiteLLM) to categorize a file based on its name. Raises ThrottledError if the provider keeps refusing."""
+        cached = self._cache_get(filename) if self._can_ask_ai() else None
+        if cached:
+            DECISIONS.inc(source="cache")
+            return Category(cached, "cache")
+        guess = self._local_guess(filename)
+        if guess:
+            DECISIONS.inc(source="classifier")
+            return Category(guess, "classifier")
+        if not self._can_ask_ai():
+            DECISIONS.inc(source="default")
+            return Category({"folder": "Other", "subfolder": "Misc"}, "default")
+        return self._request_category(filename)
+
+    def _request_category(self, filename: str) -> Dict:
+        """Asks the provider about a single filename, bypassing the cache lookup."""
+        try:
+            started = time.time()
+            response = self._complete(self._single_prompt(filename))
+            return self._accept_single(filename, response.choices[0].message.content, time.time() - started)
+        except ThrottledError:
+            raise
+        except Exception as e:
+            ERRORS.inc(stage="categorize")
+            DECISIONS.inc(source="default")
+            print(f"AI Categorization error: {e}")
+            return Category({"folder": "Other", "subfolder": "Misc"}, "default")
+
+    async def _arequest_category(self, filename: str) -> Dict:
         try:
-            response = litellm.completion(
-                model=self.model_name,
-                messages=[{"role": "user", "content": prompt}],
-                api_base=self.local_base_url if "ollama" in self.model_name.lower() or "localhost" in self.local_base_url else None,
-                response_format={"type": "json_object"}
-            )
-            content = response.choices[0].message.content
-            return json.loads(content)
+            started = time.time()
+            response = await self._acomplete(self._single_prompt(filename))
+            return self._accept_single(filename, response.choices[0].message.content, time.time() - started)
+        except ThrottledError:
+            raise
         except Exception as e:
+            ERRORS.inc(stage="categorize")
+            DECISIONS.inc(source="default")
             print(f"AI Categorization error: {e}")
-            return {"folder": "Other", "subfolder": "Misc"}
+            return Category({"folder": "Other", "subfolder": "Misc"}, "default")
+
+    def _accept_single(self, filename: str, content: str, elapsed: float) -> Dict:
+        category = Category(json.loads(content), "llm")
+        DECISIONS.inc(source="llm")
+        if self.cache:
+            self.cache.record_provider_call(elapsed)
+        self._cache_put(filename, category)
+        return category
+
+    @staticmethod
+    def _valid_category(entry) -> bool:
+        return isinstance(entry, dict) and isinstance(entry.get("folder"), str) and isinstance(entry.get("subfolder"), str) \
+            and entry["folder"].strip() != "" and entry["subfolder"].strip() != ""
 
-    def organize_file(self, filepath: str, target_root: str):
-        """Moves the file to the organized folder."""
+    def _batch_prompt(self, filenames: List[str]) -> str:
+        return f"""
+        Categorize each of the following files into a folder and subfolder.
+        Files: {json.dumps(filenames)}
+        Return ONLY a JSON object mapping every filename exactly as given to {{"folder": "string", "subfolder": "string"}}.
+        {self._folder_hint()}
+        """
+
+    def _parse_batch(self, filenames: List[str], content: Optional[str]) -> Dict[str, Dict]:
+        """Returns the well-formed entries of a batch response; callers re-ask for the rest."""
+        parsed = {}
+        if content is not None:
+            try:
+                parsed = json.loads(content)
+            except (TypeError, ValueError) as e:
+                ERRORS.inc(stage="categorize")
+                print(f"AI Batch response was not JSON: {e}")
+            if not isinstance(parsed, dict):
+                parsed = {}
+
+        results = {}
+        for name in filenames:
+            entry = parsed.get(name)
+            if self._valid_category(entry):
+                self._cache_put(name, entry)
+                results[name] = Category(entry, "llm")
+        DECISIONS.inc(len(results), source="llm")
+        return results
+
+    def _split_cached(self, filenames: List[str]):
+        results = {}
+        for name in filenames:
+            known = self._cache_get(name)
+            if known:
+                DECISIONS.inc(source="cache")
+                known = Category(known, "cache")
+            else:
+                known = self._local_guess(name)
+                if known:
+                    DECISIONS.inc(source="classifier")
+                    known = Category(known, "classifier")
+            if known:
+                results[name] = known
+        return results, [name for name in filenames if name not in results]
+
+    def categorize_batch(self, filenames: List[str]) -> Dict[str, Dict]:
+        """Categorizes several filenames with a single LLM request. Returns {filename: category}.
+
+        Names the provider is still throttling after the limiter's retries are left out of the result.
+        """
+        filenames = list(dict.fromkeys(filenames))
+        if not self._can_ask_ai():
+            return {name: self.categorize_file(name) for name in filenames}
+
+        results, pending = self._split_cached(filenames)
+        if len(pending) > 1:
+            content = None
+            try:
+                started = time.time()
+                response = self._complete(self._batch_prompt(pending), len(pending))
+                content = response.choices[0].message.content
+                if self.cache:
+                    self.cache.record_provider_call(time.time() - started, len(pending))
+            except ThrottledError as e:
+                # Asking again per file would only multiply the 429s
+                print(f"AI Batch categorization throttled, leaving {len(pending)} files for later: {e}")
+                return results
+            except Exception as e:
+                ERRORS.inc(stage="categorize")
+                print(f"AI Batch categorization error: {e}")
+            results.update(self._parse_batch(pending, content))
+
+        for name in pending:
+            if name not in results:
+                try:
+                    results[name] = self._request_category(name)
+                except ThrottledError as e:
+                    print(f"AI Categorization throttled, leaving the rest of the batch for later: {e}")
+                    break
+        return results
+
+    async def acategorize_batch(self, filenames: List[str]) -> Dict[str, Dict]:
+        """Async twin of categorize_batch built on litellm.acompletion."""
+        filenames = list(dict.fromkeys(filenames))
+        if not self._can_ask_ai():
+            return {name: self.categorize_file(name) for name in filenames}
+
+        results, pending = self._split_cached(filenames)
+        if len(pending) > 1:
+            content = None
+            try:
+                started = time.time()
+                response = await self._acomplete(self._batch_prompt(pending), len(pending))
+                content = response.choices[0].message.content
+                if self.cache:
+                    self.cache.record_provider_call(time.time() - started, len(pending))
+            except ThrottledError as e:
+                # Asking again per file would only multiply the 429s
+                print(f"AI Batch categorization throttled, leaving {len(pending)} files for later: {e}")
+                return results
+            except Exception as e:
+                ERRORS.inc(stage="categorize")
+                print(f"AI Batch categorization error: {e}")
+            results.update(self._parse_batch(pending, content))
+
+        missing = [name for name in pending if name not in results]
+        answers = await asyncio.gather(*(self._arequest_category(n) for n in missing), return_exceptions=True)
+        for name, category in zip(missing, answers):
+            if isinstance(category, ThrottledError):
+                print(f"AI Categorization throttled, leaving {name} for later: {category}")
+            elif isinstance(category, BaseException):
+                raise category
+            else:
+                results[name] = category
+        return results
+
+    def _prepare_file(self, filepath: str, wait: bool = True) -> Optional[str]:
+        """Returns the absolute path if the file is ready to be sorted, otherwise None."""
         filepath = os.path.abspath(filepath)
         
-        # Check if file was recently undone
-        now = time.time()
+        # Files we just restored (undo) or moved ourselves get a 10 s grace period
         if filepath in self.ignored_paths:
-            if now - self.ignored_paths[filepath] < 10:  # 10s grace period
-                print(f"Skipping {filepath} (recently undone)")
-                return False
-            else:
-                del self.ignored_paths[filepath]
-
-        # Cleanup old ignore entries
-        self.ignored_paths = {p: t for p, t in self.ignored_paths.items() if now - t < 10}
+            print(f"Skipping {filepath} (recently moved by SortAI)")
+            return None
 
         print(f"Processing file: {filepath}")
         if not os.path.exists(filepath):
-            return False
+            return None
 
-        original_path = filepath
         filename = os.path.basename(filepath)
         
         # Skip temporary files
         if filename.endswith(('.tmp', '.crdownload', '.part')):
-            return False
+            return None
 
-        if not self.wait_for_file_stability(filepath):
-            return False
+        if wait and not self.wait_for_file_stability(filepath):
+            return None
+        return filepath
 
+    def resolve_destination(self, destination_dir: str, filename: str) -> str:
+        """Creates destination_dir if needed and reserves a free name in it (name, name_1, name_2, ...)."""
+        self.dirindex.ensure_dir(destination_dir)
+        return self.dirindex.allocate(destination_dir, filename)
+
+    def move_to(self, filepath: str, destination_path: str, folder: str, subfolder: str, session: Optional[str] = None,
+                source: Optional[str] = None) -> bool:
+        """Moves filepath to a reserved destination and records it in history."""
+        filename = os.path.basename(filepath)
+        for attempt in range(2):
+            try:
+                # Suppress before moving: the watcher can see the new name before move() returns
+                self.ignored_paths.add(os.path.abspath(destination_path))
+                self.mover.move(filepath, destination_path)
+                print(f"Moved {filename} to {destination_path}")
+                self.log_history(filename, folder, subfolder, destination_path, filepath, session, source)
+                return True
+            except (FileExistsError, FileNotFoundError) as e:
+                self.dirindex.release(destination_path)
+                if attempt or not os.path.exists(filepath):
+                    ERRORS.inc(stage="move")
+                    print(f"Failed to organize {filename}: {e}")
+                    return False
+                # Someone else changed the folder behind our index: check the disk, not a listing
+                destination_dir = os.path.dirname(destination_path)
+                self.dirindex.forget(destination_dir)
+                try:
+                    self.dirindex.ensure_dir(destination_dir)
+                    destination_path = self.dirindex.probe(destination_dir, filename)
+                except OSError as e:
+                    ERRORS.inc(stage="move")
+                    print(f"Failed to organize {filename}: {e}")
+                    return False
+            except Exception as e:
+                self.dirindex.release(destination_path)
+                ERRORS.inc(stage="move")
+                print(f"Failed to organize {filename}: {e}")
+                return False
+        return False
+
+    def _move_to_category(self, filepath: str, target_root: str, category: Dict, session: Optional[str] = None) -> bool:
+        """Moves an already categorized file under target_root/folder/subfolder."""
+        filename = os.path.basename(filepath)
         try:
-            category = self.categorize_file(filename)
             folder = category.get("folder", "Other")
             subfolder = category.get("subfolder", "Misc")
-            
-            destination_dir = os.path.join(target_root, folder, subfolder)
-            os.makedirs(destination_dir, exist_ok=True)
-            
-            destination_path = os.path.join(destination_dir, filename)
-            
-            # Handle duplicates
-            if os.path.exists(destination_path):
-                base, ext = os.path.splitext(filename)
-                counter = 1
-                while os.path.exists(destination_path):
-                    destination_path = os.path.join(destination_dir, f"{base}_{counter}{ext}")
-                    counter += 1
-            
-            shutil.move(filepath, destination_path)
-            print(f"Moved {filename} to {destination_path}")
-            self.log_history(filename, folder, subfolder, destination_path, original_path)
-            return True
-            
+            destination_path = self.resolve_destination(os.path.join(target_root, folder, subfolder), filename)
         except Exception as e:
+            ERRORS.inc(stage="move")
             print(f"Failed to organize {filename}: {e}")
             return False
+        return self.move_to(filepath, destination_path, folder, subfolder, session, getattr(category, "source", None))
+
+    def _throttled(self, filepath: str, on_throttled=None):
+        print(f"Leaving {os.path.basename(filepath)} in place: the provider is throttling")
+        if on_throttled:
+            on_throttled(filepath)
+
+    def organize_file(self, filepath: str, target_root: str, wait: bool = True, on_throttled=None):
+        """Moves the file to the organized folder. Pass wait=False if the caller already knows the file is stable.
+
+        A file the provider is still throttling stays where it is and is passed to on_throttled.
+        """
+        filepath = self._prepare_file(filepath, wait)
+        if not filepath:
+            return False
+        category = self.rules.match(filepath)
+        if category:
+            DECISIONS.inc(source="rule")
+            category = Category(category, "rule")
+        else:
+            try:
+                category = self.categorize_file(os.path.basename(filepath))
+            except ThrottledError:
+                self._throttled(filepath, on_throttled)
+                return False
+        return self._move_to_category(filepath, target_root, category)
+
+    def _split_by_rules(self, filepaths: List[str]):
+        """Applies local rules first; returns ({path: category}, [paths that still need the AI])."""
+        decided, remaining = {}, []
+        for filepath in filepaths:
+            category = self.rules.match(filepath)
+            if category:
+                DECISIONS.inc(source="rule")
+                decided[filepath] = Category(category, "rule")
+            else:
+                remaining.append(filepath)
+        return decided, remaining
+
+    def categorize_paths(self, filepaths: List[str]) -> Dict[str, Dict]:
+        """Rules first, then one batched AI request for the rest. Returns {filepath: category}.
+
+        Paths left undecided because the provider is throttling are missing from the result.
+        """
+        decided, remaining = self._split_by_rules(filepaths)
+        if remaining:
+            by_name = self.categorize_batch([os.path.basename(p) for p in remaining])
+            decided.update({p: by_name[os.path.basename(p)] for p in remaining if os.path.basename(p) in by_name})
+        return decided
+
+    async def acategorize_paths(self, filepaths: List[str]) -> Dict[str, Dict]:
+        decided, remaining = self._split_by_rules(filepaths)
+        if remaining:
+            by_name = await self.acategorize_batch([os.path.basename(p) for p in remaining])
+            decided.update({p: by_name[os.path.basename(p)] for p in remaining if os.path.basename(p) in by_name})
+        return decided
+
+    def organize_batch(self, filepaths: List[str], target_root: str, on_moved=None, session: Optional[str] = None,
+                       on_throttled=None) -> int:
+        """Organizes many files, categorizing them batch_size at a time. Returns the number moved."""
+        moved = 0
+        for start in range(0, len(filepaths), self.batch_size):
+            ready = [p for p in (self._prepare_file(f) for f in filepaths[start:start + self.batch_size]) if p]
+            if not ready:
+                continue
+            categories = self.categorize_paths(ready)
+            for filepath in ready:
+                if filepath not in categories:
+                    self._throttled(filepath, on_throttled)
+                elif self._move_to_category(filepath, target_root, categories[filepath], session):
+                    moved += 1
+                    if on_moved:
+                        on_moved()
+        return moved
+
+    def organize_many(self, filepaths: List[str], target_root: str, on_moved=None, wait: bool = True,
+                      session: Optional[str] = None, on_throttled=None) -> int:
+        """Organizes many files with up to max_in_flight concurrent batch requests. Returns the number moved.
+
+        Moves are tagged with session in history so the whole run can be undone at once. Files the
+        provider is still throttling stay in place and are passed to on_throttled.
+        """
+        return asyncio.run(self.aorganize_many(filepaths, target_root, on_moved, wait, session, on_throttled))
+
+    async def aorganize_many(self, filepaths: List[str], target_root: str, on_moved=None, wait: bool = True,
+                             session: Optional[str] = None, on_throttled=None) -> int:
+        limit = asyncio.Semaphore(self.max_in_flight)
+
+        async def is_stable(filepath):
+            return await asyncio.to_thread(self.wait_for_file_stability, filepath) if wait else True
+
+        async def categorize_chunk(chunk):
+            # Path checks are cheap, so they stay on the loop thread; only the blocking stability wait is offloaded
+            candidates = [p for p in (self._prepare_file(f, wait=False) for f in chunk) if p]
+            stable = await asyncio.gather(*(is_stable(p) for p in candidates))
+            ready = [p for p, ok in zip(candidates, stable) if ok]
+            if not ready:
+                return ready, {}
+            async with limit:
+                return ready, await self.acategorize_paths(ready)
+
+        tasks = [asyncio.ensure_future(categorize_chunk(filepaths[start:start + self.batch_size]))
+                 for start in range(0, len(filepaths), self.batch_size)]
+        moved = 0
+        try:
+            # Chunks finish in any order, but moves are applied strictly in input order
+            for task in tasks:
+                ready, categories = await task
+                for filepath in ready:
+                    if filepath not in categories:
+                        self._throttled(filepath, on_throttled)
+                    elif await asyncio.to_thread(self._move_to_category, filepath, target_root, categories[filepath], session):
+                        moved += 1
+                        if on_moved:
+                            on_moved()
+        finally:
+            for task in tasks:
+                task.cancel()
+        return moved
@@ -0,0 +1,140 @@
+import os
+import time
+import heapq
+import threading
+from src.metrics import STABILITY_WAIT
+
+class StabilityTracker:
+    """Single scheduler thread that watches pending files until their size/mtime settle.
+
+    Each tracked path is re-checked on a doubling backoff (min_interval .. max_interval), so
+    thousands of pending downloads cost one thread and one heap instead of a sleeping thread each.
+    """
+
+    def __init__(self, on_stable, min_interval: float = 0.25, max_interval: float = 30.0, give_up_after: float = 86400,
+                 on_dropped=None):
+        self.on_stable = on_stable
+        self.on_dropped = on_dropped  # called with paths that vanished or were given up on
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.give_up_after = give_up_after
+        self.pending = {}  # {path: [first_seen, interval, last_signature, generation]}
+        self.heap = []
+        self.emitted = 0
+        self.abandoned = 0
+        self.cond = threading.Condition()
+        self.thread = None
+        self.running = False
+
+    @staticmethod
+    def _signature(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (st.st_size, st.st_mtime_ns)
+
+    def track(self, path, delay: float = None):
+        """Starts (or restarts) tracking a path; a new event means the file is still changing.
+
+        delay postpones the first check (default min_interval).
+        """
+        now = time.time()
+        with self.cond:
+            entry = self.pending.get(path)
+            generation = entry[3] + 1 if entry else 0
+            first_seen = entry[0] if entry else now
+            self.pending[path] = [first_seen, self.min_interval, self._signature(path), generation]
+            heapq.heappush(self.heap, (now + (self.min_interval if delay is None else delay), generation, path))
+            self.cond.notify()
+
+    def _check(self, path, generation, now, dropped):
+        """Returns True when the path should be emitted; appends it to dropped if it is let go. Caller holds the lock."""
+        entry = self.pending.get(path)
+        if entry is None or entry[3] != generation:
+            return False  # superseded by a newer track() call
+        signature = self._signature(path)
+        if signature is None:
+            del self.pending[path]  # deleted or renamed away; the rename's own event re-tracks it
+            dropped.append(path)
+            return False
+        if signature == entry[2] and signature[0] > 0:
+            del self.pending[path]
+            STABILITY_WAIT.observe(now - entry[0])
+            return True
+        if now - entry[0] > self.give_up_after:
+            del self.pending[path]
+            self.abandoned += 1
+            print(f"Gave up waiting for {path} to settle")
+            dropped.append(path)
+            return False
+        # Still growing: back off, but never stop re-checking slow downloads
+        entry[1] = min(entry[1] * 2, self.max_interval)
+        entry[2] = signature
+        heapq.heappush(self.heap, (now + entry[1], generation, path))
+        return False
+
+    def _run(self):
+        while True:
+            ready, dropped = [], []
+            with self.cond:
+                while self.running and not (self.heap and self.heap[0][0] <= time.time()):
+                    self.cond.wait(self.heap[0][0] - time.time() if self.heap else None)
+                if not self.running:
+                    return
+                now = time.time()
+                while self.heap and self.heap[0][0] <= now:
+                    _, generation, path = heapq.heappop(self.heap)
+                    if self._check(path, generation, now, dropped):
+                        ready.append(path)
+                self.emitted += len(ready)
+            for path in ready:
+                self.on_stable(path)
+            if self.on_dropped:
+                for path in dropped:
+                    self.on_dropped(path)
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True, name="SortAI-stability")
+        self.thread.start()
+
+    def stop(self, final_check: bool = False):
+        """Stops the scheduler and returns the paths that were still settling.
+
+        With final_check, pending paths get one last look after min_interval: those unchanged since
+        their previous check are emitted to on_stable first, and only the rest are returned.
+        """
+        with self.cond:
+            self.running = False
+            self.cond.notify()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+        with self.cond:
+            entries = dict(self.pending)
+            self.pending.clear()
+            self.heap.clear()
+        if not (final_check and entries):
+            return list(entries)
+        time.sleep(self.min_interval)
+        remaining = []
+        now = time.time()
+        for path, entry in entries.items():
+            signature = self._signature(path)
+            if signature is None:
+                if self.on_dropped:
+                    self.on_dropped(path)
+                continue
+            if signature == entry[2] and signature[0] > 0:
+                STABILITY_WAIT.observe(now - entry[0])
+                with self.cond:
+                    self.emitted += 1
+                self.on_stable(path)
+            else:
+                remaining.append(path)
+        return remaining
+
+    def stats(self):
+        with self.cond:
+            return {"settling": len(self.pending), "stable": self.emitted, "abandoned": self.abandoned}
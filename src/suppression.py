@@ -0,0 +1,50 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Iterable
+
+class SuppressionSet:
+    """Paths to ignore for `ttl` seconds after they were added, e.g. files SortAI itself just moved.
+
+    Every entry lives for the same ttl, so insertion order is also expiry order: expiring is popping
+    from the front of an OrderedDict (re-adding a path moves it to the back). Each operation is O(1)
+    amortized instead of rebuilding the whole map.
+    """
+
+    def __init__(self, ttl: float = 10.0):
+        self.ttl = ttl
+        self.entries = OrderedDict()  # {path: monotonic time added}
+        self._lock = threading.Lock()
+
+    def _expire(self, now: float):
+        entries = self.entries
+        while entries:
+            path, added = next(iter(entries.items()))
+            if now - added < self.ttl:
+                break
+            entries.popitem(last=False)
+
+    def add(self, path: str):
+        self.update((path,))
+
+    def update(self, paths: Iterable[str]):
+        now = time.monotonic()
+        with self._lock:
+            for path in paths:
+                self.entries[path] = now
+                self.entries.move_to_end(path)
+            self._expire(now)
+
+    def discard(self, path: str):
+        with self._lock:
+            self.entries.pop(path, None)
+
+    def __contains__(self, path) -> bool:
+        with self._lock:
+            self._expire(time.monotonic())
+            return path in self.entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._expire(time.monotonic())
+            return len(self.entries)
@@ -1,65 +1,601 @@
 import time
+import heapq
+import queue
+import threading
+from collections import OrderedDict
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 from src.sorter import FileSorter
+from src.stability import StabilityTracker
+from src.scanner import compile_excludes
+from src.snapshot import FolderSnapshot, list_folder
+from src.metrics import EVENT_TO_ENQUEUE, QUEUE_WAIT, ERRORS
 import os
 
+class EventFilter:
+    """Decides, per event and before any queueing, which paths a (recursive) watch ignores.
+
+    A path is skipped when it was just moved by us (the sorter's suppression set), when its name or
+    path matches an exclude glob, or when any folder above it (up to the watched root) is excluded or
+    is one of our own output folders. The per-folder answer is cached, so an event costs a few dict
+    lookups rather than a regex match per path component.
+    """
+
+    def __init__(self, roots: list, exclude: list = None, suppressed=None, max_dirs: int = 4096):
+        self.roots = {os.path.normcase(os.path.abspath(root)) for root in roots}
+        self.exclude = compile_excludes(exclude)
+        self.suppressed = suppressed
+        self.outputs = set()
+        self.max_dirs = max_dirs
+        self.dirs = OrderedDict()  # {folder: excluded?}, least recently used first
+        self.skipped = 0
+        self._lock = threading.Lock()
+
+    def add_output(self, directory: str):
+        """Marks a folder whose whole subtree is our own output."""
+        directory = os.path.normcase(os.path.abspath(directory))
+        with self._lock:
+            if directory not in self.outputs:
+                self.outputs.add(directory)
+                self.dirs.clear()  # cached "not excluded" answers below it are now wrong
+
+    def _matches(self, path: str) -> bool:
+        return bool(self.exclude and (self.exclude.match(os.path.basename(path)) or self.exclude.match(path)))
+
+    def _dir_excluded(self, directory: str) -> bool:
+        cached = self.dirs.get(directory)
+        if cached is not None:
+            self.dirs.move_to_end(directory)
+            return cached
+        parent = os.path.dirname(directory)
+        if directory in self.outputs or (directory not in self.roots and self._matches(directory)):
+            excluded = True
+        elif directory in self.roots or parent == directory:
+            excluded = False
+        else:
+            excluded = self._dir_excluded(parent)
+        self.dirs[directory] = excluded
+        if len(self.dirs) > self.max_dirs:
+            self.dirs.popitem(last=False)
+        return excluded
+
+    def excluded(self, path: str, is_dir: bool = False) -> bool:
+        """Whether path (a file, or a folder when is_dir) is filtered out by the globs or our output folders."""
+        normalized = os.path.normcase(os.path.abspath(path))
+        with self._lock:
+            if is_dir:
+                return self._dir_excluded(normalized)
+            return self._matches(normalized) or self._dir_excluded(os.path.dirname(normalized))
+
+    def skip(self, path: str) -> bool:
+        path = os.path.abspath(path)
+        skipped = (self.suppressed is not None and path in self.suppressed) or self.excluded(path)
+        if skipped:
+            self.skipped += 1
+        return skipped
+
 class FileEventHandler(FileSystemEventHandler):
-    def __init__(self, sorter: FileSorter, target_folder: str, inplace: bool = False):
+    def __init__(self, sorter: FileSorter, target_folder: str, inplace: bool = False, enqueue=None, discard=None, skip=None):
         self.sorter = sorter
         self.target_folder = target_folder
         self.inplace = inplace
+        self.enqueue = enqueue
+        self.discard = discard
+        self.skip = skip
+
+    def dispatch_path(self, path):
+        # Only hand the path off; sorting happens on the watcher's worker threads
+        if self.enqueue:
+            self.enqueue(path)
+        else:
+            target = os.path.dirname(path) if self.inplace else self.target_folder
+            self.sorter.organize_file(path, target)
 
     def on_created(self, event):
-        if not event.is_directory:
+        if not event.is_directory and not (self.skip and self.skip(event.src_path)):
             print(f"File created: {event.src_path}")
-            # Run in a separate thread or just call directly (watchdog callbacks are in a thread)
-            target = os.path.dirname(event.src_path) if self.inplace else self.target_folder
-            self.sorter.organize_file(event.src_path, target)
+            self.dispatch_path(event.src_path)
 
     def on_moved(self, event):
         if not event.is_directory:
-            print(f"File moved: {event.dest_path}")
-            target = os.path.dirname(event.dest_path) if self.inplace else self.target_folder
-            self.sorter.organize_file(event.dest_path, target)
+            if self.discard:
+                self.discard(event.src_path)
+            if not (self.skip and self.skip(event.dest_path)):
+                print(f"File moved: {event.dest_path}")
+                self.dispatch_path(event.dest_path)
+
+class EventCoalescer:
+    """Merges repeated events for the same path that arrive within `window` seconds into one emit."""
+
+    def __init__(self, emit, window: float = 1.0):
+        self.emit = emit
+        self.window = window
+        self.pending = {}  # {path: deadline}
+        self.heap = []
+        self.collapsed = 0
+        self.received = 0
+        self.cond = threading.Condition()
+        self.thread = None
+        self.running = False
+
+    def add(self, path):
+        if self.window <= 0:
+            with self.cond:
+                self.received += 1
+            self.emit(path)
+            return
+        with self.cond:
+            self.received += 1
+            if path in self.pending:
+                self.collapsed += 1
+            deadline = time.time() + self.window
+            self.pending[path] = deadline
+            heapq.heappush(self.heap, (deadline, path))
+            self.cond.notify()
+
+    def discard(self, path):
+        """Forgets a pending path, e.g. the source side of a rename."""
+        with self.cond:
+            if self.pending.pop(path, None) is not None:
+                self.collapsed += 1
+
+    def _run(self):
+        while True:
+            ready = []
+            with self.cond:
+                while self.running and not self._due():
+                    timeout = self.heap[0][0] - time.time() if self.heap else None
+                    self.cond.wait(timeout)
+                if not self.running:
+                    return
+                now = time.time()
+                while self.heap and self.heap[0][0] <= now:
+                    deadline, path = heapq.heappop(self.heap)
+                    # Stale heap entries are left behind when a later event pushed the deadline back
+                    if self.pending.get(path) == deadline:
+                        del self.pending[path]
+                        ready.append(path)
+            for path in ready:
+                self.emit(path)
+
+    def _due(self):
+        return bool(self.heap) and self.heap[0][0] <= time.time()
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True, name="SortAI-coalescer")
+        self.thread.start()
+
+    def stop(self, flush: bool = True):
+        with self.cond:
+            self.running = False
+            self.cond.notify()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+        with self.cond:
+            remaining = sorted(self.pending, key=self.pending.get)
+            self.pending.clear()
+            self.heap.clear()
+        if flush:
+            for path in remaining:
+                self.emit(path)
 
 class FolderWatcher:
-    def __init__(self, source_folders: list, target_folder: str, sorter: FileSorter, on_move_callback=None, inplace: bool = False):
-        self.source_folders = source_folders
+    def __init__(self, source_folders: list, target_folder: str, sorter: FileSorter, on_move_callback=None, inplace: bool = False, workers: int = 2, coalesce_window: float = 1.0, stability_max_interval: float = 30.0,
+                 recursive: bool = False, exclude: list = None, outputs: list = None, snapshot_file: str = None,
+                 snapshot_interval: float = 60.0, history=None):
+        self.source_folders = [source_folders] if isinstance(source_folders, str) else source_folders
         self.target_folder = target_folder
         self.sorter = sorter
         self.inplace = inplace
+        self.recursive = recursive
+        self.exclude = exclude or []
+        self.outputs = outputs or []  # output folders known from elsewhere (e.g. a coordinator's history)
+        self.filter = None  # EventFilter, rebuilt by start() for the current folders
+        self.snapshot = FolderSnapshot(snapshot_file) if snapshot_file else None
+        self.snapshot_interval = snapshot_interval  # re-saved this often, so a crash loses at most this much
+        self.snapshot_thread = None
+        self._snapshot_stop = threading.Event()
+        self._snapshot_dirty = False  # set by events, drops and finished work; an idle watcher never re-saves
+        self.history = history  # journal to check for undone moves when the sorter keeps none (shards)
+        self.catch_up_threads = []
+        self.caught_up = 0
+        self._unsubscribe = None
         self.observer = Observer()
-        self.handler = FileEventHandler(sorter, target_folder, inplace)
+        self.watches = {}  # {folder: ObservedWatch} currently scheduled on the observer
+        # events -> coalescer -> stability tracker -> queue -> workers
+        self.stability = StabilityTracker(self.enqueue, max_interval=stability_max_interval, on_dropped=self.forget)
+        self.coalescer = EventCoalescer(self.stability.track, coalesce_window)
+        self.first_event = {}  # {path: time of the first event not yet enqueued}, for event-to-enqueue latency
+        self.handler = FileEventHandler(sorter, target_folder, inplace, enqueue=self.on_event, discard=self.discard,
+                                        skip=self.skip)
         self.on_move_callback = on_move_callback
+        self.worker_count = max(1, workers)
+        self.queue = queue.Queue()
+        self.workers = []
+        self.in_flight = set()
+        self.rerun = set()  # paths that got a new event while being processed
+        self.in_flight_duplicates = 0
+        self._stats_lock = threading.Lock()
+        self._reset_stats()
+
+    @classmethod
+    def from_config(cls, config: dict, sorter: FileSorter, **overrides) -> "FolderWatcher":
+        """Builds a watcher from a config.json dict (see src.config.DEFAULT_CONFIG); keyword overrides win."""
+        settings = dict(
+            source_folders=config.get("source_folders", []),
+            target_folder=config.get("target_folder", ""),
+            inplace=config.get("inplace_organization", True),
+            workers=config.get("watcher_workers", 2),
+            coalesce_window=config.get("coalesce_window", 1.0),
+            stability_max_interval=config.get("stability_max_interval", 30.0),
+            recursive=config.get("watch_recursive", False),
+            exclude=config.get("scan_exclude", []),
+            snapshot_file=config.get("snapshot_file", "folder_snapshot.db"),
+            snapshot_interval=config.get("snapshot_interval", 60.0)
+        )
+        settings.update(overrides)
+        return cls(sorter=sorter, **settings)
+
+    def _reset_stats(self):
+        self.started_at = time.time()
+        self.processed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.busy_seconds = 0.0
+        self.busy_workers = 0
+
+    def skip(self, filepath) -> bool:
+        skipped = bool(self.filter and self.filter.skip(filepath))
+        if skipped:
+            self._snapshot_dirty = True
+        return skipped
+
+    def _build_filter(self):
+        """Excludes our own output: the organized root, and in recursive in-place mode every Folder/Subfolder we sort into."""
+        if self._unsubscribe:
+            self._unsubscribe()
+            self._unsubscribe = None
+        output = EventFilter(self.source_folders, self.exclude, getattr(self.sorter, "ignored_paths", None))
+        if not self.inplace and self.target_folder:
+            output.add_output(self.target_folder)
+        elif self.recursive and getattr(self.sorter, "history", None):
+            for directory in list(self.outputs) + list(self.sorter.history.destination_dirs()):
+                output.add_output(directory)
+            self._unsubscribe = self.sorter.history.subscribe(
+                lambda event, entry: output.add_output(os.path.dirname(entry["destination"])) if event == "added" else None)
+        if self.filter:
+            output.skipped = self.filter.skipped
+        self.filter = output  # swapped in one assignment; the handler reads it per event
+
+    def _watched_roots(self):
+        return [folder for folder in self.source_folders if os.path.isdir(folder)]
+
+    def _start_catch_up(self, roots):
+        # After the observer watches roots, so nothing slips between the listing and the first event
+        thread = threading.Thread(target=self._catch_up, args=(roots,), daemon=True, name="SortAI-catch-up")
+        self.catch_up_threads = [t for t in self.catch_up_threads if t.is_alive()] + [thread]
+        thread.start()
+
+    def _snapshot_loop(self, roots):
+        """Catches up on roots, then keeps the snapshot current until stop()."""
+        self._catch_up(roots)
+        while not self._snapshot_stop.wait(self.snapshot_interval):
+            if not self._snapshot_dirty:
+                continue
+            self._snapshot_dirty = False  # cleared first, so activity during the save triggers the next one
+            self._save_snapshot(self._watched_roots(), self._unfinished())
+
+    def _catch_up(self, roots):
+        """Feeds files that appeared or changed while we were not running, per the last snapshot, into the pipeline."""
+        history = self.history or getattr(self.sorter, "history", None)
+        for root in roots:
+            try:
+                listing = list_folder(root, self.recursive, self.filter.excluded)
+                previous = self.snapshot.load(root)
+                changed = [] if previous is None else FolderSnapshot.changes(previous, listing)
+                if changed and history is not None:
+                    # An undo put these back on purpose; sorting them again would silently revert it
+                    undone = history.undone_paths([os.path.abspath(os.path.join(root, path)) for path in changed])
+                    changed = [path for path in changed if os.path.abspath(os.path.join(root, path)) not in undone]
+                # Files about to be sorted stay out of the snapshot until they are done, in case we crash first
+                pending = set(changed)
+                self.snapshot.save(root, {path: entry for path, entry in listing.items() if path not in pending})
+            except Exception as e:
+                ERRORS.inc(stage="snapshot")
+                print(f"Snapshot error for {root}: {e}")
+                continue
+            if previous is None:
+                print(f"Recorded a first snapshot of {root} ({len(listing)} files); existing files are left for a manual scan.")
+                continue
+            if changed:
+                print(f"Catching up on {len(changed)} file(s) that arrived in {root} while SortAI was closed.")
+            for path in changed:
+                self.on_event(os.path.join(root, path))
+            self.caught_up += len(changed)
+
+    def _unfinished(self) -> set:
+        """Paths somewhere in the pipeline (coalescing, settling, queued or being sorted)."""
+        with self.coalescer.cond:
+            paths = set(self.coalescer.pending)
+        with self.stability.cond:
+            paths.update(self.stability.pending)
+        with self.queue.mutex:
+            paths.update(item[0] for item in self.queue.queue if item)
+        with self._stats_lock:
+            paths.update(self.in_flight)
+        return paths
+
+    def _save_snapshot(self, roots, unfinished=()):
+        for root in roots:
+            try:
+                listing = list_folder(root, self.recursive, self.filter.excluded)
+                for path in unfinished:
+                    listing.pop(os.path.relpath(os.path.abspath(path), os.path.abspath(root)), None)
+                self.snapshot.save(root, listing)
+            except Exception as e:
+                ERRORS.inc(stage="snapshot")
+                print(f"Snapshot error for {root}: {e}")
+
+    def on_event(self, filepath):
+        self._snapshot_dirty = True
+        self.first_event.setdefault(filepath, time.time())
+        self.coalescer.add(filepath)
+
+    def forget(self, filepath):
+        """Drops the event-to-enqueue timestamp of a path that will never reach the queue."""
+        self._snapshot_dirty = True
+        self.first_event.pop(filepath, None)
+
+    def discard(self, filepath):
+        self.coalescer.discard(filepath)
+        self.forget(filepath)
+
+    def enqueue(self, filepath):
+        now = time.time()
+        first = self.first_event.pop(filepath, None)
+        if first is not None:
+            EVENT_TO_ENQUEUE.observe(now - first)
+        self.queue.put((filepath, now))
 
     def wrap_organize(self, filepath):
         target = os.path.dirname(filepath) if self.inplace else self.target_folder
-        success = self.sorter.organize_file(filepath, target)
+        # Files only reach the queue once the stability tracker has seen them settle
+        success = self.sorter.organize_file(filepath, target, wait=False, on_throttled=self.retry_later)
         if success and self.on_move_callback:
             self.on_move_callback()
 
+    def wrap_organize_many(self, filepaths):
+        """Feeds a burst of paths through the sorter's concurrent pipeline, grouped by destination root."""
+        by_target = {}
+        for filepath in filepaths:
+            target = os.path.dirname(filepath) if self.inplace else self.target_folder
+            by_target.setdefault(target, []).append(filepath)
+        for target, paths in by_target.items():
+            self.sorter.organize_many(paths, target, on_moved=self.on_move_callback, wait=False, on_throttled=self.retry_later)
+
+    def retry_later(self, filepath):
+        """Sends a file the provider throttled back through the stability tracker, one max_interval later."""
+        if os.path.exists(filepath):
+            self.stability.track(filepath, delay=self.stability.max_interval)
+
+    def _take_burst(self, first):
+        """Collects whatever else is already queued (up to one batch) behind the first item."""
+        items = [first]
+        while len(items) < getattr(self.sorter, "batch_size", 1):
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Leave the shutdown sentinel for this or another worker's next get()
+                self.queue.task_done()
+                self.queue.put(None)
+                break
+            items.append(item)
+        return items
+
+    def _claim(self, items):
+        """Registers paths as in flight, deferring any that another worker is already handling."""
+        claimed = []
+        with self._stats_lock:
+            for filepath, enqueued_at in items:
+                if filepath in self.in_flight:
+                    self.rerun.add(filepath)
+                    self.in_flight_duplicates += 1
+                else:
+                    self.in_flight.add(filepath)
+                    claimed.append((filepath, enqueued_at))
+        return claimed
+
+    def _release(self, items):
+        with self._stats_lock:
+            for filepath, _ in items:
+                self.in_flight.discard(filepath)
+            again = [p for p, _ in items if p in self.rerun]
+            self.rerun.difference_update(again)
+        for filepath in again:
+            if os.path.exists(filepath):
+                self.stability.track(filepath)
+
+    def _worker_loop(self):
+        while True:
+            first = self.queue.get()
+            if first is None:
+                self.queue.task_done()
+                return
+            burst = self._take_burst(first)
+            items = self._claim(burst)
+            if not items:
+                for _ in burst:
+                    self.queue.task_done()
+                continue
+            started = time.time()
+            with self._stats_lock:
+                self.busy_workers += 1
+                for _, enqueued_at in items:
+                    wait = started - enqueued_at
+                    QUEUE_WAIT.observe(wait)
+                    self.total_wait += wait
+                    self.max_wait = max(self.max_wait, wait)
+            try:
+                if len(items) == 1:
+                    self.wrap_organize(items[0][0])
+                else:
+                    self.wrap_organize_many([path for path, _ in items])
+            except Exception as e:
+                ERRORS.inc(stage="watcher")
+                print(f"Watcher worker error: {e}")
+            finally:
+                with self._stats_lock:
+                    self.busy_workers -= 1
+                    self.busy_seconds += time.time() - started
+                    self.processed += len(items)
+                self._snapshot_dirty = True
+                self._release(items)
+                for _ in burst:
+                    self.queue.task_done()
+
+    def stats(self):
+        """Queue depth, wait time and worker utilization since start()."""
+        with self._stats_lock:
+            elapsed = max(time.time() - self.started_at, 1e-9)
+            return {
+                "queue_depth": self.queue.qsize(),
+                "processed": self.processed,
+                "avg_wait": self.total_wait / self.processed if self.processed else 0.0,
+                "max_wait": self.max_wait,
+                "workers": len(self.workers),
+                "busy_workers": self.busy_workers,
+                "utilization": min(1.0, self.busy_seconds / (elapsed * max(len(self.workers), 1))),
+                "events_received": self.coalescer.received,
+                "events_collapsed": self.coalescer.collapsed,
+                "in_flight": len(self.in_flight),
+                "in_flight_duplicates": self.in_flight_duplicates,
+                "events_skipped": self.filter.skipped if self.filter else 0,
+                "caught_up": self.caught_up,
+                **self.stability.stats()
+            }
+
     def start(self):
+        self._reset_stats()
+        self.workers = [threading.Thread(target=self._worker_loop, daemon=True, name=f"SortAI-worker-{i}")
+                        for i in range(self.worker_count)]
+        for worker in self.workers:
+            worker.start()
+        self.stability.start()
+        self.coalescer.start()
+        self._build_filter()
+
         for folder in self.source_folders:
             if os.path.exists(folder):
-                self.observer.schedule(self.handler, folder, recursive=False)
-                print(f"Started watching {folder} (In-place: {self.inplace})")
+                self.watches[folder] = self.observer.schedule(self.handler, folder, recursive=self.recursive)
+                print(f"Started watching {folder} (In-place: {self.inplace}, Recursive: {self.recursive})")
         
         if self.observer.emitters:
             self.observer.start()
+        if self.snapshot:
+            self._snapshot_stop.clear()
+            self.snapshot_thread = threading.Thread(target=self._snapshot_loop, args=(self._watched_roots(),), daemon=True,
+                                                    name="SortAI-snapshot")
+            self.snapshot_thread.start()
 
-    def stop(self):
+    def stop(self, drain: bool = True):
+        """Stops the observer, then either finishes (drain) or drops (cancel) the queued files."""
         if self.observer.is_alive():
             self.observer.stop()
             self.observer.join()
+        self.observer = Observer()  # a watchdog Observer is a thread and cannot be started twice
+        self.watches = {}
+        self._snapshot_stop.set()
+        for thread in self.catch_up_threads + ([self.snapshot_thread] if self.snapshot_thread else []):
+            thread.join()
+        self.catch_up_threads = []
+        self.snapshot_thread = None
+        if self._unsubscribe:
+            self._unsubscribe()
+            self._unsubscribe = None
+        # Without drain, whatever is still in the pipeline may be dropped; it counts as new next time
+        cancelled = set() if drain or not self.snapshot else self._unfinished()
+        self.coalescer.stop(flush=drain)
+        if not drain:
+            self.first_event.clear()
+        settling = self.stability.stop(final_check=drain)  # draining still finishes files that have settled
+        for path in settling:
+            self.forget(path)
+        if settling:
+            print(f"Stopped with {len(settling)} file(s) still settling; " +
+                  ("they will be picked up on the next start." if self.snapshot else "a manual scan will pick them up."))
+        if not drain:
+            dropped = 0
+            while True:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                self.queue.task_done()
+                dropped += 1
+            if dropped:
+                print(f"Cancelled {dropped} queued file(s).")
+        for _ in self.workers:
+            self.queue.put(None)
+        for worker in self.workers:
+            worker.join()
+        self.workers = []
+        if self.snapshot and self.filter:
+            # Cancelled and unsettled files are left out, so they count as new next time
+            self._save_snapshot(self._watched_roots(), unfinished=cancelled.union(settling))
         print("Stopped watching folder.")
 
-    def update_folders(self, source_folders: list, target: str, inplace: bool):
-        self.stop()
+    def update_folders(self, source_folders: list, target: str, inplace: bool, recursive: bool = None, exclude: list = None) -> dict:
+        """Applies new folders and settings to a running watcher without stopping it.
+
+        Only folders that were added or removed are scheduled or unscheduled on the observer (all of
+        them when `recursive` flips, each new watch going up before its old one comes down). Events
+        already coalescing, settling or queued are kept and go to the new target. Returns the added
+        and removed folders.
+        """
+        source_folders = [source_folders] if isinstance(source_folders, str) else source_folders
+        reschedule = recursive is not None and recursive != self.recursive
         self.source_folders = source_folders
         self.target_folder = target
         self.inplace = inplace
         self.handler.target_folder = target
         self.handler.inplace = inplace
-        self.observer = Observer() # Re-init observer
-        self.start()
+        if recursive is not None:
+            self.recursive = recursive
+        if exclude is not None:
+            self.exclude = exclude
+        if not self.workers:
+            return {"added": [], "removed": []}  # not running; start() picks the new settings up
+
+        self._build_filter()
+        old = self.watches
+        watches = {}
+        for folder in source_folders:
+            if folder in watches or not os.path.exists(folder):
+                continue
+            if folder in old and not reschedule:
+                watches[folder] = old[folder]
+            else:
+                watches[folder] = self.observer.schedule(self.handler, folder, recursive=self.recursive)
+        for folder, watch in old.items():
+            if watches.get(folder) is not watch:
+                self.observer.unschedule(watch)
+        self.watches = watches
+        if watches and not self.observer.is_alive():
+            self.observer.start()
+
+        added = [folder for folder in watches if folder not in old]
+        removed = [folder for folder in old if folder not in watches]
+        for folder in added:
+            print(f"Started watching {folder} (In-place: {self.inplace}, Recursive: {self.recursive})")
+        for folder in removed:
+            print(f"Stopped watching {folder}")
+        if self.snapshot:
+            if removed:
+                self._save_snapshot([folder for folder in removed if os.path.isdir(folder)])
+            if added:
+                self._start_catch_up(added)
+        return {"added": added, "removed": removed}
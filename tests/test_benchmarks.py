@@ -0,0 +1,28 @@
+import unittest
+import os
+import sys
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.run import main
+from benchmarks.mock_llm import filenames_in, answer_for
+
+class TestBenchmarkHarness(unittest.TestCase):
+    def test_mock_understands_sorter_prompts(self):
+        from src.sorter import FileSorter
+        sorter = FileSorter(cache_file=None, classifier_file=None, history_file=":memory:")
+        self.assertEqual(filenames_in(sorter._batch_prompt(["a.pdf", "b c.zip"])), (["a.pdf", "b c.zip"], True))
+        self.assertEqual(filenames_in(sorter._single_prompt("IMG_0001.jpg")), (["IMG_0001.jpg"], False))
+        self.assertEqual(answer_for("release-1.2.3.tar.gz"), {"folder": "Archives", "subfolder": "Tarballs"})
+
+    def test_small_scan_end_to_end(self):
+        record = main(["scan", "--files", "30", "--latency", "0", "--batch-size", "10", "--no-wait", "--no-save"])
+        results = record["results"]
+        self.assertEqual(results["moved"], 30)
+        self.assertEqual(results["llm"]["files"], 30)
+        self.assertEqual(results["llm"]["requests"], 3)
+        self.assertIsNotNone(results["p99_latency"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+import os
+import sys
+import tempfile
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.classifier import FilenameClassifier, np
+from src.history import HistoryStore
+from src.sorter import FileSorter
+
+@unittest.skipIf(np is None, "NumPy not installed")
+class TestFilenameClassifier(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.history = HistoryStore(os.path.join(self.tmp.name, "history.db"), legacy_json=None)
+        for i in range(40):
+            self.history.append(f"invoice_{2000 + i}.pdf", "Work/Finance", f"/d/{i}.pdf", f"/s/{i}.pdf", source="llm")
+            self.history.append(f"setup_tool_v{i}.exe", "Installers/Windows", f"/d/{i}.exe", f"/s/{i}.exe", source="cache")
+
+    def tearDown(self):
+        self.history.close()
+        self.tmp.cleanup()
+
+    def make(self, **kwargs):
+        return FilenameClassifier(os.path.join(self.tmp.name, "model.npz"), min_examples=20, **kwargs)
+
+    def test_confident_predictions_from_history(self):
+        clf = self.make()
+        clf.train_from_history(self.history)
+        self.assertEqual(clf.classify("Invoice_2077.pdf"), {"folder": "Work", "subfolder": "Finance"})
+        self.assertEqual(clf.classify("setup_other_v9.exe")["folder"], "Installers")
+
+    def test_defers_below_threshold(self):
+        clf = self.make(threshold=0.999999)
+        clf.train_from_history(self.history)
+        self.assertIsNone(clf.classify("holiday_photo.jpg"))
+        self.assertEqual(clf.stats()["deferred"], 1)
+
+    def test_model_persists_and_resumes_incrementally(self):
+        clf = self.make()
+        clf.train_from_history(self.history)
+        resumed = self.make()
+        resumed.train_from_history(self.history)
+        self.assertEqual(resumed.stats()["examples"], 80)
+
+    def test_undo_is_a_negative_example(self):
+        clf = self.make()
+        clf.train_from_history(self.history)
+        self.history.subscribe(clf.observe)
+        ids = [e["id"] for e in self.history.page(limit=80) if e["category"] == "Work/Finance"]
+        self.history.mark_undone(ids)
+        self.assertEqual(clf.stats()["examples"], 40)
+        self.assertNotEqual(clf.predict("invoice_2090.pdf")[0], "Work/Finance")
+
+    def test_learns_only_from_ai_decisions(self):
+        for i in range(60):
+            self.history.append(f"report_{i}.docx", "Other/Misc", f"/d/{i}.docx", f"/s/{i}.docx", source="default")
+            self.history.append(f"photo_{i}.jpg", "Media/Photos", f"/d/{i}.jpg", f"/s/{i}.jpg", source="classifier")
+            self.history.append(f"notes_{i}.txt", "Documents/Text", f"/d/{i}.txt", f"/s/{i}.txt", source="rule")
+        self.history.append("old_import.csv", "Work/Data", "/d/x.csv", "/s/x.csv")  # unknown source
+        clf = self.make()
+        clf.train_from_history(self.history)
+        self.assertEqual(clf.stats()["examples"], 80)
+        self.assertEqual(sorted(clf.labels), ["Installers/Windows", "Work/Finance"])
+
+    def test_keyless_fallback_moves_do_not_train_the_sorter(self):
+        source, target = os.path.join(self.tmp.name, "source"), os.path.join(self.tmp.name, "target")
+        os.makedirs(source)
+        sorter = FileSorter(cache_file=None, history_file=os.path.join(self.tmp.name, "moves.db"),
+                            classifier_file=os.path.join(self.tmp.name, "sorter.npz"), classifier_min_examples=20)
+        for i in range(60):
+            path = os.path.join(source, f"invoice_{i}.pdf")
+            with open(path, "w") as f:
+                f.write("x")
+            self.assertTrue(sorter.organize_file(path, target, wait=False))
+        self.assertEqual(sorter.history.latest()["source"], "default")
+        sorter.api_key = "now-configured"
+        self.assertIsNone(sorter._local_guess("invoice_2024.pdf"))
+        sorter.history.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+import os
+import sys
+import json
+import tempfile
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.config import ConfigManager
+
+class TestConfigUpdates(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.config_file = os.path.join(self.tmp.name, "config.json")
+        self.manager = ConfigManager(self.config_file)
+        self.writes = 0
+        save = self.manager.save_config
+
+        def counting_save(config):
+            self.writes += 1
+            save(config)
+        self.manager.save_config = counting_save
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def saved(self):
+        with open(self.config_file) as f:
+            return json.load(f)
+
+    def test_update_writes_once_and_reports_changes(self):
+        changed = self.manager.update({"model_name": "gpt-4o", "batch_size": 25, "source_folders": ["/a"]})
+        self.assertEqual(changed, {"model_name", "source_folders"})
+        self.assertEqual(self.writes, 1)
+        self.assertEqual(self.saved()["model_name"], "gpt-4o")
+        self.assertEqual(self.manager.update({"model_name": "gpt-4o"}), set())
+        self.assertEqual(self.writes, 1)  # nothing changed, nothing written
+        self.assertEqual([name for name in os.listdir(self.tmp.name) if name != "config.json"], [])
+
+    def test_transaction_batches_and_rolls_back(self):
+        with self.manager.transaction():
+            self.manager.set("target_folder", "/sorted")
+            self.manager.set("auto_start", True)
+            self.assertEqual(self.writes, 0)
+        self.assertEqual(self.writes, 1)
+        self.assertTrue(self.saved()["auto_start"])
+        config = self.manager.config
+        with self.assertRaises(ValueError):
+            with self.manager.transaction():
+                self.manager.set("target_folder", "/elsewhere")
+                raise ValueError("form rejected")
+        self.assertIs(self.manager.config, config)
+        self.assertEqual(self.manager.get("target_folder"), "/sorted")
+        self.assertEqual((self.writes, self.saved()["target_folder"]), (1, "/sorted"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+import os
+import sys
+import json
+import time
+import signal
+import tempfile
+import threading
+import subprocess
+
+# Add project root to path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+
+from src.config import ConfigManager
+from src.sorter import FileSorter
+from src.daemon import SortAIDaemon, send_command
+
+@unittest.skipUnless(hasattr(signal, "SIGHUP"), "POSIX only")
+class TestHeadlessDaemon(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp.name, "source")
+        self.target = os.path.join(self.tmp.name, "target")
+        os.makedirs(self.source)
+        self.config_file = os.path.join(self.tmp.name, "config.json")
+        with open(self.config_file, "w") as f:
+            json.dump({"source_folders": [self.source], "target_folder": self.target, "inplace_organization": False,
+                       "coalesce_window": 0.1, "snapshot_file": os.path.join(self.tmp.name, "snapshot.db")}, f)
+        self.address = os.path.join(self.tmp.name, "sortai.sock")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def wait_for(self, condition, timeout=10):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if condition():
+                return True
+            time.sleep(0.05)
+        return False
+
+    def test_control_commands(self):
+        sorter = FileSorter(cache_file=None, classifier_file=None, history_file=os.path.join(self.tmp.name, "history.db"))
+        daemon = SortAIDaemon(ConfigManager(self.config_file), self.address, sorter=sorter)
+        thread = threading.Thread(target=daemon.run, kwargs={"install_signals": False})
+        thread.start()
+        try:
+            self.assertTrue(self.wait_for(lambda: os.path.exists(self.address)))
+            status = send_command(self.address, "status")
+            self.assertTrue(status["ok"])
+            self.assertEqual(status["watching"], [self.source])
+
+            self.assertTrue(send_command(self.address, "pause")["paused"])
+            with open(os.path.join(self.source, "notes.txt"), "w") as f:
+                f.write("x")
+            self.assertEqual(send_command(self.address, "status")["watching"], [])
+            self.assertTrue(send_command(self.address, "scan")["ok"])
+            moved = os.path.join(self.target, "Other", "Misc", "notes.txt")
+            self.assertTrue(self.wait_for(lambda: os.path.exists(moved)))
+            self.assertFalse(send_command(self.address, "resume")["paused"])
+            self.assertFalse(send_command(self.address, "frobnicate")["ok"])
+            self.assertTrue(send_command(self.address, "stop")["stopping"])
+            thread.join(timeout=10)
+            self.assertFalse(thread.is_alive())
+            self.assertFalse(os.path.exists(self.address))
+        finally:
+            if thread.is_alive():
+                daemon.request_stop()
+                thread.join()
+
+    def test_sigterm_drains_and_exits_without_ui_modules(self):
+        code = ("import sys, runpy\n"
+                "sys.argv = ['headless.py', '--config', sys.argv[1], '--control', sys.argv[2]]\n"
+                "try:\n"
+                "    runpy.run_path('headless.py', run_name='__main__')\n"
+                "finally:\n"
+                "    print('UI:', [m for m in ('tkinter', 'customtkinter', 'flet', 'pystray', 'PIL', 'plyer') if m in sys.modules])\n")
+        env = dict(os.environ, LITELLM_LOCAL_MODEL_COST_MAP="True")
+        process = subprocess.Popen([sys.executable, "-c", code, self.config_file, self.address], cwd=ROOT, env=env,
+                                   stdout=subprocess.PIPE, text=True)
+        try:
+            self.assertTrue(self.wait_for(lambda: os.path.exists(self.address)))
+            process.send_signal(signal.SIGTERM)
+            out, _ = process.communicate(timeout=30)
+        finally:
+            if process.poll() is None:
+                process.kill()
+        self.assertEqual(process.returncode, 0)
+        self.assertIn("Shutting down", out)
+        self.assertIn("UI: []", out)
+        self.assertFalse(os.path.exists(self.address))
+
+if __name__ == '__main__':
+    unittest.main()
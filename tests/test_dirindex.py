@@ -0,0 +1,73 @@
+import unittest
+import os
+import sys
+import tempfile
+from unittest import mock
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.dirindex import DirectoryIndex
+from src.sorter import FileSorter
+
+class TestDirectoryIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_suffixes_without_stat_per_candidate(self):
+        for name in ("a.txt", "a_1.txt"):
+            open(os.path.join(self.root, name), 'w').close()
+        index = DirectoryIndex()
+        with mock.patch("os.path.exists", side_effect=AssertionError("should not stat")):
+            paths = [index.allocate(self.root, "a.txt") for _ in range(3)]
+        self.assertEqual([os.path.basename(p) for p in paths], ["a_2.txt", "a_3.txt", "a_4.txt"])
+        self.assertEqual(index.scans, 1)
+
+    def test_claim_and_release(self):
+        index = DirectoryIndex()
+        path = os.path.join(self.root, "b.txt")
+        self.assertTrue(index.claim(path))
+        self.assertFalse(index.claim(path))
+        index.release(path)
+        self.assertTrue(index.claim(path))
+
+    def test_case_insensitive_names_collide(self):
+        open(os.path.join(self.root, "Report.PDF"), 'w').close()
+        index = DirectoryIndex(case_insensitive=True)
+        self.assertEqual(os.path.basename(index.allocate(self.root, "report.pdf")), "report_1.pdf")
+        self.assertFalse(index.claim(os.path.join(self.root, "REPORT_1.pdf")))
+        index.release(os.path.join(self.root, "REPORT_1.PDF"))
+        self.assertTrue(index.claim(os.path.join(self.root, "report_1.pdf")))
+
+    def test_retry_probes_the_disk(self):
+        sorter = FileSorter(history_file=":memory:", cache_file=None, classifier_file=None)
+        dest_dir = os.path.join(self.root, "out")
+        source = os.path.join(self.root, "d.txt")
+        open(source, 'w').close()
+        sorter.dirindex.ensure_dir(dest_dir)
+        for name in ("d.txt", "d_1.txt"):
+            open(os.path.join(dest_dir, name), 'w').close()
+        # The re-listing misses both files, e.g. a network share with a stale directory cache
+        with mock.patch("src.dirindex.os.scandir", side_effect=FileNotFoundError):
+            self.assertTrue(sorter.move_to(source, sorter.resolve_destination(dest_dir, "d.txt"), "Docs", "Text"))
+        self.assertTrue(os.path.exists(os.path.join(dest_dir, "d_2.txt")))
+        sorter.history.close()
+
+    def test_sorter_recovers_from_stale_index(self):
+        sorter = FileSorter(history_file=os.path.join(self.root, "history.db"), cache_file=None, classifier_file=None)
+        dest_dir = os.path.join(self.root, "out", "Docs", "Text")
+        source = os.path.join(self.root, "c.txt")
+        open(source, 'w').close()
+        sorter.dirindex.ensure_dir(dest_dir)
+        # Another program drops a file with the same name after the directory was indexed
+        open(os.path.join(dest_dir, "c.txt"), 'w').close()
+        self.assertTrue(sorter.move_to(source, sorter.resolve_destination(dest_dir, "c.txt"), "Docs", "Text"))
+        self.assertTrue(os.path.exists(os.path.join(dest_dir, "c_1.txt")))
+        sorter.history.close()
+
+if __name__ == '__main__':
+    unittest.main()
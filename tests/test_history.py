@@ -0,0 +1,97 @@
+import unittest
+import os
+import sys
+import json
+import tempfile
+import threading
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.history import HistoryStore
+
+class TestHistoryStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.tmp.name, "history.db")
+        self.legacy = os.path.join(self.tmp.name, "history.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_pages_are_newest_first(self):
+        store = HistoryStore(self.db_file, legacy_json=None)
+        for i in range(250):
+            store.append(f"file_{i}.txt", "Documents/Text", f"/dest/file_{i}.txt", f"/src/file_{i}.txt")
+        first = store.page(limit=100)
+        second = store.page(limit=100, before_id=first[-1]["id"])
+        self.assertEqual(first[0]["filename"], "file_249.txt")
+        self.assertEqual(second[0]["filename"], "file_149.txt")
+        self.assertEqual(store.count(), 250)
+        store.close()
+
+    def test_undone_entries_are_hidden(self):
+        store = HistoryStore(self.db_file, legacy_json=None)
+        a = store.append("a.txt", "Documents/Text", "/dest/a.txt", "/src/a.txt")
+        store.append("b.txt", "Documents/Text", "/dest/b.txt", "/src/b.txt")
+        store.mark_undone([store.latest()["id"]])
+        self.assertEqual(store.latest()["id"], a["id"])
+        self.assertEqual(len(store.page(include_undone=True)), 2)
+        store.close()
+
+    def test_concurrent_writers(self):
+        store = HistoryStore(self.db_file, legacy_json=None)
+        threads = [threading.Thread(target=lambda n=n: [store.append(f"{n}_{i}", "X/Y", "d", "o") for i in range(50)])
+                   for n in range(4)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+        self.assertEqual(store.count(), 200)
+        store.close()
+
+    def test_subscribers_receive_only_changes(self):
+        store = HistoryStore(self.db_file, legacy_json=None)
+        events = []
+        unsubscribe = store.subscribe(lambda event, entry: events.append((event, entry["id"])))
+        entry = store.append("a.txt", "Documents/Text", "/dest/a.txt", "/src/a.txt")
+        store.mark_undone([entry["id"]])
+        unsubscribe()
+        store.append("b.txt", "Documents/Text", "/dest/b.txt", "/src/b.txt")
+        self.assertEqual(events, [("added", entry["id"]), ("undone", entry["id"])])
+        store.close()
+
+    def test_legacy_json_is_imported_once(self):
+        with open(self.legacy, 'w') as f:
+            json.dump([
+                {"id": "2", "timestamp": "2024-01-02 10:00:00", "filename": "new.pdf", "category": "Work/Finance", "destination": "/d/new.pdf", "original_path": "/s/new.pdf"},
+                {"id": "1", "timestamp": "2024-01-01 10:00:00", "filename": "old.pdf", "category": "Work/Finance", "destination": "/d/old.pdf", "original_path": "/s/old.pdf"},
+            ], f)
+        store = HistoryStore(self.db_file, legacy_json=self.legacy)
+        self.assertEqual([e["filename"] for e in store.page()], ["new.pdf", "old.pdf"])
+        store.close()
+        store = HistoryStore(self.db_file, legacy_json=self.legacy)
+        self.assertEqual(store.count(), 2)
+        store.close()
+
+    def test_sessions_and_old_schema(self):
+        import sqlite3
+        conn = sqlite3.connect(self.db_file)
+        conn.execute("CREATE TABLE moves (id INTEGER PRIMARY KEY AUTOINCREMENT, created REAL NOT NULL, timestamp TEXT NOT NULL, "
+                     "filename TEXT NOT NULL, category TEXT NOT NULL, destination TEXT NOT NULL, original_path TEXT NOT NULL, "
+                     "undone INTEGER NOT NULL DEFAULT 0)")
+        conn.commit()
+        conn.close()
+        store = HistoryStore(self.db_file, legacy_json=None)
+        store.append("watched.txt", "Documents/Text", "/d/watched.txt", "/s/watched.txt")
+        session = HistoryStore.new_session("scan")
+        for i in range(3):
+            store.append(f"{i}.txt", "Documents/Text", f"/d/{i}.txt", f"/s/{i}.txt", session=session)
+        self.assertEqual(store.latest_session("scan"), session)
+        self.assertIsNone(store.latest_session("plan"))
+        self.assertEqual([e["filename"] for e in store.session_entries(session)], ["2.txt", "1.txt", "0.txt"])
+        store.mark_undone([e["id"] for e in store.session_entries(session)])
+        self.assertIsNone(store.latest_session("scan"))
+        self.assertEqual(store.count(), 1)
+        store.close()
+
+if __name__ == '__main__':
+    unittest.main()
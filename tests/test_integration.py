@@ -14,6 +14,7 @@ from src.watcher import FolderWatcher
 # Mock Gemini API for testing without a key
 class MockSorter(FileSorter):
     def __init__(self):
+        super().__init__(cache_file=None, classifier_file=None, history_file=":memory:")
         self.model = True # Fake it
         
     def categorize_file(self, filename: str):
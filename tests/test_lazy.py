@@ -0,0 +1,33 @@
+import unittest
+import os
+import sys
+import json
+import subprocess
+
+# Add project root to path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+
+from src.lazy import LazyModule, installed
+
+class TestLazyModule(unittest.TestCase):
+    def test_imports_on_first_attribute_access(self):
+        module = LazyModule("colorsys")
+        self.assertFalse(module.loaded)
+        self.assertEqual(module.rgb_to_hsv(0, 0, 0), (0, 0, 0))
+        self.assertTrue(module.loaded)
+
+    def test_installed_does_not_import(self):
+        self.assertTrue(installed("json"))
+        self.assertFalse(installed("sortai_no_such_module"))
+
+    def test_startup_defers_heavy_modules(self):
+        code = ("import sys, json\n"
+                "from src.sorter import FileSorter\n"
+                "FileSorter(cache_file=None, classifier_file='classifier-test.npz', history_file=':memory:')\n"
+                "print(json.dumps([m for m in ('litellm', 'numpy', 'pystray', 'PIL', 'plyer') if m in sys.modules]))")
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=ROOT, check=True).stdout
+        self.assertEqual(json.loads(out.strip().splitlines()[-1]), [])
+
+if __name__ == '__main__':
+    unittest.main()
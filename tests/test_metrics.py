@@ -0,0 +1,66 @@
+import unittest
+import os
+import sys
+import json
+import tempfile
+import urllib.request
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.metrics import MetricsRegistry, MetricsServer, MOVE_SECONDS, COLLISIONS
+from src.mover import MoveEngine
+from src.dirindex import DirectoryIndex
+
+class TestMetrics(unittest.TestCase):
+    def test_prometheus_text_and_snapshot(self):
+        registry = MetricsRegistry()
+        latency = registry.histogram("test_latency_seconds", "Latency", buckets=(0.1, 1))
+        errors = registry.counter("test_errors_total", "Errors")
+        latency.observe(0.05, model="a")
+        latency.observe(0.5, model="a")
+        errors.inc(stage="move")
+        text = registry.render()
+        self.assertIn('test_latency_seconds_bucket{model="a",le="0.1"} 1', text)
+        self.assertIn('test_latency_seconds_bucket{model="a",le="+Inf"} 2', text)
+        self.assertIn('test_errors_total{stage="move"} 1', text)
+        snapshot = registry.snapshot()
+        self.assertEqual(snapshot["test_latency_seconds"][0]["count"], 2)
+        self.assertEqual(latency.quantile(0.95, model="a"), 1)
+
+    def test_endpoint_serves_both_formats(self):
+        registry = MetricsRegistry()
+        registry.counter("test_hits_total", "Hits").inc(3)
+        server = MetricsServer(port=0, registry=registry)
+        server.start()
+        try:
+            base = f"http://127.0.0.1:{server.port}"
+            with urllib.request.urlopen(base + "/metrics") as response:
+                self.assertIn("test_hits_total 3", response.read().decode())
+            with urllib.request.urlopen(base + "/metrics.json") as response:
+                self.assertEqual(json.load(response)["test_hits_total"][0]["value"], 3)
+        finally:
+            server.stop()
+
+    def test_server_from_config_is_optional_and_tolerates_a_taken_port(self):
+        self.assertIsNone(MetricsServer.from_config({"metrics_port": 0}))
+        first = MetricsServer(port=0)
+        first.start()
+        try:
+            self.assertIsNone(MetricsServer.from_config({"metrics_port": first.port}))
+        finally:
+            first.stop()
+
+    def test_pipeline_stages_are_recorded(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            src = os.path.join(tmp, "a.txt")
+            open(src, 'w').close()
+            renames = MOVE_SECONDS.count(method="rename")
+            collisions = COLLISIONS.value()
+            MoveEngine().move(src, os.path.join(tmp, "b.txt"))
+            DirectoryIndex().allocate(tmp, "b.txt")
+            self.assertEqual(MOVE_SECONDS.count(method="rename"), renames + 1)
+            self.assertEqual(COLLISIONS.value(), collisions + 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+import os
+import sys
+import errno
+import tempfile
+from unittest import mock
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.mover import MoveEngine
+
+class TestMoveEngine(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self.tmp.name, "big.bin")
+        with open(self.src, 'wb') as f:
+            f.write(os.urandom(3 * 1024 * 1024))
+        self.dst = os.path.join(self.tmp.name, "out", "big.bin")
+        os.makedirs(os.path.dirname(self.dst))
+        self.engine = MoveEngine()
+
+    def tearDown(self):
+        self.engine.shutdown()
+        self.tmp.cleanup()
+
+    def test_same_device_is_a_rename(self):
+        self.engine.move(self.src, self.dst)
+        self.assertTrue(os.path.exists(self.dst))
+        self.assertEqual(self.engine.stats()["renames"], 1)
+
+    def test_cross_device_copies_atomically(self):
+        with open(self.src, 'rb') as f:
+            payload = f.read()
+        real_rename = os.rename
+        def rename(a, b):
+            if a == self.src:
+                raise OSError(errno.EXDEV, "Invalid cross-device link")
+            return real_rename(a, b)
+        progress = []
+        with mock.patch("src.mover.os.rename", side_effect=rename):
+            self.engine.move(self.src, self.dst, on_progress=lambda done, total: progress.append((done, total)))
+        with open(self.dst, 'rb') as f:
+            self.assertEqual(f.read(), payload)
+        self.assertFalse(os.path.exists(self.src))
+        self.assertEqual(os.listdir(os.path.dirname(self.dst)), ["big.bin"])  # no leftover .part file
+        self.assertEqual(progress[-1], (len(payload), len(payload)))
+        self.assertEqual(self.engine.stats()["copies"], 1)
+        self.assertGreater(self.engine.stats()["bytes_per_second"], 0)
+
+    def test_kernel_copy_returning_zero_falls_back_to_read_write(self):
+        with open(self.src, 'rb') as f:
+            payload = f.read()
+        def rename(a, b):
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+        with mock.patch("src.mover.os.rename", side_effect=rename), \
+             mock.patch("src.mover.os.copy_file_range", return_value=0, create=True), \
+             mock.patch("src.mover.os.sendfile", return_value=0, create=True):
+            self.engine.move(self.src, self.dst)
+        with open(self.dst, 'rb') as f:
+            self.assertEqual(f.read(), payload)
+        self.assertFalse(os.path.exists(self.src))
+
+    def test_short_copy_keeps_the_source(self):
+        def rename(a, b):
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+        with mock.patch("src.mover.os.rename", side_effect=rename), \
+             mock.patch.object(MoveEngine, "_copy_data", return_value=0):
+            with self.assertRaises(OSError):
+                self.engine.move(self.src, self.dst)
+        self.assertTrue(os.path.exists(self.src))
+        self.assertEqual(os.listdir(os.path.dirname(self.dst)), [])
+
+    def test_failed_copy_leaves_nothing_visible(self):
+        def rename(a, b):
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+        with mock.patch("src.mover.os.rename", side_effect=rename), \
+             mock.patch.object(MoveEngine, "_copy_data", side_effect=OSError(errno.ENOSPC, "No space left")):
+            with self.assertRaises(OSError):
+                self.engine.move(self.src, self.dst)
+        self.assertEqual(os.listdir(os.path.dirname(self.dst)), [])
+        self.assertTrue(os.path.exists(self.src))
+
+    def test_refuses_to_overwrite(self):
+        open(self.dst, 'w').close()
+        with self.assertRaises(FileExistsError):
+            self.engine.move(self.src, self.dst)
+
+if __name__ == '__main__':
+    unittest.main()
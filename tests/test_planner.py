@@ -0,0 +1,85 @@
+import unittest
+import os
+import sys
+import tempfile
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.sorter import FileSorter
+from src.planner import MovePlan, build_plan, execute_plan
+
+class TestPlanner(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp.name, "source")
+        self.target = os.path.join(self.tmp.name, "target")
+        os.makedirs(os.path.join(self.target, "Documents", "Text"))
+        with open(os.path.join(self.target, "Documents", "Text", "notes.txt"), 'w') as f:
+            f.write("already there")
+        os.makedirs(self.source)
+        for name in ["notes.txt", "todo.txt", "song.mp3"]:
+            with open(os.path.join(self.source, name), 'w') as f:
+                f.write(name)
+        self.sorter = FileSorter(cache_file=None, classifier_file=None, history_file=os.path.join(self.tmp.name, "h.db"),
+                                 rules=[{"extensions": [".txt"], "folder": "Documents", "subfolder": "Text"},
+                                        {"extensions": [".mp3"], "folder": "Music", "subfolder": "Tracks"}])
+
+    def tearDown(self):
+        self.sorter.history.close()
+        self.tmp.cleanup()
+
+    def test_plan_is_a_dry_run_with_resolved_collisions(self):
+        plan = build_plan(self.sorter, [self.source], self.target, inplace=False)
+        destinations = {os.path.basename(m["source"]): m["destination"] for m in plan.moves}
+        self.assertEqual(destinations["notes.txt"], os.path.join(self.target, "Documents", "Text", "notes_1.txt"))
+        self.assertEqual(destinations["song.mp3"], os.path.join(self.target, "Music", "Tracks", "song.mp3"))
+        self.assertEqual(len(os.listdir(self.source)), 3)
+
+    def test_plan_skips_partial_downloads_and_restored_files(self):
+        for name in ["movie.mkv.part", "setup.exe.crdownload"]:
+            with open(os.path.join(self.source, name), 'w') as f:
+                f.write(name)
+        self.sorter.ignored_paths.add(os.path.abspath(os.path.join(self.source, "todo.txt")))  # just undone
+        plan = build_plan(self.sorter, [self.source], self.target, inplace=False)
+        self.assertEqual(sorted(os.path.basename(m["source"]) for m in plan.moves), ["notes.txt", "song.mp3"])
+
+    def test_saved_plan_executes_and_reruns(self):
+        path = os.path.join(self.tmp.name, "plan.json")
+        build_plan(self.sorter, [self.source], self.target, inplace=False).save(path)
+        plan = MovePlan.load(path)
+        self.assertEqual(execute_plan(self.sorter, plan, workers=2)["done"], 3)
+        self.assertEqual(os.listdir(self.source), [])
+        self.assertTrue(os.path.exists(os.path.join(self.target, "Documents", "Text", "todo.txt")))
+        self.assertEqual(self.sorter.history.count(), 3)
+        self.assertEqual(execute_plan(self.sorter, plan)["done"], 3)  # nothing left to do
+
+    def test_interrupted_run_keeps_its_progress(self):
+        path = os.path.join(self.tmp.name, "plan.json")
+        plan = build_plan(self.sorter, [self.source], self.target, inplace=False)
+        move_to = self.sorter.move_to
+        moved = []
+
+        def crash_after_first(*args):
+            if moved:
+                raise KeyboardInterrupt
+            moved.append(args[0])
+            return move_to(*args)
+
+        self.sorter.move_to = crash_after_first
+        with self.assertRaises(KeyboardInterrupt):
+            execute_plan(self.sorter, plan, workers=1, on_progress=plan.autosave(path, interval=0))
+        saved = {m["source"]: m["status"] for m in MovePlan.load(path).moves}
+        self.assertEqual(saved[moved[0]], "done")
+        self.assertEqual(sorted(saved.values()), ["done", "pending", "pending"])
+
+    def test_hand_edited_moves_are_recorded_as_user_decisions(self):
+        plan = build_plan(self.sorter, [self.source], self.target, inplace=False)
+        song = next(m for m in plan.moves if m["source"].endswith("song.mp3"))
+        song["folder"], song["subfolder"] = "Media", "Podcasts"
+        execute_plan(self.sorter, plan, workers=1)
+        sources = {e["filename"]: e["source"] for e in self.sorter.history.page()}
+        self.assertEqual(sources, {"song.mp3": "user", "notes.txt": "rule", "todo.txt": "rule"})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+import os
+import sys
+import json
+import asyncio
+import tempfile
+from types import SimpleNamespace
+from unittest import mock
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.ratelimit import ProviderLimiter, ThrottledError, TokenBucket, provider_of
+from src.sorter import FileSorter
+
+class RateLimitError(Exception):
+    status_code = 429
+
+class AuthenticationError(Exception):
+    status_code = 401
+
+def fake_response(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+class TestProviderLimiter(unittest.TestCase):
+    def test_token_bucket_waits_once_burst_is_spent(self):
+        bucket = TokenBucket(per_minute=60)
+        self.assertEqual(sum(bucket.reserve() for _ in range(60)), 0)
+        self.assertAlmostEqual(bucket.reserve(), 1.0, places=1)
+
+    def test_throttling_halves_concurrency_and_retries(self):
+        limiter = ProviderLimiter("gemini", max_concurrency=8, base_delay=0.001)
+        outcomes = [RateLimitError("slow down"), RateLimitError("slow down"), "ok"]
+
+        def request():
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        self.assertEqual(limiter.call(request), "ok")
+        stats = limiter.stats()
+        self.assertEqual(stats["throttled"], 2)
+        self.assertEqual(stats["retries"], 2)
+        self.assertEqual(stats["concurrency"], 2)  # 8 -> 4 -> 2, plus a fraction back for the success
+
+    def test_other_errors_are_not_retried(self):
+        limiter = ProviderLimiter("gemini", base_delay=0.001)
+        request = mock.Mock(side_effect=AuthenticationError("bad key"))
+        with self.assertRaises(AuthenticationError):
+            asyncio.run(limiter.acall(lambda: asyncio.sleep(0, result=request())))
+        self.assertEqual(request.call_count, 1)
+        self.assertEqual(limiter.stats()["concurrency"], 8)
+
+    def test_sorter_retries_instead_of_misfiling(self):
+        sorter = FileSorter(api_key="test-key", cache_file=None, classifier_file=None, history_file=":memory:")
+        sorter.limiter.for_provider(provider_of(sorter.model_name)).base_delay = 0.001
+        answer = fake_response(json.dumps({"folder": "Work", "subfolder": "Finance"}))
+        with mock.patch("src.sorter.litellm.completion", side_effect=[RateLimitError("429"), answer]):
+            self.assertEqual(sorter.categorize_file("invoice.pdf"), {"folder": "Work", "subfolder": "Finance"})
+        self.assertEqual(sorter.rate_stats()["throttled"], 1)
+
+    def test_exhausted_throttling_raises_throttled_error(self):
+        limiter = ProviderLimiter("gemini", max_retries=1, base_delay=0.001)
+        with self.assertRaises(ThrottledError):
+            limiter.call(mock.Mock(side_effect=RateLimitError("429")))
+
+    def test_throttled_batch_leaves_files_in_place(self):
+        sorter = FileSorter(api_key="test-key", cache_file=None, classifier_file=None, history_file=":memory:", max_retries=1)
+        sorter.limiter.for_provider(provider_of(sorter.model_name)).base_delay = 0.001
+        with tempfile.TemporaryDirectory() as root:
+            paths = [os.path.join(root, f"file{i}.txt") for i in range(3)]
+            for path in paths:
+                with open(path, 'w') as f:
+                    f.write("x")
+            left = []
+            with mock.patch("src.sorter.litellm.acompletion", side_effect=RateLimitError("429")) as completion:
+                moved = sorter.organize_many(paths, os.path.join(root, "out"), wait=False, on_throttled=left.append)
+            self.assertEqual(moved, 0)
+            self.assertEqual(completion.call_count, 2)  # the batch request and its one retry, nothing per file
+            self.assertEqual(left, paths)
+            self.assertTrue(all(os.path.exists(p) for p in paths))
+            self.assertFalse(os.path.exists(os.path.join(root, "out")))
+        sorter.history.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import unittest
+import os
+import sys
+import json
+import asyncio
+from types import SimpleNamespace
+from unittest import mock
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.router import ProviderRouter
+from src.sorter import FileSorter
+
+class AuthenticationError(Exception):
+    status_code = 401
+
+def fake_response(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+class TestProviderRouter(unittest.TestCase):
+    def test_prefers_faster_model_once_measured(self):
+        router = ProviderRouter(min_samples=3)
+        for _ in range(3):
+            router.record("slow", 2.0, True)
+            router.record("fast", 0.2, True)
+        self.assertEqual(router.rank(["slow", "fast"]), ["fast", "slow"])
+        self.assertEqual(router.rank(["slow", "fast", "new"]), ["new", "fast", "slow"])  # unmeasured models get probed
+
+    def test_failing_model_is_skipped(self):
+        router = ProviderRouter(min_samples=2, cooldown=60)
+        calls = []
+
+        def request(model):
+            calls.append(model)
+            if model == "primary":
+                raise AuthenticationError("bad key")
+            return model
+
+        self.assertEqual(router.run(["primary", "backup"], request), "backup")
+        self.assertEqual(router.run(["primary", "backup"], request), "backup")
+        self.assertFalse(router.healthy("primary"))
+        self.assertEqual(router.run(["primary", "backup"], request), "backup")
+        self.assertEqual(calls, ["primary", "backup", "primary", "backup", "backup"])
+
+    def test_hedge_cancels_the_slow_request(self):
+        router = ProviderRouter(hedge=True, min_samples=3, min_hedge_delay=0.05)
+        for _ in range(3):
+            router.record("primary", 0.05, True)
+            router.record("backup", 0.1, True)
+        cancelled = []
+
+        async def request(model):
+            try:
+                await asyncio.sleep(5 if model == "primary" else 0.01)
+            except asyncio.CancelledError:
+                cancelled.append(model)
+                raise
+            return model
+
+        self.assertEqual(asyncio.run(router.arun(["primary", "backup"], request)), "backup")
+        self.assertEqual(cancelled, ["primary"])
+        self.assertEqual(router.stats()["hedge_wins"], 1)
+
+    def test_sorter_routes_only_to_models_with_credentials(self):
+        sorter = FileSorter(api_key="gemini-key", openai_key="openai-key", cache_file=None, classifier_file=None,
+                            history_file=":memory:", route_models=["gpt-4o-mini", "claude-3-haiku-20240307"])
+        self.assertEqual(sorter._candidate_models(), ["gemini/gemini-2.0-flash", "gpt-4o-mini"])
+        answer = fake_response(json.dumps({"folder": "Work", "subfolder": "Finance"}))
+
+        def completion(**kwargs):
+            if kwargs["model"].startswith("gemini"):
+                raise AuthenticationError("expired")
+            self.assertIsNone(kwargs["api_base"])
+            return answer
+
+        with mock.patch("src.sorter.litellm.completion", side_effect=completion):
+            self.assertEqual(sorter.categorize_file("invoice.pdf")["folder"], "Work")
+        self.assertEqual(sorter.route_stats()["models"]["gpt-4o-mini"]["requests"], 1)
+
+    def test_openai_key_alone_is_enough(self):
+        sorter = FileSorter(openai_key="openai-key", model_name="gpt-4o-mini", cache_file=None, classifier_file=None,
+                            history_file=":memory:")
+        answer = fake_response(json.dumps({"folder": "Work", "subfolder": "Finance"}))
+        with mock.patch("src.sorter.litellm.completion", return_value=answer) as completion:
+            self.assertEqual(sorter.categorize_file("invoice.pdf")["folder"], "Work")
+            self.assertEqual(sorter.categorize_batch(["a.pdf"])["a.pdf"].source, "llm")
+        self.assertEqual(completion.call_count, 2)
+        self.assertFalse(FileSorter(cache_file=None, classifier_file=None, history_file=":memory:")._can_ask_ai())
+
+    def test_vendor_models_never_use_the_local_url(self):
+        sorter = FileSorter(local_base_url="http://localhost:11434/v1", cache_file=None, classifier_file=None,
+                            history_file=":memory:")
+        for model in ("openai/gpt-4o", "gpt-4o", "gemini/gemini-2.0-flash", "claude-3-haiku-20240307"):
+            self.assertIsNone(sorter._api_base(model), model)
+        self.assertEqual(sorter._api_base("ollama/llama3"), "http://localhost:11434/v1")
+
+if __name__ == '__main__':
+    unittest.main()
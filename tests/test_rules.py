@@ -0,0 +1,62 @@
+import unittest
+import os
+import sys
+import tempfile
+from unittest import mock
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.rules import RuleEngine, parse_rule_line, format_rule
+from src.sorter import FileSorter
+
+class TestRuleEngine(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def make_file(self, name, size):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'wb') as f:
+            f.write(b"x" * size)
+        return path
+
+    def test_first_matching_rule_wins(self):
+        engine = RuleEngine([
+            parse_rule_line("invoice*, *.pdf -> Work/Finance"),
+            parse_rule_line("*.pdf -> Documents/PDF"),
+            parse_rule_line("re:^IMG_\\d+ -> Images/Camera"),
+        ])
+        self.assertEqual(engine.match("/x/Invoice_2024.PDF"), {"folder": "Work", "subfolder": "Finance"})
+        self.assertEqual(engine.match("/x/manual.pdf"), {"folder": "Documents", "subfolder": "PDF"})
+        self.assertEqual(engine.match("/x/IMG_0001.jpg")["folder"], "Images")
+        self.assertIsNone(engine.match("/x/song.mp3"))
+        self.assertEqual(engine.stats()["llm_calls_avoided"], 3)
+
+    def test_size_and_source_conditions(self):
+        small = self.make_file("a.iso", 10)
+        big = self.make_file("b.iso", 4096)
+        engine = RuleEngine([parse_rule_line(f"*.iso, >1KB, in:{self.tmp.name} -> Archives/Disk Images")])
+        self.assertIsNone(engine.match(small))
+        self.assertEqual(engine.match(big)["subfolder"], "Disk Images")
+        self.assertIsNone(engine.match(os.path.join(os.path.dirname(self.tmp.name), "elsewhere", "b.iso")))
+
+    def test_format_round_trips(self):
+        rule = parse_rule_line("*.exe, setup*, >2MB -> Installers/Windows")
+        again = parse_rule_line(format_rule(rule))
+        for key in ("extensions", "globs", "min_size", "folder", "subfolder"):
+            self.assertEqual(rule[key], again[key])
+
+    def test_rules_short_circuit_the_provider(self):
+        path = self.make_file("setup_v2.exe", 1)
+        sorter = FileSorter(api_key="test-key", cache_file=None, classifier_file=None, history_file=os.path.join(self.tmp.name, "h.db"),
+                            rules=[parse_rule_line("*.exe -> Installers/Windows")])
+        with mock.patch("src.sorter.litellm.completion") as completion:
+            categories = sorter.categorize_paths([path])
+        completion.assert_not_called()
+        self.assertEqual(categories[path], {"folder": "Installers", "subfolder": "Windows"})
+
+if __name__ == '__main__':
+    unittest.main()
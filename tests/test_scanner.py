@@ -0,0 +1,64 @@
+import unittest
+import os
+import sys
+import tempfile
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.scanner import ManualScanner
+
+class TestManualScanner(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp.name, "share")
+        self.checkpoint = os.path.join(self.tmp.name, "checkpoint.json")
+        for rel in ["a.txt", "b.txt", "docs/c.pdf", "docs/deep/d.pdf", "node_modules/e.js", "out/f.txt"]:
+            path = os.path.join(self.source, rel)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                f.write("x")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def names(self, scanner):
+        return sorted(os.path.basename(p) for _, chunk in scanner.chunks() for p in chunk)
+
+    def test_top_level_only_by_default(self):
+        scanner = ManualScanner([self.source], checkpoint_file=self.checkpoint)
+        self.assertEqual(self.names(scanner), ["a.txt", "b.txt"])
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_recursive_with_excludes_and_target(self):
+        scanner = ManualScanner.for_sources([self.source], os.path.join(self.source, "out"), inplace=False,
+                                            recursive=True, exclude=["node_modules"])
+        scanner.checkpoint_file = self.checkpoint
+        self.assertEqual(self.names(scanner), ["a.txt", "b.txt", "c.pdf", "d.pdf"])
+
+    def test_inplace_never_recurses(self):
+        scanner = ManualScanner.for_sources([self.source], "", inplace=True, recursive=True)
+        self.assertFalse(scanner.recursive)
+
+    def test_interrupted_scan_resumes(self):
+        scanner = ManualScanner([self.source], recursive=True, exclude=["node_modules", "out"],
+                                checkpoint_file=self.checkpoint, chunk_size=1)
+        chunks = scanner.chunks()
+        processed = []
+        for _ in range(3):
+            _, chunk = next(chunks)
+            for path in chunk:  # "sort" the file away
+                processed.append(os.path.basename(path))
+                os.remove(path)
+        next(chunks)  # asking for more commits the checkpoint, then we "crash"
+        chunks.close()
+        self.assertTrue(os.path.exists(self.checkpoint))
+
+        resumed = ManualScanner([self.source], recursive=True, exclude=["node_modules", "out"],
+                                checkpoint_file=self.checkpoint, chunk_size=1)
+        remaining = self.names(resumed)
+        self.assertTrue(resumed.resumed)
+        self.assertEqual(sorted(processed + remaining), ["a.txt", "b.txt", "c.pdf", "d.pdf"])
+
+if __name__ == '__main__':
+    unittest.main()
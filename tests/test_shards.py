@@ -0,0 +1,61 @@
+import unittest
+import os
+import sys
+import time
+import tempfile
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.sorter import FileSorter
+from src.shards import ShardedWatcher, assign_shards, split_limits
+from src.metrics import MetricsRegistry
+
+class TestSharding(unittest.TestCase):
+    def test_assign_and_split(self):
+        self.assertEqual(assign_shards(["/c", "/a", "/b"], 2), [["/a", "/c"], ["/b"]])
+        self.assertEqual(assign_shards(["/a"], 4), [["/a"]])
+        limits = split_limits({"gemini": {"rpm": 60, "concurrency": 4}}, 2, {"openai"})
+        self.assertEqual(limits["gemini"], {"rpm": 30, "concurrency": 2})
+        self.assertEqual(limits["openai"], {"concurrency": 4})
+
+    def test_registry_merges_attached_dumps(self):
+        worker, parent = MetricsRegistry(), MetricsRegistry()
+        worker.counter("moves_total").inc(3, method="rename")
+        worker.histogram("latency_seconds", buckets=(1, 2)).observe(1.5)
+        parent.counter("moves_total").inc(1, method="rename")
+        parent.attach("shard-1", worker.dump())
+        text = parent.render()
+        self.assertIn('moves_total{method="rename"} 4', text)
+        self.assertIn('latency_seconds_bucket{le="2.0"} 1', text)
+        self.assertEqual(parent.counter("moves_total").value(method="rename"), 1)  # local series untouched
+
+    def test_shards_share_history_and_destination_names(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            roots = [os.path.join(tmp, f"root{i}") for i in range(3)]
+            for root in roots:
+                os.makedirs(root)
+            target = os.path.join(tmp, "target")
+            sorter = FileSorter(cache_file=None, classifier_file=None, history_file=os.path.join(tmp, "history.db"))
+            watcher = ShardedWatcher(roots, target, sorter, {"coalesce_window": 0.1, "stability_max_interval": 1,
+                                                                  "snapshot_file": os.path.join(tmp, "snapshot.db")}, processes=2)
+            watcher.start()
+            try:
+                self.assertEqual(len(watcher.shards), 2)
+                time.sleep(2)  # let the spawned shards import and start their observers
+                for root in roots:
+                    with open(os.path.join(root, "report.txt"), "w") as f:
+                        f.write(root)
+                deadline = time.time() + 20
+                while len(sorter.history.page()) < 3 and time.time() < deadline:
+                    time.sleep(0.1)
+            finally:
+                watcher.stop()
+            moved = sorted(os.listdir(os.path.join(target, "Other", "Misc")))
+            self.assertEqual(moved, ["report.txt", "report_1.txt", "report_2.txt"])
+            self.assertEqual(len(sorter.history.page()), 3)
+            self.assertEqual(watcher.stats()["processed"], 3)
+            sorter.history.close()
+
+if __name__ == '__main__':
+    unittest.main()
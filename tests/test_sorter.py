@@ -0,0 +1,171 @@
+import unittest
+import os
+import sys
+import json
+import tempfile
+import asyncio
+from types import SimpleNamespace
+from unittest import mock
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.sorter import FileSorter
+from src.cache import CategoryCache
+from src.rules import parse_rule_line
+
+def fake_response(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+class TestCategorizeBatch(unittest.TestCase):
+    def setUp(self):
+        self.sorter = FileSorter(api_key="test-key", cache_file=None, classifier_file=None, history_file=":memory:")
+
+    def test_single_request_for_many_files(self):
+        names = ["invoice_2024.pdf", "setup_v1.exe", "song.mp3"]
+        content = json.dumps({
+            "invoice_2024.pdf": {"folder": "Work", "subfolder": "Finance"},
+            "setup_v1.exe": {"folder": "Installers", "subfolder": "Windows"},
+            "song.mp3": {"folder": "Music", "subfolder": "Tracks"},
+        })
+        with mock.patch("src.sorter.litellm.completion", return_value=fake_response(content)) as completion:
+            result = self.sorter.categorize_batch(names)
+        self.assertEqual(completion.call_count, 1)
+        self.assertEqual(result["setup_v1.exe"], {"folder": "Installers", "subfolder": "Windows"})
+
+    def test_malformed_entries_fall_back_per_item(self):
+        content = json.dumps({"a.pdf": {"folder": "Documents", "subfolder": "PDF"}, "b.zip": "Archives"})
+        with mock.patch("src.sorter.litellm.completion", return_value=fake_response(content)), \
+             mock.patch.object(self.sorter, "_request_category", return_value={"folder": "Archives", "subfolder": "Zip"}) as single:
+            result = self.sorter.categorize_batch(["a.pdf", "b.zip"])
+        single.assert_called_once_with("b.zip")
+        self.assertEqual(result["a.pdf"]["folder"], "Documents")
+        self.assertEqual(result["b.zip"]["folder"], "Archives")
+
+class TestConcurrentPipeline(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp.name, "source")
+        self.target = os.path.join(self.tmp.name, "target")
+        os.makedirs(self.source)
+        self.sorter = FileSorter(api_key="test-key", cache_file=None, classifier_file=None, batch_size=2, max_in_flight=3,
+                                 history_file=os.path.join(self.tmp.name, "history.db"))
+        self.sorter.wait_for_file_stability = lambda filepath, timeout=5: True
+
+    def tearDown(self):
+        self.sorter.history.close()
+        self.tmp.cleanup()
+
+    def test_moves_follow_input_order(self):
+        names = [f"doc_{i}.txt" for i in range(7)]
+        paths = []
+        for name in names:
+            paths.append(os.path.join(self.source, name))
+            with open(paths[-1], 'w') as f:
+                f.write("x")
+
+        async def acompletion(**kwargs):
+            prompt = kwargs["messages"][0]["content"]
+            if "Files: " not in prompt:
+                return fake_response(json.dumps({"folder": "Documents", "subfolder": "Text"}))
+            batch = json.loads(prompt.split("Files: ")[1].split("\n")[0])
+            await asyncio.sleep(0.05 if "doc_0.txt" in batch else 0)
+            return fake_response(json.dumps({n: {"folder": "Documents", "subfolder": "Text"} for n in batch}))
+
+        moved = []
+        original_move = self.sorter._move_to_category
+        def record(filepath, target_root, category, *args):
+            moved.append(os.path.basename(filepath))
+            return original_move(filepath, target_root, category, *args)
+        self.sorter._move_to_category = record
+
+        with mock.patch("src.sorter.litellm.acompletion", side_effect=acompletion) as completion:
+            count = self.sorter.organize_many(paths, self.target)
+        self.assertEqual(count, 7)
+        self.assertEqual(completion.call_count, 4)  # three batches of two, plus a single-file tail
+        self.assertEqual(moved, names)
+        self.assertTrue(os.path.exists(os.path.join(self.target, "Documents", "Text", "doc_6.txt")))
+
+class TestBulkUndo(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp.name, "source")
+        self.target = os.path.join(self.tmp.name, "target")
+        os.makedirs(self.source)
+        self.sorter = FileSorter(cache_file=None, classifier_file=None, rules=[parse_rule_line("*.txt -> Documents/Text")],
+                                 history_file=os.path.join(self.tmp.name, "history.db"))
+
+    def tearDown(self):
+        self.sorter.history.close()
+        self.tmp.cleanup()
+
+    def test_undo_whole_session(self):
+        paths = []
+        for i in range(20):
+            paths.append(os.path.join(self.source, f"note_{i}.txt"))
+            open(paths[-1], 'w').close()
+        session = self.sorter.history.new_session("scan")
+        self.assertEqual(self.sorter.organize_many(paths, self.target, wait=False, session=session), 20)
+        # A file sorted twice in the same session has to be walked back through both moves
+        first = os.path.join(self.target, "Documents", "Text", "note_0.txt")
+        again = self.sorter.resolve_destination(os.path.join(self.target, "Archive", "Old"), "note_0.txt")
+        self.assertTrue(self.sorter.move_to(first, again, "Archive", "Old", session))
+        events = []
+        self.sorter.history.subscribe(lambda event, entry: events.append(event))
+
+        undone = self.sorter.undo_last_session("scan")
+        self.assertEqual(len(undone), 21)
+        self.assertTrue(all(os.path.exists(p) for p in paths))
+        self.assertEqual(self.sorter.history.count(), 0)
+        self.assertEqual(events.count("undone"), 21)
+        self.assertTrue(all(os.path.abspath(p) in self.sorter.ignored_paths for p in paths))
+        self.assertEqual(self.sorter.undo_last_session("scan"), [])
+
+class TestCategoryCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.tmp.name, "cache.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_repeated_names_skip_the_provider(self):
+        sorter = FileSorter(api_key="test-key", cache_file=self.db_file, classifier_file=None, history_file=":memory:")
+        content = json.dumps({"folder": "Work", "subfolder": "Finance"})
+        with mock.patch("src.sorter.litellm.completion", return_value=fake_response(content)) as completion:
+            sorter.categorize_file("invoice_2023.pdf")
+            result = sorter.categorize_file("Invoice_2024.pdf")
+        self.assertEqual(completion.call_count, 1)
+        self.assertEqual(result, {"folder": "Work", "subfolder": "Finance"})
+        self.assertEqual((sorter.cache_stats()["hits"], sorter.cache_stats()["misses"]), (1, 1))
+        sorter.cache.close()
+
+    def test_model_change_invalidates(self):
+        sorter = FileSorter(api_key="test-key", cache_file=self.db_file, classifier_file=None, history_file=":memory:")
+        sorter.cache.put("setup.exe", {"folder": "Installers", "subfolder": "Windows"})
+        sorter.update_config("test-key", "", "", "", "gpt-4o", [], True)
+        self.assertIsNone(sorter.cache.get("setup.exe"))
+        sorter.cache.close()
+
+    def test_apply_config_swaps_settings_live(self):
+        sorter = FileSorter(api_key="test-key", cache_file=self.db_file, classifier_file=None, history_file=":memory:")
+        sorter.cache.put("setup.exe", {"folder": "Installers", "subfolder": "Windows"})
+        limiter = sorter.limiter.for_provider("gemini")
+        sorter.apply_config({"api_key": "test-key", "batch_size": 5, "hedge_requests": True})
+        self.assertEqual((sorter.batch_size, sorter.router.hedge), (5, True))
+        self.assertIs(sorter.limiter.for_provider("gemini"), limiter)  # unchanged limits keep their state
+        self.assertIsNotNone(sorter.cache.get("setup.exe"))  # same model and categories: cache still valid
+        sorter.apply_config({"api_key": "test-key", "rate_limits": {"gemini": {"rpm": 10}}})
+        self.assertIsNot(sorter.limiter.for_provider("gemini"), limiter)
+        sorter.cache.close()
+
+    def test_size_cap_evicts_least_recently_used(self):
+        cache = CategoryCache(self.db_file, max_entries=50)
+        for i in range(100):
+            cache.put(f"file_{chr(65 + i % 26)}{i // 26 * 'x'}.txt", {"folder": "Documents", "subfolder": "Text"})
+        count = cache._connect().execute("SELECT COUNT(*) FROM categories").fetchone()[0]
+        self.assertLessEqual(count, 50)
+        cache.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,374 @@
+import unittest
+import os
+import sys
+import time
+import tempfile
+import threading
+from unittest import mock
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.watcher import FolderWatcher, EventFilter
+from src.stability import StabilityTracker
+from src.suppression import SuppressionSet
+from src.snapshot import FolderSnapshot, list_folder
+
+class RecordingSorter:
+    """Stands in for FileSorter; records which thread handled each path."""
+    batch_size = 1
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.seen = []
+        self.lock = threading.Lock()
+
+    def organize_file(self, filepath, target_root, wait=True, on_throttled=None):
+        time.sleep(self.delay)
+        with self.lock:
+            self.seen.append((os.path.basename(filepath), threading.current_thread().name))
+        return True
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+class WatcherTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def make_file(self, name, content="data"):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+class TestWatcherQueue(WatcherTestCase):
+    def test_handler_only_enqueues(self):
+        sorter = RecordingSorter(delay=0.2)
+        watcher = FolderWatcher([], "target", sorter, workers=2, coalesce_window=0)
+        watcher.start()
+        paths = [self.make_file(f"file_{i}.txt") for i in range(4)]
+        started = time.time()
+        for path in paths:
+            watcher.handler.dispatch_path(path)
+        self.assertLess(time.time() - started, 0.1)
+        self.assertTrue(wait_until(lambda: len(sorter.seen) == 4))
+        watcher.stop(drain=True)
+        self.assertTrue(all(name.startswith("SortAI-worker") for _, name in sorter.seen))
+        self.assertEqual(watcher.stats()["queue_depth"], 0)
+
+    def test_stop_without_drain_cancels_queue(self):
+        sorter = RecordingSorter(delay=0.2)
+        watcher = FolderWatcher([], "target", sorter, workers=1)
+        watcher.start()
+        for i in range(10):
+            watcher.enqueue(f"file_{i}.txt")
+        time.sleep(0.05)
+        watcher.stop(drain=False)
+        self.assertLess(len(sorter.seen), 10)
+
+    def test_drain_finishes_files_still_coalescing(self):
+        sorter = RecordingSorter()
+        watcher = FolderWatcher([], "target", sorter, workers=1, coalesce_window=5)
+        watcher.start()
+        watcher.handler.dispatch_path(self.make_file("done.txt"))
+        watcher.stop(drain=True)
+        self.assertEqual([name for name, _ in sorter.seen], ["done.txt"])
+
+class TestCoalescing(WatcherTestCase):
+    def test_repeated_events_collapse(self):
+        sorter = RecordingSorter()
+        watcher = FolderWatcher([], "target", sorter, workers=1, coalesce_window=0.2)
+        watcher.start()
+        report = self.make_file("report.docx")
+        for _ in range(5):
+            watcher.handler.dispatch_path(report)
+        watcher.handler.dispatch_path(self.make_file("other.docx"))
+        self.assertTrue(wait_until(lambda: len(sorter.seen) == 2))
+        time.sleep(0.3)
+        stats = watcher.stats()
+        watcher.stop()
+        self.assertEqual(sorted(name for name, _ in sorter.seen), ["other.docx", "report.docx"])
+        self.assertEqual(stats["events_collapsed"], 4)
+
+    def test_in_flight_path_is_not_processed_twice(self):
+        sorter = RecordingSorter(delay=0.3)
+        watcher = FolderWatcher([], "target", sorter, workers=2, coalesce_window=0)
+        watcher.start()
+        watcher.enqueue("same.txt")
+        time.sleep(0.05)
+        watcher.enqueue("same.txt")
+        watcher.stop()
+        self.assertEqual(len(sorter.seen), 1)
+        self.assertEqual(watcher.stats()["in_flight_duplicates"], 1)
+
+class TestStabilityTracker(WatcherTestCase):
+    def test_growing_file_is_emitted_once_it_settles(self):
+        stable = []
+        tracker = StabilityTracker(stable.append, min_interval=0.1, max_interval=0.2)
+        tracker.start()
+        path = self.make_file("big.iso", "x")
+        tracker.track(path)
+        for _ in range(25):
+            time.sleep(0.02)
+            with open(path, 'a') as f:
+                f.write("more")
+        self.assertEqual(stable, [])
+        self.assertTrue(wait_until(lambda: stable == [path]))
+        tracker.stop()
+
+    def test_deleted_file_is_dropped(self):
+        stable = []
+        tracker = StabilityTracker(stable.append, min_interval=0.05)
+        tracker.start()
+        path = self.make_file("gone.txt")
+        tracker.track(path)
+        os.remove(path)
+        time.sleep(0.2)
+        self.assertEqual((stable, tracker.stats()["settling"]), ([], 0))
+        tracker.stop()
+
+    def test_dropped_paths_leave_no_event_timestamps(self):
+        watcher = FolderWatcher([], "target", RecordingSorter(), workers=1, coalesce_window=0.05)
+        watcher.stability.min_interval = 0.05
+        watcher.start()
+        gone = self.make_file("gone.txt")
+        watcher.handler.dispatch_path(gone)
+        watcher.handler.dispatch_path(self.make_file("renamed.txt"))
+        watcher.discard(os.path.join(self.tmp.name, "renamed.txt"))  # source side of a rename
+        os.remove(gone)
+        self.assertTrue(wait_until(lambda: not watcher.first_event))
+        watcher.stop()
+
+class TestRecursiveWatching(WatcherTestCase):
+    def test_suppression_set_expires_in_order(self):
+        suppressed = SuppressionSet(ttl=0.2)
+        suppressed.update(["/a", "/b"])
+        time.sleep(0.12)
+        suppressed.add("/a")  # refreshed: now expires after /b
+        time.sleep(0.12)
+        self.assertIn("/a", suppressed)
+        self.assertNotIn("/b", suppressed)
+        self.assertEqual(len(suppressed), 1)
+
+    def test_event_filter(self):
+        root = self.tmp.name
+        suppressed = SuppressionSet()
+        event_filter = EventFilter([root], [".git", "*.tmp"], suppressed)
+        event_filter.add_output(os.path.join(root, "Docs", "PDF"))
+        suppressed.add(os.path.join(root, "moved.txt"))
+        self.assertFalse(event_filter.skip(os.path.join(root, "sub", "dir", "report.pdf")))
+        self.assertTrue(event_filter.skip(os.path.join(root, "repo", ".git", "objects", "ab")))
+        self.assertTrue(event_filter.skip(os.path.join(root, "download.tmp")))
+        self.assertTrue(event_filter.skip(os.path.join(root, "Docs", "PDF", "deep", "a.pdf")))
+        self.assertTrue(event_filter.skip(os.path.join(root, "moved.txt")))
+        self.assertFalse(event_filter.skip(os.path.join(root, "Docs", "a.pdf")))
+
+    def test_inplace_recursive_does_not_resort_own_moves(self):
+        from src.sorter import FileSorter
+        root = os.path.join(self.tmp.name, "root")
+        nested = os.path.join(root, "downloads", "nested")
+        os.makedirs(nested)
+        sorter = FileSorter(cache_file=None, classifier_file=None, history_file=os.path.join(self.tmp.name, "history.db"))
+        watcher = FolderWatcher([root], None, sorter, inplace=True, coalesce_window=0.05, stability_max_interval=0.5,
+                                recursive=True)
+        watcher.start()
+        try:
+            with open(os.path.join(nested, "notes.txt"), "w") as f:
+                f.write("x")
+            moved = os.path.join(nested, "Other", "Misc", "notes.txt")
+            self.assertTrue(wait_until(lambda: os.path.exists(moved)))
+            time.sleep(1.0)  # any self-triggered re-sort would have happened by now
+        finally:
+            watcher.stop()
+        self.assertTrue(os.path.exists(moved))
+        self.assertEqual(sorter.history.count(), 1)
+        self.assertGreaterEqual(watcher.stats()["events_skipped"], 1)
+        sorter.history.close()
+
+class TestSnapshotCatchUp(WatcherTestCase):
+    def test_snapshot_round_trip_and_changes(self):
+        self.make_file("a.txt")
+        os.makedirs(os.path.join(self.tmp.name, "sub"))
+        self.make_file(os.path.join("sub", "b.txt"))
+        snapshot = FolderSnapshot(os.path.join(self.tmp.name, "sub", "snapshot.db"))
+        self.assertIsNone(snapshot.load(self.tmp.name))
+        listing = list_folder(self.tmp.name, recursive=True, excluded=lambda path, is_dir: ".db" in path)
+        self.assertEqual(sorted(listing), ["a.txt", os.path.join("sub", "b.txt")])
+        snapshot.save(self.tmp.name, listing)
+        self.assertEqual(snapshot.load(self.tmp.name), listing)
+        self.make_file("a.txt", "changed")
+        self.make_file("c.txt")
+        current = list_folder(self.tmp.name)
+        self.assertEqual(sorted(FolderSnapshot.changes(listing, current)), ["a.txt", "c.txt"])
+        snapshot.close()
+
+    def test_restart_sorts_only_files_added_while_stopped(self):
+        root = os.path.join(self.tmp.name, "root")
+        os.makedirs(root)
+        with open(os.path.join(root, "old.txt"), "w") as f:
+            f.write("x")
+        snapshot_file = os.path.join(self.tmp.name, "snapshot.db")
+        sorter = RecordingSorter()
+        watcher = FolderWatcher([root], "target", sorter, coalesce_window=0, snapshot_file=snapshot_file)
+        watcher.start()
+        watcher.stop()
+        self.assertEqual(sorter.seen, [])  # the first start only records a baseline
+        with open(os.path.join(root, "new.txt"), "w") as f:
+            f.write("y")
+        watcher = FolderWatcher([root], "target", sorter, coalesce_window=0, stability_max_interval=0.5,
+                                snapshot_file=snapshot_file)
+        watcher.start()
+        self.assertTrue(wait_until(lambda: len(sorter.seen) == 1))
+        watcher.stop()
+        self.assertEqual([name for name, _ in sorter.seen], ["new.txt"])
+        self.assertEqual(watcher.stats()["caught_up"], 1)
+        watcher.snapshot.close()
+
+    def test_files_seen_while_running_are_not_new_after_any_stop(self):
+        root = os.path.join(self.tmp.name, "root")
+        os.makedirs(root)
+        snapshot_file = os.path.join(self.tmp.name, "snapshot.db")
+        sorter = RecordingSorter()
+        watcher = FolderWatcher([root], "target", sorter, coalesce_window=0, stability_max_interval=0.5,
+                                snapshot_file=snapshot_file)
+        watcher.start()
+        with open(os.path.join(root, "unsortable.txt"), "w") as f:
+            f.write("x")  # RecordingSorter leaves it where it is
+        self.assertTrue(wait_until(lambda: len(sorter.seen) == 1))
+        watcher.stop(drain=False)
+        watcher.start()
+        time.sleep(0.5)
+        watcher.stop()
+        self.assertEqual(len(sorter.seen), 1)
+        self.assertEqual(watcher.stats()["caught_up"], 0)
+        watcher.snapshot.close()
+
+    def test_snapshot_is_saved_periodically_while_running(self):
+        root = os.path.join(self.tmp.name, "root")
+        os.makedirs(root)
+        watcher = FolderWatcher([root], "target", RecordingSorter(), coalesce_window=0, stability_max_interval=0.5,
+                                snapshot_file=os.path.join(self.tmp.name, "snapshot.db"), snapshot_interval=0.1)
+        watcher.start()
+        try:
+            with open(os.path.join(root, "arrived.txt"), "w") as f:
+                f.write("x")
+            self.assertTrue(wait_until(lambda: "arrived.txt" in (watcher.snapshot.load(root) or {})))
+        finally:
+            watcher.stop()
+        watcher.snapshot.close()
+
+    def test_idle_watcher_does_not_resave_the_snapshot(self):
+        root = os.path.join(self.tmp.name, "root")
+        os.makedirs(root)
+        watcher = FolderWatcher([root], "target", RecordingSorter(), coalesce_window=0, stability_max_interval=0.5,
+                                snapshot_file=os.path.join(self.tmp.name, "snapshot.db"), snapshot_interval=0.05)
+        with mock.patch.object(watcher, "_save_snapshot", wraps=watcher._save_snapshot) as save:
+            watcher.start()
+            try:
+                time.sleep(0.4)
+                self.assertEqual(save.call_count, 0)
+                watcher.on_event(os.path.join(root, "gone.txt"))  # dropped once the tracker finds nothing there
+                self.assertTrue(wait_until(lambda: save.call_count >= 1))
+            finally:
+                watcher.stop()
+        watcher.snapshot.close()
+
+    def test_undone_files_are_not_sorted_again_on_start(self):
+        from src.sorter import FileSorter
+        root, target = os.path.join(self.tmp.name, "root"), os.path.join(self.tmp.name, "target")
+        os.makedirs(root)
+        sorter = FileSorter(cache_file=None, classifier_file=None, history_file=os.path.join(self.tmp.name, "history.db"))
+        snapshot_file = os.path.join(self.tmp.name, "snapshot.db")
+        watcher = FolderWatcher([root], target, sorter, coalesce_window=0, snapshot_file=snapshot_file)
+        watcher.start()
+        watcher.stop()  # baseline of an empty folder
+        report = os.path.join(root, "report.txt")
+        with open(report, "w") as f:
+            f.write("x")
+        self.assertTrue(sorter.organize_file(report, target, wait=False))
+        self.assertTrue(sorter.undo_last())
+        sorter.ignored_paths = SuppressionSet(0)  # as if the grace period after the undo had long expired
+        watcher = FolderWatcher([root], target, sorter, coalesce_window=0, stability_max_interval=0.5,
+                                snapshot_file=snapshot_file)
+        watcher.start()
+        time.sleep(0.5)
+        watcher.stop()
+        self.assertTrue(os.path.exists(report))
+        self.assertEqual(watcher.stats()["caught_up"], 0)
+        watcher.snapshot.close()
+        sorter.history.close()
+
+    def test_shard_style_watcher_reads_undone_moves_from_a_shared_journal(self):
+        from src.sorter import FileSorter
+        from src.history import HistoryStore
+        root, target = os.path.join(self.tmp.name, "root"), os.path.join(self.tmp.name, "target")
+        os.makedirs(root)
+        history_file = os.path.join(self.tmp.name, "history.db")
+        sorter = FileSorter(cache_file=None, classifier_file=None, history_file=history_file)
+        snapshot_file = os.path.join(self.tmp.name, "snapshot.db")
+        watcher = FolderWatcher([root], target, RecordingSorter(), coalesce_window=0, snapshot_file=snapshot_file)
+        watcher.start()
+        watcher.stop()
+        report = os.path.join(root, "report.txt")
+        with open(report, "w") as f:
+            f.write("x")
+        self.assertTrue(sorter.organize_file(report, target, wait=False))
+        self.assertTrue(sorter.undo_last())
+        # Like a shard: the sorter keeps no journal, the coordinator's is opened read-only
+        shared = HistoryStore(history_file, legacy_json=None, readonly=True)
+        watcher = FolderWatcher([root], target, RecordingSorter(), coalesce_window=0, stability_max_interval=0.5,
+                                snapshot_file=snapshot_file, history=shared)
+        watcher.start()
+        time.sleep(0.5)
+        watcher.stop()
+        self.assertEqual(watcher.stats()["caught_up"], 0)
+        watcher.snapshot.close()
+        shared.close()
+        sorter.history.close()
+
+class TestLiveUpdates(WatcherTestCase):
+    def test_from_config_applies_settings_and_overrides(self):
+        config = {"source_folders": ["/a", "/b"], "target_folder": "/out", "inplace_organization": False,
+                  "watcher_workers": 3, "watch_recursive": True, "snapshot_file": "", "scan_exclude": ["*.tmp"]}
+        watcher = FolderWatcher.from_config(config, RecordingSorter(), source_folders=["/c"])
+        self.assertEqual(watcher.source_folders, ["/c"])
+        self.assertEqual((watcher.target_folder, watcher.inplace, watcher.worker_count), ("/out", False, 3))
+        self.assertTrue(watcher.recursive)
+        self.assertEqual(watcher.exclude, ["*.tmp"])
+        self.assertIsNone(watcher.snapshot)
+
+    def test_update_folders_reschedules_only_changes(self):
+        first, second = os.path.join(self.tmp.name, "first"), os.path.join(self.tmp.name, "second")
+        os.makedirs(first)
+        os.makedirs(second)
+        sorter = RecordingSorter(delay=0.3)
+        watcher = FolderWatcher([first], "target", sorter, workers=1, coalesce_window=0, stability_max_interval=0.5)
+        watcher.start()
+        try:
+            observer, watch = watcher.observer, watcher.watches[first]
+            watcher.enqueue(os.path.join(first, "queued.txt"))
+            changes = watcher.update_folders([second], "target", False)
+            self.assertEqual(changes, {"added": [second], "removed": [first]})
+            self.assertIs(watcher.observer, observer)
+            self.assertNotIn(first, watcher.watches)
+            changes = watcher.update_folders([first, second], "target", False)
+            self.assertEqual(changes, {"added": [first], "removed": []})
+            self.assertIsNot(watcher.watches[first], watch)
+            with open(os.path.join(second, "new.txt"), "w") as f:
+                f.write("x")
+            self.assertTrue(wait_until(lambda: len(sorter.seen) == 2))
+        finally:
+            watcher.stop()
+        self.assertEqual(sorted(name for name, _ in sorter.seen), ["new.txt", "queued.txt"])
+
+if __name__ == '__main__':
+    unittest.main()